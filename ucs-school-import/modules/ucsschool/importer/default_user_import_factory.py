@@ -45,6 +45,7 @@ if TYPE_CHECKING:
     import ucsschool.importer.reader.csv_reader.CsvReader
     import ucsschool.importer.utils.username_handler.EmailHandler
     import ucsschool.importer.utils.username_handler.UsernameHandler
+    import ucsschool.importer.utils.username_index.UsernameIndex
     import ucsschool.importer.writer.csv_writer.CsvWriter
     import ucsschool.importer.writer.new_user_password_csv_exporter.NewUserPasswordCsvExporter
     import ucsschool.importer.writer.user_import_csv_result_exporter.UserImportCsvResultExporter  # noqa: F401,E501
@@ -90,6 +91,7 @@ class DefaultUserImportFactory(object):
             "user_importer": "ucsschool.importer.mass_import.user_import.UserImport",
             "unique_email_handler": "ucsschool.importer.utils.username_handler.EmailHandler",
             "username_handler": "ucsschool.importer.utils.username_handler.UsernameHandler",
+            "username_index": "ucsschool.importer.utils.username_index.UsernameIndex",
             "user_writer": "ucsschool.importer.writer.base_writer.BaseWriter",
         }
         methods = ["import_user"]
@@ -295,6 +297,20 @@ class DefaultUserImportFactory(object):
 
         return UsernameHandler(max_length, dry_run)
 
+    def make_username_index(self):  # type: () -> ucsschool.importer.utils.username_index.UsernameIndex
+        """
+        Get a UsernameIndex instance, depending on the configuration option
+        `username_uniqueness_index`.
+
+        :return: a :py:class:`UsernameIndex` object
+        :rtype: UsernameIndex
+        """
+        from .utils.username_index import LdapUsernameIndex, MemoryUsernameIndex
+
+        if self.config.get("username_uniqueness_index", "memory") == "ldap":
+            return LdapUsernameIndex()
+        return MemoryUsernameIndex()
+
     def make_user_writer(self, *arg, **kwargs):
         # type: (*Any, **Any) -> ucsschool.importer.writer.csv_writer.CsvWriter
         """
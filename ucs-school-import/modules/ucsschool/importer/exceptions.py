@@ -179,6 +179,10 @@ class ReadOnlyConfiguration(UcsSchoolImportFatalError):
         )
 
 
+class StoredValueChanged(UcsSchoolImportFatalError):
+    pass
+
+
 class TooManyErrors(UcsSchoolImportFatalError):
     def __init__(self, msg, errors, *args, **kwargs):
         super(TooManyErrors, self).__init__(msg, *args, **kwargs)
@@ -106,16 +106,25 @@ class MassImport(object):
 
     def import_users(self):  # type: () -> None
         self.logger.info("------ Importing users... ------")
+        # the usernames in use may have changed since a previous job in this process
+        self.factory.make_import_user([]).reset_username_index()
         user_import = self.factory.make_user_importer(self.dry_run)
         exception = None
         try:
             user_import.progress_report(description="Running pre-read hooks: 0%.", percentage=0)
             run_import_pyhooks(PreReadPyHook, "pre_read")
             user_import.progress_report(description="Analyzing data: 1%.", percentage=1)
-            imported_users = user_import.read_input()
-            users_to_delete = user_import.detect_users_to_delete()
-            user_import.delete_users(users_to_delete)  # 0% - 10%
-            user_import.create_and_modify_users(imported_users)  # 90% - 100%
+            window_size = int(self.config.get("streaming_window_size", 0))
+            if window_size > 0:
+                # all users must have been read before deleting, so delete last
+                user_import.read_and_create_and_modify_users(window_size)  # 10% - 100%
+                users_to_delete = user_import.detect_users_to_delete()
+                user_import.delete_users(users_to_delete)
+            else:
+                imported_users = user_import.read_input()
+                users_to_delete = user_import.detect_users_to_delete()
+                user_import.delete_users(users_to_delete)  # 0% - 10%
+                user_import.create_and_modify_users(imported_users)  # 90% - 100%
         except UcsSchoolImportError as exc:
             exception = exc
             user_import.errors.append(exc)
@@ -126,6 +135,11 @@ class MassImport(object):
                 UcsSchoolImportFatalError("An unknown error terminated the import job: {}".format(exc))
             )
             self.logger.exception(exc)
+        try:
+            self.factory.make_import_user([]).release_reserved_counters()
+        except Exception as exc:
+            # must not prevent the statistics and output files from being written
+            self.logger.warning("Could not give back reserved counter values: %s", exc)
         self.errors.extend(user_import.errors)
         self.user_import_stats_str = user_import.log_stats()
         if self.config["output"]["new_user_passwords"]:
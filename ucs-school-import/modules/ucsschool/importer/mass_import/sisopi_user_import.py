@@ -114,7 +114,7 @@ class SingleSourcePartialUserImport(UserImport):
             )
 
         if old_user:
-            imported_user.old_user = copy.deepcopy(old_user)
+            imported_user.old_user = old_user.snapshot()
             if old_user.school == self.limbo_ou:
                 self.logger.info(
                     "User %r is in limbo school %r, moving to %r.",
@@ -150,7 +150,9 @@ class SingleSourcePartialUserImport(UserImport):
                 imported_user.schools = old_user.schools
                 if self.config["school"] not in old_user.schools:
                     imported_user.schools.append(self.config["school"])
-                new_classes = copy.deepcopy(old_user.school_classes)
+                new_classes = {
+                    school: list(classes) for school, classes in old_user.school_classes.items()
+                }
                 new_classes.update(imported_user.school_classes)
                 imported_user.school_classes = new_classes
 
@@ -32,21 +32,38 @@
 
 """Default user import class."""
 
-import copy
+import concurrent.futures
 import datetime
+import itertools
 import logging
 import sys
+import threading
 from collections import defaultdict
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type, Union  # noqa: F401
+from operator import itemgetter
+from typing import (
+    TYPE_CHECKING,
+    Any,  # noqa: F401
+    Dict,  # noqa: F401
+    Iterator,  # noqa: F401
+    List,  # noqa: F401
+    Optional,  # noqa: F401
+    Set,  # noqa: F401
+    Tuple,  # noqa: F401
+    Type,  # noqa: F401
+    Union,  # noqa: F401
+)
 
 import six
 from ldap.filter import filter_format
 
 from ucsschool.lib.models.attributes import ValidationError
 from ucsschool.lib.models.base import NoObject, WrongObjectType
+from ucsschool.lib.models.utils import paged_search
+from univention.admin.uexceptions import noObject
 
 from ..configuration import Configuration
 from ..exceptions import (
+    ConfigurationError,
     CreationError,
     DeletionError,
     ModificationError,
@@ -58,13 +75,19 @@ from ..exceptions import (
     WrongUserType,
 )
 from ..factory import Factory
-from ..utils.import_pyhook import run_import_pyhooks
-from ..utils.ldap_connection import get_admin_connection, get_readonly_connection
+from ..utils.import_pyhook import get_import_pyhooks, run_import_pyhooks
+from ..utils.ldap_connection import (
+    get_admin_connection,
+    get_new_admin_connection,
+    get_readonly_connection,
+)
 from ..utils.post_read_pyhook import PostReadPyHook
+from ..utils.result_spool import SpooledResultList
 
 if TYPE_CHECKING:
     from ..configuration import ReadOnlyDict  # noqa: F401
     from ..models.import_user import ImportUser  # noqa: F401
+    from ..utils.ldap_connection import LoType  # noqa: F401
 
 
 class UserImport(object):
@@ -77,6 +100,14 @@ class UserImport(object):
     4. create_and_modify_users()
     5. log_stats()
     6. get_result_data()
+
+    or, in streaming mode (configuration option `streaming_window_size`):
+
+    1. read_and_create_and_modify_users()
+    2. detect_users_to_delete()
+    3. delete_users()
+    4. log_stats()
+    5. get_result_data()
     """
 
     def __init__(self, dry_run=True):
@@ -94,6 +125,13 @@ class UserImport(object):
         self.reader = self.factory.make_reader()
         self.ucr = self.factory.make_ucr()
         self.imported_users_len = 0
+        # (source_uid, record_uid) -> DN, filled by prefetch_existing_users()
+        self._existing_users = None  # type: Optional[Dict[Tuple[str, str], str]]
+        self._existing_users_other_roles = None  # type: Optional[Dict[Tuple[str, str], str]]
+        self._lock = threading.Lock()
+        # streaming mode: IDs of the users read and users with action "D" from the input data
+        self._imported_user_ids = None  # type: Optional[Set[Tuple[str, str]]]
+        self._imported_users_to_delete = []  # type: List[Tuple[str, str, List[str]]]
 
     def read_input(self):  # type: () -> List[ImportUser]
         """
@@ -105,22 +143,108 @@ class UserImport(object):
         :return: ImportUsers found in input
         :rtype: list(ImportUser)
         """
-        num = 1
         self.logger.info("------ Starting to read users from input data... ------")
+        self.imported_users.extend(self.iter_input())
+        run_import_pyhooks(PostReadPyHook, "all_entries_read", self.imported_users, self.errors)
+        self.logger.info("------ Read %d users from input data. ------", len(self.imported_users))
+        return self.imported_users
+
+    def iter_input(self):  # type: () -> Iterator[ImportUser]
+        """
+        Read users from input data, one at a time.
+
+        * :py:class:`UcsSchoolImportErrors` are stored in in `self.errors` (with input entry number in
+            `error.entry_count`).
+
+        :return: iterator over the ImportUsers found in input
+        :rtype: Iterator(ImportUser)
+        """
+        num = 1
         while True:
             try:
                 import_user = next(self.reader)
-                self.logger.info("Done reading %d. user: %s", num, import_user)
-                self.imported_users.append(import_user)
             except StopIteration:
-                run_import_pyhooks(PostReadPyHook, "all_entries_read", self.imported_users, self.errors)
                 break
             except UcsSchoolImportError as exc:
                 self.logger.exception("Error reading %d. user: %s", num, exc)
                 self._add_error(exc)
+            else:
+                self.logger.info("Done reading %d. user: %s", num, import_user)
+                yield import_user
             num += 1
-        self.logger.info("------ Read %d users from input data. ------", len(self.imported_users))
-        return self.imported_users
+
+    def read_and_create_and_modify_users(self, window_size):
+        # type: (int) -> Tuple[List[UcsSchoolImportError], Dict[str, List[Dict[str, Any]]], Dict[str, List[Dict[str, Any]]]]  # noqa: E501
+        """
+        Streaming mode: replaces :py:meth:`read_input()` and
+        :py:meth:`create_and_modify_users()`.
+
+        Users are read from the input data and created / modified in windows
+        of `window_size` users, so the memory usage does not depend on the
+        size of the input data:
+
+        * Only the IDs (`source_uid`, `record_uid`) of the users read are
+            retained. :py:meth:`detect_users_to_delete()` uses them and must
+            thus run *after* this method.
+        * `self.added_users` and `self.modified_users` are
+            :py:class:`SpooledResultList` objects, that store the results in
+            temporary files.
+        * The `all_entries_read` hook of :py:class:`PostReadPyHook` is not
+            supported.
+
+        :param int window_size: number of users to keep in memory
+        :return: (self.errors, self.added_users, self.modified_users)
+        :rtype: tuple(list[UcsSchoolImportError], dict[str, SpooledResultList],
+            dict[str, SpooledResultList])
+        """
+        if get_import_pyhooks(PostReadPyHook).get("all_entries_read"):
+            raise ConfigurationError(
+                "PostReadPyHook.all_entries_read() hooks cannot be used together with the "
+                "'streaming_window_size' configuration option."
+            )
+        self.logger.info(
+            "------ Reading, creating and modifying users (window size %d)... ------", window_size
+        )
+        # only a cheap estimate, the input is not parsed twice: if the reader cannot
+        # provide it, the total grows with the number of users read
+        self.imported_users_len = self.reader.count_entries() or 0
+        self._imported_user_ids = set()
+        added_users = defaultdict(SpooledResultList)  # type: Dict[str, SpooledResultList]
+        modified_users = defaultdict(SpooledResultList)  # type: Dict[str, SpooledResultList]
+        num_read = usernum = 0
+        input_users = self.iter_input()
+        while True:
+            window = list(itertools.islice(input_users, window_size))
+            if not window:
+                break
+            num_read += len(window)
+            # keep imported_users_len >= usernum, the estimate may be too low or missing
+            self.imported_users_len = max(self.imported_users_len, num_read)
+            for user in window:
+                self._imported_user_ids.add((user.source_uid, user.record_uid))
+                if user.action == "D":
+                    self._imported_users_to_delete.append(
+                        (user.source_uid, user.record_uid, user.input_data)
+                    )
+            num_users = len(window)
+            self._create_and_modify_users(window, usernum)  # empties window
+            usernum += num_users
+            for store, spool in ((self.added_users, added_users), (self.modified_users, modified_users)):
+                for cls_name, users in store.items():
+                    spool[cls_name].extend(users)
+                store.clear()
+        self.imported_users_len = num_read
+        self.added_users = added_users
+        self.modified_users = modified_users
+        num_added_users = sum(map(len, self.added_users.values()))
+        num_modified_users = sum(map(len, self.modified_users.values()))
+        self.logger.info(
+            "------ Read %d users from input data, created %d users, modified %d users. ------",
+            num_read,
+            num_added_users,
+            num_modified_users,
+        )
+        return self.errors, self.added_users, self.modified_users
 
     def create_and_modify_users(self, imported_users):
         # type: (List[ImportUser]) -> Tuple[List[UcsSchoolImportError], Dict[str, List[Dict[str, Any]]], Dict[str, List[Dict[str, Any]]]]  # noqa: E501
@@ -131,6 +255,9 @@ class UserImport(object):
             :py:class:`ImportUser` objects.
         * :py:class:`UcsSchoolImportErrors` are stored in `self.errors` (with failed
             :py:class:`ImportUser` objects in `error.import_user`).
+        * If the configuration option `parallel_workers` is larger than `1` (and
+            this is not a dry-run), the users are created and modified
+            concurrently, see :py:meth:`create_and_modify_users_concurrently()`.
 
         :param imported_users: ImportUser objects
         :type imported_users: :func:`list`
@@ -138,19 +265,37 @@ class UserImport(object):
         :rtype: tuple(list[UcsSchoolImportError], list[dict], list[dict])
         """
         self.logger.info("------ Creating / modifying users... ------")
-        usernum = 0
         self.imported_users_len = len(imported_users)
+        self._create_and_modify_users(imported_users)
+        num_added_users = sum(map(len, self.added_users.values()))
+        num_modified_users = sum(map(len, self.modified_users.values()))
+        self.logger.info(
+            "------ Created %d users, modified %d users. ------",
+            num_added_users,
+            num_modified_users,
+        )
+        return self.errors, self.added_users, self.modified_users
+
+    def _create_and_modify_users(self, imported_users, usernum=0):
+        # type: (List[ImportUser], int) -> None
+        """
+        Create and modify `imported_users` (the list is emptied).
+
+        :param imported_users: ImportUser objects
+        :type imported_users: :func:`list`
+        :param int usernum: number of users processed before (for progress reports)
+        :return: None
+        """
+        workers = int(self.config.get("parallel_workers", 1))
+        if workers > 1 and not self.dry_run:
+            self.create_and_modify_users_concurrently(imported_users, workers, usernum)
+            return
+        # consume the list from its end, pop(0) would be O(n)
+        imported_users.reverse()
         while imported_users:
-            imported_user = imported_users.pop(0)
+            imported_user = imported_users.pop()
             usernum += 1
-            percentage = 10 + 90 * usernum // self.imported_users_len  # 10% - 100%
-            self.progress_report(
-                description="Creating and modifying users: {}%.".format(percentage),
-                percentage=int(percentage),
-                done=usernum,
-                total=self.imported_users_len,
-                errors=len(self.errors),
-            )
+            self._report_create_and_modify_progress(usernum)
             if imported_user.action == "D":
                 continue
             try:
@@ -161,130 +306,278 @@ class UserImport(object):
                     imported_user,
                 )
                 user = self.determine_add_modify_action(imported_user)
-                cls_name = user.__class__.__name__
-
-                try:
-                    action_str = {"A": "Adding", "D": "Deleting", "M": "Modifying"}[user.action]
-                except KeyError:
-                    raise UnknownAction(
-                        "{}  (source_uid:{} record_uid: {}) has unknown action '{}'.".format(
-                            user, user.source_uid, user.record_uid, user.action
-                        ),
-                        entry_count=user.entry_count,
-                        import_user=user,
-                    )
+            except UcsSchoolImportError as exc:
+                self.logger.exception("Entry #%d: %s", exc.entry_count, exc)
+                self._add_error(exc)
+                continue
+            self.create_or_modify_user(user, usernum, self.connection)
 
-                if user.action in ["A", "M"]:
-                    _user = user.to_dict()  # sorted output
-                    self.logger.info(
-                        "%s %s (source_uid:%s record_uid:%s) attributes: {%s}...",
-                        action_str,
-                        user,
-                        user.source_uid,
-                        user.record_uid,
-                        ", ".join("{!r}: {!r}".format(k, _user[k]) for k in sorted(_user.keys())),
-                    )
-                # save password of new user for later export (NewUserPasswordCsvExporter):
-                password = user.password
-                try:
-                    if user.action == "A":
-                        err = CreationError  # type: Union[Type[CreationError], Type[ModificationError]]
-                        store = self.added_users[cls_name]  # type: List[Dict[str, Any]]
-                        if self.dry_run:
-                            user.validate(
-                                self.connection,
-                                validate_unlikely_changes=True,
-                                check_username=True,
-                            )
-                            if user.errors:
-                                raise ValidationError(user.errors.copy())
-                            user.call_hooks("pre", "create", self.connection)
-                            self.logger.info("Dry-run: skipping user.create() for %s.", user)
-                            success = True
-                            user.call_hooks("post", "create", self.connection)
-                        else:
-                            success = user.create(lo=self.connection)
-                    elif user.action == "M":
-                        err = ModificationError
-                        store = self.modified_users[cls_name]
-                        if self.dry_run:
-                            user.validate(
-                                self.connection,
-                                validate_unlikely_changes=True,
-                                check_username=False,
-                                check_name=False,
-                            )
-                            if user.errors:
-                                raise ValidationError(user.errors.copy())
-                            user.call_hooks("pre", "modify", self.connection)
-                            self.logger.info("Dry-run: skipping user.modify() for %s.", user)
-                            success = True
-                            user.call_hooks("post", "modify", self.connection)
-                        else:
-                            success = user.modify(lo=self.connection)
+    def create_and_modify_users_concurrently(self, imported_users, workers, usernum=0):
+        # type: (List[ImportUser], int, int) -> None
+        """
+        Create and modify users using a pool of `workers` threads, each with
+        its own LDAP connection.
+
+        The preparation of the users (:py:meth:`determine_add_modify_action()`),
+        which includes reserving usernames and email addresses, is done
+        serially. Only the LDAP write operations run concurrently. Users that
+        share a school class, work group, username or email address are never
+        processed at the same time (see :py:meth:`get_concurrency_keys()`).
+        The results are sorted by `entry_count` afterwards.
+
+        :param imported_users: ImportUser objects
+        :type imported_users: :func:`list`
+        :param int workers: number of worker threads
+        :param int usernum: number of users processed before (for progress reports)
+        :return: None
+        """
+        self.logger.info("Using %d worker threads to create / modify users.", workers)
+        num_errors = len(self.errors)
+        num_users = len(imported_users)
+        offset = usernum
+        users = []  # type: List[Tuple[int, ImportUser, List[Tuple[str, ...]]]]
+        imported_users.reverse()
+        while imported_users:
+            imported_user = imported_users.pop()
+            usernum += 1
+            # the preparation is reported as the first half of the work
+            self._report_create_and_modify_progress(offset + (usernum - offset) / 2.0, "Preparing users")
+            if imported_user.action == "D":
+                continue
+            try:
+                self.logger.debug(
+                    "Preparing user %d/%d %s...", usernum, self.imported_users_len, imported_user
+                )
+                user = self.determine_add_modify_action(imported_user)
+                users.append((usernum, user, sorted(self.get_concurrency_keys(user))))
+            except UcsSchoolImportError as exc:
+                self.logger.exception("Entry #%d: %s", exc.entry_count, exc)
+                self._add_error(exc)
+
+        self.prefetch_usernames([user for _usernum, user, _keys in users])
+
+        key_locks = {}  # type: Dict[Tuple[str, ...], threading.Lock]
+        for _usernum, _user, keys in users:
+            for key in keys:
+                key_locks.setdefault(key, threading.Lock())
+        thread_data = threading.local()
+
+        def work(usernum, user, keys):  # type: (int, ImportUser, List[Tuple[str, ...]]) -> None
+            if not hasattr(thread_data, "lo"):
+                thread_data.lo, _po = get_new_admin_connection()
+            # acquire locks in sorted order to prevent deadlocks
+            locks = [key_locks[key] for key in keys]
+            for lock in locks:
+                lock.acquire()
+            try:
+                # reopen UDM object with the connection of this thread
+                user._udm_obj_searched = False
+                self.create_or_modify_user(user, usernum, thread_data.lo)
+            finally:
+                for lock in reversed(locks):
+                    lock.release()
+
+        done = num_users - len(users)  # skipped users
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(work, *args) for args in users]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    future.result()
+                    done += 1
+                    self._report_create_and_modify_progress(offset + (num_users + done) / 2.0)
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+            finally:
+                for store in list(self.added_users.values()) + list(self.modified_users.values()):
+                    store.sort(key=itemgetter("entry_count"))
+                self.errors[num_errors:] = sorted(
+                    self.errors[num_errors:], key=lambda exc: exc.entry_count or 0
+                )
+
+    def prefetch_usernames(self, users):  # type: (List[ImportUser]) -> None
+        """
+        Let the username index load the usernames of `users` (all usernames
+        or in batches, see configuration option `username_uniqueness_index`),
+        before they are validated one by one in the worker threads.
+
+        :param list(ImportUser) users: users prepared by :py:meth:`determine_add_modify_action()`
+        :return: None
+        """
+        if not users or "uniqueness" in self.config.get("skip_tests", []):
+            return
+        users[0].username_index.prefetch(self.connection, [user.name for user in users])
+
+    def get_concurrency_keys(self, user):  # type: (ImportUser) -> Set[Tuple[str, ...]]
+        """
+        Get the keys of the (shared) resources a user modifies when it is
+        created or modified. Users with common keys are not processed
+        concurrently by :py:meth:`create_and_modify_users_concurrently()`.
+
+        :param ImportUser user: user that was prepared by :py:meth:`determine_add_modify_action()`
+        :return: set of tuples
+        :rtype: set(tuple(str))
+        """
+        keys = {("name", (user.name or "").lower())}
+        if user.email:
+            keys.add(("email", user.email.lower()))
+        for attr in ("school_classes", "workgroups"):
+            groups = getattr(user, attr, None)
+            if not isinstance(groups, dict):
+                continue
+            for school, group_names in groups.items():
+                for group_name in group_names:
+                    keys.add((attr, school.lower(), group_name.lower()))
+        return keys
+
+    def create_or_modify_user(self, user, usernum, lo):
+        # type: (ImportUser, int, LoType) -> None
+        """
+        Create or modify a single user, that was prepared by
+        :py:meth:`determine_add_modify_action()`.
+
+        * The users data is appended to `self.added_users` or
+            `self.modified_users`.
+        * :py:class:`UcsSchoolImportErrors` are stored in `self.errors`.
+
+        :param ImportUser user: user with `action` set
+        :param int usernum: number of user in the input data (for logging)
+        :param univention.admin.uldap.access lo: LDAP connection object to use
+        :return: None
+        """
+        try:
+            cls_name = user.__class__.__name__
+
+            try:
+                action_str = {"A": "Adding", "D": "Deleting", "M": "Modifying"}[user.action]
+            except KeyError:
+                raise UnknownAction(
+                    "{}  (source_uid:{} record_uid: {}) has unknown action '{}'.".format(
+                        user, user.source_uid, user.record_uid, user.action
+                    ),
+                    entry_count=user.entry_count,
+                    import_user=user,
+                )
+
+            if user.action in ["A", "M"]:
+                _user = user.to_dict()  # sorted output
+                self.logger.info(
+                    "%s %s (source_uid:%s record_uid:%s) attributes: {%s}...",
+                    action_str,
+                    user,
+                    user.source_uid,
+                    user.record_uid,
+                    ", ".join("{!r}: {!r}".format(k, _user[k]) for k in sorted(_user.keys())),
+                )
+            # save password of new user for later export (NewUserPasswordCsvExporter):
+            password = user.password
+            try:
+                if user.action == "A":
+                    err = CreationError  # type: Union[Type[CreationError], Type[ModificationError]]
+                    store = self.added_users[cls_name]  # type: List[Dict[str, Any]]
+                    if self.dry_run:
+                        user.validate(
+                            lo,
+                            validate_unlikely_changes=True,
+                            check_username=True,
+                        )
+                        if user.errors:
+                            raise ValidationError(user.errors.copy())
+                        user.call_hooks("pre", "create", lo)
+                        self.logger.info("Dry-run: skipping user.create() for %s.", user)
+                        success = True
+                        user.call_hooks("post", "create", lo)
+                    else:
+                        success = user.create(lo=lo)
+                elif user.action == "M":
+                    err = ModificationError
+                    store = self.modified_users[cls_name]
+                    if self.dry_run:
+                        user.validate(
+                            lo,
+                            validate_unlikely_changes=True,
+                            check_username=False,
+                            check_name=False,
+                        )
+                        if user.errors:
+                            raise ValidationError(user.errors.copy())
+                        user.call_hooks("pre", "modify", lo)
+                        self.logger.info("Dry-run: skipping user.modify() for %s.", user)
+                        success = True
+                        user.call_hooks("post", "modify", lo)
                     else:
-                        # delete
-                        continue
-                except ValidationError as exc:
-                    six.reraise(
-                        UserValidationError,
-                        UserValidationError(
-                            "ValidationError when {} {} "
-                            "(source_uid:{} record_uid: {}): {}".format(
-                                action_str.lower(),
-                                user,
-                                user.source_uid,
-                                user.record_uid,
-                                exc,
-                            ),
-                            validation_error=exc,
-                            import_user=user,
+                        success = user.modify(lo=lo)
+                else:
+                    # delete
+                    return
+            except ValidationError as exc:
+                six.reraise(
+                    UserValidationError,
+                    UserValidationError(
+                        "ValidationError when {} {} "
+                        "(source_uid:{} record_uid: {}): {}".format(
+                            action_str.lower(),
+                            user,
+                            user.source_uid,
+                            user.record_uid,
+                            exc,
                         ),
-                        sys.exc_info()[2],
-                    )
+                        validation_error=exc,
+                        import_user=user,
+                    ),
+                    sys.exc_info()[2],
+                )
 
-                if success:
-                    self.logger.info(
-                        "Success %s %d/%d %s (source_uid:%s record_uid: %s).",
+            if success:
+                self.logger.info(
+                    "Success %s %d/%d %s (source_uid:%s record_uid: %s).",
+                    action_str.lower(),
+                    usernum,
+                    self.imported_users_len,
+                    user,
+                    user.source_uid,
+                    user.record_uid,
+                )
+                user.password = password
+                with self._lock:
+                    store.append(user.to_dict())
+                if not self.dry_run:
+                    self._update_existing_users(user)
+            else:
+                raise err(
+                    "Error {} {}/{} {} (source_uid:{} record_uid: {}), does probably "
+                    "{}exist.".format(
                         action_str.lower(),
                         usernum,
                         self.imported_users_len,
                         user,
                         user.source_uid,
                         user.record_uid,
-                    )
-                    user.password = password
-                    store.append(user.to_dict())
-                else:
-                    raise err(
-                        "Error {} {}/{} {} (source_uid:{} record_uid: {}), does probably "
-                        "{}exist.".format(
-                            action_str.lower(),
-                            usernum,
-                            len(imported_users),
-                            user,
-                            user.source_uid,
-                            user.record_uid,
-                            "not " if user.action == "M" else "already ",
-                        ),
-                        entry_count=user.entry_count,
-                        import_user=user,
-                    )
+                        "not " if user.action == "M" else "already ",
+                    ),
+                    entry_count=user.entry_count,
+                    import_user=user,
+                )
 
-            except (CreationError, ModificationError) as exc:
-                self.logger.error("Entry #%d: %s", exc.entry_count, exc)  # traceback useless
-                self._add_error(exc)
-            except UcsSchoolImportError as exc:
-                self.logger.exception("Entry #%d: %s", exc.entry_count, exc)
-                self._add_error(exc)
-        num_added_users = sum(map(len, self.added_users.values()))
-        num_modified_users = sum(map(len, self.modified_users.values()))
-        self.logger.info(
-            "------ Created %d users, modified %d users. ------",
-            num_added_users,
-            num_modified_users,
+        except (CreationError, ModificationError) as exc:
+            self.logger.error("Entry #%d: %s", exc.entry_count, exc)  # traceback useless
+            self._add_error(exc)
+        except UcsSchoolImportError as exc:
+            self.logger.exception("Entry #%d: %s", exc.entry_count, exc)
+            self._add_error(exc)
+
+    def _report_create_and_modify_progress(self, usernum, description="Creating and modifying users"):
+        # type: (float, str) -> None
+        total = max(self.imported_users_len, 1)
+        percentage = 10 + int(90 * min(usernum, total) // total)  # 10% - 100%
+        self.progress_report(
+            description="{}: {}%.".format(description, percentage),
+            percentage=percentage,
+            done=int(usernum),
+            total=self.imported_users_len,
+            errors=len(self.errors),
         )
-        return self.errors, self.added_users, self.modified_users
 
     def find_importuser_in_ldap(self, import_user):  # type: (ImportUser) -> ImportUser
         """
@@ -297,6 +590,8 @@ class UserImport(object):
         :raises WrongUserType: if the user in LDAP is not of the same type as the `import_user` object
         """
         try:
+            if self.config.get("prefetch_existing_users"):
+                return self._find_importuser_in_prefetched_users(import_user)
             return import_user.get_by_import_id(
                 self.connection, import_user.source_uid, import_user.record_uid
             )
@@ -311,6 +606,106 @@ class UserImport(object):
                 sys.exc_info()[2],
             )
 
+    def _find_importuser_in_prefetched_users(self, import_user):  # type: (ImportUser) -> ImportUser
+        """
+        Fetch fresh :py:class:`ImportUser` object from LDAP, using the index
+        created by :py:meth:`prefetch_existing_users()` to find its DN.
+
+        :param ImportUser import_user: ImportUser object to use as reference for search
+        :return: fresh ImportUser object
+        :rtype: ImportUser
+        :raises NoObject: if ImportUser cannot be found
+        :raises WrongObjectType: if the user in LDAP is not of the same type as the `import_user`
+            object
+        """
+        if not import_user.source_uid or not import_user.record_uid:
+            # let get_by_import_id() raise MissingUid
+            return import_user.get_by_import_id(
+                self.connection, import_user.source_uid, import_user.record_uid
+            )
+        if self._existing_users is None:
+            self.prefetch_existing_users()
+        key = (import_user.source_uid, import_user.record_uid)
+        dn = self._existing_users.get(key)
+        if dn:
+            try:
+                return import_user.from_dn(dn, None, self.connection)
+            except noObject:
+                # user was moved or deleted since the index was created
+                self.logger.debug("Prefetched DN %r of %r is outdated.", dn, import_user)
+                del self._existing_users[key]
+                return import_user.get_by_import_id(
+                    self.connection, import_user.source_uid, import_user.record_uid
+                )
+        dn = self._existing_users_other_roles.get(key)
+        if dn:
+            raise WrongObjectType(dn, import_user.__class__)
+        raise NoObject(
+            "No {} with source_uid={!r} and record_uid={!r} found.".format(
+                self.config.get("user_role", "user") or "User",
+                import_user.source_uid,
+                import_user.record_uid,
+            )
+        )
+
+    def _update_existing_users(self, user):  # type: (ImportUser) -> None
+        """Store the current DN of a created or moved user in the prefetched users index."""
+        if self._existing_users is not None:
+            self._existing_users[(user.source_uid, user.record_uid)] = user.dn
+
+    def prefetch_existing_users(self):  # type: () -> None
+        """
+        Load the IDs and DNs of all existing users of the configured
+        `source_uid` using paged LDAP searches.
+
+        The resulting index is used by :py:meth:`find_importuser_in_ldap()`
+        instead of running one search per input entry, and by
+        :py:meth:`get_ids_of_existing_users()`. Used when the configuration
+        option `prefetch_existing_users` is enabled.
+        """
+        attr = ["ucsschoolSourceUID", "ucsschoolRecordUID"]
+        filter_s = self.get_prefetch_users_search_filter()
+        self.logger.info("Prefetching existing users with filter=%r...", filter_s)
+        self._existing_users = self._search_ids_and_dns(filter_s, attr)
+        # users with matching IDs, but of another role, lead to a WrongUserType error
+        filter_s = filter_format(
+            "(&(ucsschoolSourceUID=%s)(ucsschoolRecordUID=*))", (self.config["source_uid"],)
+        )
+        self._existing_users_other_roles = {
+            key: dn
+            for key, dn in self._search_ids_and_dns(filter_s, attr).items()
+            if key not in self._existing_users
+        }
+        self.logger.info(
+            "Prefetched %d existing users (and %d users with other roles).",
+            len(self._existing_users),
+            len(self._existing_users_other_roles),
+        )
+
+    def _search_ids_and_dns(self, filter_s, attr):
+        # type: (str, List[str]) -> Dict[Tuple[str, str], str]
+        return {
+            (
+                attrs["ucsschoolSourceUID"][0].decode("utf-8"),
+                attrs["ucsschoolRecordUID"][0].decode("utf-8"),
+            ): dn
+            for dn, attrs in paged_search(self.connection, filter_s, attr=attr)
+        }
+
+    def get_prefetch_users_search_filter(self):  # type: () -> str
+        """
+        Create LDAP filter with which to find all users that
+        :py:meth:`find_importuser_in_ldap()` may return.
+
+        Must match all users that :py:meth:`ImportUser.get_by_import_id()`
+        would find for the configured `source_uid`. This is the same as
+        :py:meth:`UserImport.get_existing_users_search_filter()`.
+
+        :return: LDAP filter
+        :rtype: str
+        """
+        return UserImport.get_existing_users_search_filter(self)
+
     def prepare_imported_user(self, imported_user, old_user):
         # type: (ImportUser, Optional[ImportUser]) -> ImportUser
         """
@@ -325,7 +720,7 @@ class UserImport(object):
         :rtype: ImportUser
         """
         if old_user:
-            imported_user.old_user = copy.deepcopy(old_user)
+            imported_user.old_user = old_user.snapshot()
         imported_user.prepare_all(new_user=not old_user)
         imported_user.action = "M" if old_user else "A"
         return imported_user
@@ -368,6 +763,8 @@ class UserImport(object):
                     imported_user.school,
                 )
                 user = self.school_move(imported_user, user)
+                if not self.dry_run:
+                    self._update_existing_users(user)
         user.update(imported_user)
         if (
             user.disabled != "0"
@@ -407,6 +804,13 @@ class UserImport(object):
         """
         attr = ["ucsschoolSourceUID", "ucsschoolRecordUID"]
         filter_s = self.get_existing_users_search_filter()
+        if (
+            self.config.get("prefetch_existing_users")
+            and filter_s == self.get_prefetch_users_search_filter()
+        ):
+            if self._existing_users is None:
+                self.prefetch_existing_users()
+            return list(self._existing_users)
         self.logger.debug("Searching with filter=%r", filter_s)
         ucs_ldap_users = self.connection.search(filter_s, attr=attr)
         return [
@@ -421,6 +825,10 @@ class UserImport(object):
         """
         Find difference between source database and UCS user database.
 
+        In streaming mode (:py:meth:`read_and_create_and_modify_users()`) the
+        IDs of the users read from the input data are used instead of
+        `self.imported_users`.
+
         :return: list of tuples: [(source_uid, record_uid, input_data), ..]
         :rtype: list(tuple(str, str, list(str)))
         """
@@ -431,6 +839,8 @@ class UserImport(object):
                 "------ Looking only for users with action='D' (no_delete=%r) ------",
                 self.config["no_delete"],
             )
+            if self._imported_user_ids is not None:
+                return list(self._imported_users_to_delete)
             return [
                 (user.source_uid, user.record_uid, user.input_data)
                 for user in self.imported_users
@@ -438,7 +848,10 @@ class UserImport(object):
             ]
 
         ucs_user_ids = set(self.get_ids_of_existing_users())
-        imported_user_ids = {(iu.source_uid, iu.record_uid) for iu in self.imported_users}
+        if self._imported_user_ids is not None:
+            imported_user_ids = self._imported_user_ids
+        else:
+            imported_user_ids = {(iu.source_uid, iu.record_uid) for iu in self.imported_users}
         users_to_delete = ucs_user_ids - imported_user_ids
         users_to_delete = [(u[0], u[1], []) for u in users_to_delete]
         self.logger.debug("users_to_delete=%r", users_to_delete)
@@ -805,8 +1218,10 @@ class UserImport(object):
         :raises TooManyErrors: if the number of countable exceptions exceeds the number of tolerable
             errors
         """
-        self.errors.append(exc)
-        if -1 < self.config["tolerate_errors"] < len([x for x in self.errors if x.is_countable]):
+        with self._lock:
+            self.errors.append(exc)
+            num_errors = len([x for x in self.errors if x.is_countable])
+        if -1 < self.config["tolerate_errors"] < num_errors:
             raise TooManyErrors(
                 "More than {} errors.".format(self.config["tolerate_errors"]),
                 self.errors,
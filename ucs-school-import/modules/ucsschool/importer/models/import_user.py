@@ -90,6 +90,7 @@ from ..factory import Factory
 from ..utils.format_pyhook import FormatPyHook
 from ..utils.import_pyhook import get_import_pyhooks
 from ..utils.ldap_connection import get_admin_connection, get_readonly_connection
+from ..utils.username_index import UsernameUniquenessTuple  # noqa: F401
 from ..utils.utils import get_ldap_mapping_for_udm_property
 
 if TYPE_CHECKING:
@@ -100,10 +101,10 @@ if TYPE_CHECKING:
     from ..reader.base_reader import BaseReader  # noqa: F401
     from ..utils.ldap_connection import LoType, UdmObjectType  # noqa: F401
     from ..utils.username_handler import UsernameHandler  # noqa: F401
+    from ..utils.username_index import UsernameIndex  # noqa: F401
 
 
 FunctionSignature = namedtuple("FunctionSignature", ["name", "args", "kwargs"])
-UsernameUniquenessTuple = namedtuple("UsernameUniquenessTuple", ["record_uid", "source_uid", "dn"])
 ALLOWED_CHARS_IN_SCHOOL_CLASS_NAME = set(string.digits + string.ascii_letters + " -._")
 UNIQUENESS = "uniqueness"
 
@@ -151,7 +152,7 @@ class ImportUser(User):
     )
     prop = uadmin_property("_replace")
     _all_school_names = None  # type: Iterable[str]
-    _all_usernames = {}  # type: Dict[str, UsernameUniquenessTuple]
+    _username_index = None  # type: Optional[UsernameIndex]
     _attribute_udm_names = None  # type: Dict[str, str]
     _prop_regex = re.compile(r"<(.*?)(:.*?)*>")
     _prop_providers = {
@@ -311,11 +312,9 @@ class ImportUser(User):
         old_dn = self.old_dn
         res = super(ImportUser, self).change_school(school, lo)
         if res and UNIQUENESS not in self.config.get("skip_tests", []):
-            # rewrite _unique_ids and _all_usernames, replacing old DN with new DN
+            # rewrite _unique_ids and username_index, replacing old DN with new DN
             self._unique_ids_replace_dn(old_dn, self.dn)
-            self._all_usernames[self.name] = UsernameUniquenessTuple(
-                self.record_uid, self.source_uid, self.dn
-            )
+            self.username_index.add(self.name, self.record_uid, self.source_uid, self.dn)
         return res
 
     @classmethod
@@ -380,9 +379,7 @@ class ImportUser(User):
                 lo, validate, check_password_policies=check_password_policies
             )
         if UNIQUENESS not in self.config.get("skip_tests", []):
-            self._all_usernames[self.name] = UsernameUniquenessTuple(
-                self.record_uid, self.source_uid, self.dn
-            )
+            self.username_index.add(self.name, self.record_uid, self.source_uid, self.dn)
         return res
 
     def create_without_hooks_roles(self, lo):  # type: (LoType) -> None
@@ -1064,10 +1061,8 @@ class ImportUser(User):
             and self.old_user.name != self.name
             and UNIQUENESS not in self.config.get("skip_tests", [])
         ):
-            del self._all_usernames[self.old_user.name]
-            self._all_usernames[self.name] = UsernameUniquenessTuple(
-                self.record_uid, self.source_uid, self.dn
-            )
+            self.username_index.remove(self.old_user.name)
+            self.username_index.add(self.name, self.record_uid, self.source_uid, self.dn)
         return res
 
     def modify_without_hooks(self, lo, validate=True, move_if_necessary=None):
@@ -1338,31 +1333,16 @@ class ImportUser(User):
         self.check_schools(lo)
 
         if UNIQUENESS not in skip_tests:
-            if not self._all_usernames:
-                # fetch usernames of all users only once per import job
-                # its faster to filter out computer names in Python than in LDAP
-                # (and we have to loop over the query result anyway)
-                self.__class__._all_usernames = {
-                    attr["uid"][0].decode("UTF-8"): UsernameUniquenessTuple(
-                        attr.get("ucsschoolRecordUID", [b""])[0].decode("UTF-8") or None,
-                        attr.get("ucsschoolSourceUID", [b""])[0].decode("UTF-8") or None,
-                        dn,
-                    )
-                    for dn, attr in lo.search(
-                        "objectClass=posixAccount",
-                        attr=["uid", "ucsschoolRecordUID", "ucsschoolSourceUID"],
-                    )
-                    if not attr["uid"][0].endswith(b"$")
-                }
-            self._check_username_uniqueness()
+            self._check_username_uniqueness(lo)
 
-    def _check_username_uniqueness(self):  # type: () -> None
+    def _check_username_uniqueness(self, lo):  # type: (LoType) -> None
         """
         Check that :py:attr:`self.name` is not already in use by another user.
 
+        :param univention.admin.uldap.access connection lo: LDAP connection object
         :raises UniqueIdError: if username is already taken by another user
         """
-        uut = self._all_usernames.get(self.name)
+        uut = self.username_index.get(lo, self.name)
         if uut and (uut.record_uid != self.record_uid or uut.source_uid != self.source_uid):
             raise UniqueIdError(
                 "Username {!r} is already in use by {!r} (source_uid: {!r}, record_uid: {!r}).".format(
@@ -1408,6 +1388,18 @@ class ImportUser(User):
         """
         return ",".join(",".join(sc) for sc in self.school_classes.values())
 
+    @classmethod
+    def release_reserved_counters(cls):  # type: () -> None
+        """
+        Give back the username and email address counter numbers that were
+        reserved, but not used by the handlers (see configuration option
+        `counter_reservation_size`).
+        """
+        for handler in list(cls._username_handler_cache.values()) + list(
+            cls._unique_email_handler_cache.values()
+        ):
+            handler.release_reserved_counters()
+
     @property
     def unique_email_handler(self):  # type: () -> UsernameHandler
         key = self.config["dry_run"]
@@ -1417,6 +1409,22 @@ class ImportUser(User):
             )
         return self._unique_email_handler_cache[key]
 
+    @classmethod
+    def reset_username_index(cls):  # type: () -> None
+        """
+        Drop the index of the usernames in use, so the next lookup creates a
+        new one. Called at the start of every import job, as users may have
+        been created, renamed or removed since the previous job in this process.
+        """
+        ImportUser._username_index = None
+
+    @property
+    def username_index(self):  # type: () -> UsernameIndex
+        # one index for all ImportUser subclasses, reset for every import job
+        if ImportUser._username_index is None:
+            ImportUser._username_index = self.factory.make_username_index()
+        return ImportUser._username_index
+
     @property
     def username_handler(self):  # type: () -> UsernameHandler
         key = (self.username_max_length, self.config["dry_run"])
@@ -1619,6 +1627,11 @@ class ImportUser(User):
             res[attr] = getattr(self, attr)
         return res
 
+    def snapshot(self):  # type: () -> ImportUser
+        obj = super(ImportUser, self).snapshot()
+        obj._used_methods = defaultdict(list)
+        return obj
+
     def update(self, other):  # type: (ImportUser) -> None
         """
         Copy attributes of other ImportUser into this one.
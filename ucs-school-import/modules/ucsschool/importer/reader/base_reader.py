@@ -141,6 +141,16 @@ class BaseReader(object):
         """
         raise NotImplementedError()
 
+    def count_entries(self):  # type: () -> Optional[int]
+        """
+        Estimate the number of entries in the input data without parsing it.
+        Used to report the progress in streaming mode.
+
+        :return: number of entries or `None` if it cannot be determined cheaply
+        :rtype: int or None
+        """
+        return None
+
     def get_data_mapping(self, input_data):  # type: (Iterable[str]) -> Dict[str, Any]
         """
         IMPLEMENT ME
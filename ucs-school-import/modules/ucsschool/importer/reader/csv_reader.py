@@ -190,6 +190,20 @@ class CsvReader(BaseReader):
         delimiter = self.config.get("csv", {}).get("delimiter")
         return Sniffer().sniff(py3_decode(fp.read(8192), encoding), delimiters=delimiter)
 
+    def count_entries(self):  # type: () -> Optional[int]
+        """
+        Count the non-empty lines after the header lines of the CSV file.
+
+        Line breaks in quoted values are counted as well, so the result is an
+        upper bound of the number of entries.
+
+        :return: number of lines with data
+        :rtype: int
+        """
+        with open(self.filename, "rb") as fp:
+            lines = sum(1 for line in fp if line.strip())
+        return max(lines - self.header_lines, 0)
+
     def read(self, *args, **kwargs):  # type: (*Any, **Any) -> Iterator[Dict[Text, Text]]
         """
         Generate dicts from a CSV file.
@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Univention UCS@school
+#
+# Copyright 2024 Univention GmbH
+#
+# https://www.univention.de/
+#
+# All rights reserved.
+#
+# The source code of this program is made available
+# under the terms of the GNU Affero General Public License version 3
+# (GNU AGPL V3) as published by the Free Software Foundation.
+#
+# Binary versions of this program provided by Univention to you as
+# well as other copyrighted, protected or trademarked materials like
+# Logos, graphics, fonts, specific documentations and configurations,
+# cryptographic keys etc. are subject to a license agreement between
+# you and Univention and not subject to the GNU AGPL V3.
+#
+# In the case you use this program under the terms of the GNU AGPL V3,
+# the program is provided in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public
+# License with the Debian GNU/Linux or Univention distribution in file
+# /usr/share/common-licenses/AGPL-3; if not, see
+# <http://www.gnu.org/licenses/>.
+
+"""Disk backed storage for the results of an import job."""
+
+import heapq
+import itertools
+import os
+import pickle
+import struct
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union  # noqa: F401
+
+_LENGTH = struct.Struct("!I")
+
+
+class SpooledResultList(object):
+    """
+    Append-only list of result dicts (see :py:meth:`ImportUser.to_dict()`),
+    that is stored in a temporary file instead of in memory.
+
+    Used by the streaming mode of :py:class:`UserImport`. Supports the subset
+    of the list API used by the result exporters, the result hooks and
+    :py:meth:`UserImport.log_stats()`: `append()`, `extend()`, `len()`,
+    iteration, indexing and slicing. Indexing and slicing read the file
+    sequentially.
+
+    The `old_user` entry of the dicts is not stored, as :py:class:`ImportUser`
+    objects cannot be pickled.
+    """
+
+    def __init__(self):  # type: () -> None
+        self._file = tempfile.TemporaryFile(prefix="ucsschool-import-results-")
+        self._len = 0
+
+    def append(self, item):  # type: (Dict[str, Any]) -> None
+        data = pickle.dumps(dict(item, old_user=None), pickle.HIGHEST_PROTOCOL)
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(_LENGTH.pack(len(data)))
+        self._file.write(data)
+        self._len += 1
+
+    def extend(self, items):  # type: (Iterable[Dict[str, Any]]) -> None
+        for item in items:
+            self.append(item)
+
+    def close(self):  # type: () -> None
+        self._file.close()
+
+    def __len__(self):  # type: () -> int
+        return self._len
+
+    def __bool__(self):  # type: () -> bool
+        return self._len > 0
+
+    __nonzero__ = __bool__
+
+    def __iter__(self):  # type: () -> Iterator[Dict[str, Any]]
+        self._file.flush()
+        pos = 0
+        for _ in range(self._len):
+            # seek every time, the file may be appended to between two items
+            self._file.seek(pos)
+            (length,) = _LENGTH.unpack(self._file.read(_LENGTH.size))
+            data = self._file.read(length)
+            pos += _LENGTH.size + length
+            yield pickle.loads(data)
+
+    def __getitem__(self, index):
+        # type: (Union[int, slice]) -> Union[Dict[str, Any], List[Dict[str, Any]]]
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step < 1:
+                return list(self)[index]
+            return list(itertools.islice(self, start, stop, step))
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("SpooledResultList index out of range")
+        return next(itertools.islice(self, index, None))
+
+    def __repr__(self):  # type: () -> str
+        return "{}(len={})".format(self.__class__.__name__, self._len)
+
+
+def merge_by_entry_count(*iterables):  # type: (*Iterable[Any]) -> Iterator[Any]
+    """
+    Merge result dicts, :py:class:`ImportUser` and
+    :py:class:`UcsSchoolImportError` objects into a single iterator sorted by
+    their `entry_count`.
+
+    :py:class:`SpooledResultList` objects are already sorted and are read
+    lazily, all other iterables are sorted in memory first.
+
+    :param iterables: lists or :py:class:`SpooledResultList` objects
+    :return: iterator over all items of `iterables`, ordered by `entry_count`
+    :rtype: Iterator
+    """
+
+    def entry_count(obj):  # type: (Any) -> int
+        return int(obj["entry_count"]) if isinstance(obj, dict) else int(obj.entry_count)
+
+    def decorate(num, iterable):  # type: (int, Iterable[Any]) -> Iterator[Tuple[int, int, int, Any]]
+        if not isinstance(iterable, SpooledResultList):
+            iterable = sorted(iterable, key=entry_count)
+        # (num, pos) keep the order of the input stable and prevent comparing the objects
+        for pos, obj in enumerate(iterable):
+            yield entry_count(obj), num, pos, obj
+
+    merged = heapq.merge(*[decorate(num, iterable) for num, iterable in enumerate(iterables)])
+    return (obj for _entry_count, _num, _pos, obj in merged)
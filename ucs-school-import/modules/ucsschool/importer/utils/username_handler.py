@@ -36,16 +36,22 @@ from __future__ import absolute_import
 import logging
 import re
 import string
-from typing import TYPE_CHECKING, Callable, Dict, Optional  # noqa: F401
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional  # noqa: F401
 
 import lazy_object_proxy
 from ldap.dn import escape_dn_chars
 from six import PY3, string_types
 
-from univention.admin.uexceptions import noObject, objectExists
+from univention.admin.uexceptions import ldapError, noObject, objectExists
 
 from ..configuration import Configuration
-from ..exceptions import BadValueStored, FormatError, NameKeyExists, NoValueStored
+from ..exceptions import (
+    BadValueStored,
+    FormatError,
+    NameKeyExists,
+    NoValueStored,
+    StoredValueChanged,
+)
 from .ldap_connection import get_admin_connection, get_unprivileged_connection
 
 if TYPE_CHECKING:
@@ -53,6 +59,8 @@ if TYPE_CHECKING:
 
 
 class NameCounterStorageBackend(object):
+    reserve_max_retries = 10
+
     def create(self, name, value):  # type: (str, int) -> None
         """
         Store a value for a new name.
@@ -76,6 +84,73 @@ class NameCounterStorageBackend(object):
         """
         raise NotImplementedError()
 
+    def compare_and_swap(self, name, old_value, new_value):  # type: (str, int, int) -> None
+        """
+        Store a value for an existing name, if the currently stored value is
+        still `old_value`.
+
+        The default implementation cannot detect concurrent changes and just
+        calls :py:meth:`modify()`.
+
+        :param str name: name
+        :param int old_value: value that is expected to be stored
+        :param int new_value: new value
+        :return: None
+        :raises NoValueStored: if no value is stored by that `name`
+        :raises StoredValueChanged: if the stored value is not `old_value`
+        """
+        self.modify(name, old_value, new_value)
+
+    def reserve(self, name, count):  # type: (str, int) -> int
+        """
+        Atomically raise the value stored for `name` by `count`, reserving
+        the numbers `[value, value + count)` for the caller. If no value is
+        stored yet, the reserved numbers start at `1`.
+
+        :param str name: name
+        :param int count: number of values to reserve
+        :return: the first reserved number
+        :rtype: int
+        :raises StoredValueChanged: if the value was changed concurrently too often
+        """
+        for _ in range(self.reserve_max_retries):
+            try:
+                num = self.retrieve(name)
+            except NoValueStored:
+                try:
+                    self.create(name, 1 + count)
+                    return 1
+                except NameKeyExists:
+                    continue  # created concurrently
+            try:
+                self.compare_and_swap(name, num, num + count)
+                return num
+            except (NoValueStored, StoredValueChanged):
+                continue  # changed concurrently
+        raise StoredValueChanged(
+            "Could not reserve {} numbers for name {!r}, it was changed concurrently {} times.".format(
+                count, name, self.reserve_max_retries
+            )
+        )
+
+    def release(self, name, reserved_end, next_value):  # type: (str, int, int) -> bool
+        """
+        Give back the unused numbers `[next_value, reserved_end)` of a
+        reservation made with :py:meth:`reserve()`. This is only possible, if
+        no other numbers were reserved since.
+
+        :param str name: name
+        :param int reserved_end: the value stored after the reservation
+        :param int next_value: the first unused number
+        :return: whether the numbers were given back
+        :rtype: bool
+        """
+        try:
+            self.compare_and_swap(name, reserved_end, next_value)
+        except (NoValueStored, StoredValueChanged):
+            return False
+        return True
+
     def retrieve(self, name):  # type: (str) -> int
         """
         Retrieve a value for a name.
@@ -148,6 +223,24 @@ class LdapStorageBackend(NameCounterStorageBackend):
         except noObject:
             raise NoValueStored("Name {!r} not found.".format(name))
 
+    def compare_and_swap(self, name, old_value, new_value):  # type: (str, int, int) -> None
+        # Deleting a specific value fails, if it is not stored (anymore). Together with adding the
+        # new value in the same LDAP operation, this makes the change atomic.
+        try:
+            self.lo.modify(
+                "cn={},{}".format(escape_dn_chars(name), self.ldap_base),
+                [
+                    ("ucsschoolUsernameNextNumber", str(old_value).encode("UTF-8"), None),
+                    ("ucsschoolUsernameNextNumber", None, str(new_value).encode("UTF-8")),
+                ],
+            )
+        except noObject:
+            raise NoValueStored("Name {!r} not found.".format(name))
+        except ldapError as exc:
+            raise StoredValueChanged(
+                "Value for name {!r} is not {!r} anymore: {}".format(name, old_value, exc)
+            )
+
     def retrieve(self, name):  # type: (str) -> int
         try:
             res = self.lo.get(
@@ -302,6 +395,8 @@ class UsernameHandler(object):
         self.replacement_variable_pattern = re.compile(
             r"(%s)" % "|".join(map(re.escape, self.counter_variable_to_function.keys())), flags=re.I
         )
+        # name base -> [next reserved number, end of reservation]
+        self._reserved_counters = {}  # type: Dict[str, List[int]]
 
     def __repr__(self):  # type: () -> str
         return "{}(max_length={!r}, dry_run={!r})".format(
@@ -314,6 +409,10 @@ class UsernameHandler(object):
             string.ascii_letters + string.digits + str(self.config["username"]["allowed_special_chars"])
         )
 
+    @property
+    def counter_reservation_size(self):  # type: () -> int
+        return max(1, int(self.config.get("counter_reservation_size", 1)))
+
     def get_storage_backend(self):  # type: () -> NameCounterStorageBackend
         """
         :return: NameCounterStorageBackend instance
@@ -460,20 +559,53 @@ class UsernameHandler(object):
         Returns the current counter value or initial_value if unset and stores
         it raised by 1.
 
+        If the configuration option `counter_reservation_size` is larger than
+        `1`, that many numbers are reserved in the storage backend at once
+        and then used up locally. Call :py:meth:`release_reserved_counters()`
+        at the end of the import job to give back unused numbers.
+
         :param str name_base: name without []
         :param str initial_value: lowest value
         :return: current counter value
         :rtype: str
         """
-        try:
-            num = self.storage_backend.retrieve(name_base)
-            self.storage_backend.modify(name_base, num, num + 1)
-            res = str(num)
-        # not handling BadValueStored, because a data corruption should stop the import
-        except NoValueStored:
-            res = initial_value
-            self.storage_backend.create(name_base, 2)
-        return res
+        num, end = self._reserved_counters.get(name_base, (0, 0))
+        if num >= end:
+            # not handling BadValueStored, because a data corruption should stop the import
+            count = self.counter_reservation_size
+            num = self.storage_backend.reserve(name_base, count)
+            end = num + count
+        self._reserved_counters[name_base] = [num + 1, end]
+        return initial_value if num == 1 else str(num)
+
+    def release_reserved_counters(self):  # type: () -> None
+        """
+        Give back the reserved but unused counter numbers to the storage
+        backend. Numbers cannot be given back, if another import job has
+        reserved numbers for the same name since. They will then not be used.
+
+        :return: None
+        """
+        for name_base, (num, end) in self._reserved_counters.items():
+            if num >= end:
+                continue
+            if self.storage_backend.release(name_base, end, num):
+                self.logger.debug(
+                    "Released %s counter numbers %d-%d of %r.",
+                    self.attribute_name,
+                    num,
+                    end - 1,
+                    name_base,
+                )
+            else:
+                self.logger.info(
+                    "Could not release %s counter numbers %d-%d of %r, they will not be used.",
+                    self.attribute_name,
+                    num,
+                    end - 1,
+                    name_base,
+                )
+        self._reserved_counters.clear()
 
 
 class EmailHandler(UsernameHandler):
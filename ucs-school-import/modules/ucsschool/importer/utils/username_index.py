@@ -0,0 +1,205 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Univention UCS@school
+#
+# Copyright 2024 Univention GmbH
+#
+# https://www.univention.de/
+#
+# All rights reserved.
+#
+# The source code of this program is made available
+# under the terms of the GNU Affero General Public License version 3
+# (GNU AGPL V3) as published by the Free Software Foundation.
+#
+# Binary versions of this program provided by Univention to you as
+# well as other copyrighted, protected or trademarked materials like
+# Logos, graphics, fonts, specific documentations and configurations,
+# cryptographic keys etc. are subject to a license agreement between
+# you and Univention and not subject to the GNU AGPL V3.
+#
+# In the case you use this program under the terms of the GNU AGPL V3,
+# the program is provided in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public
+# License with the Debian GNU/Linux or Univention distribution in file
+# /usr/share/common-licenses/AGPL-3; if not, see
+# <http://www.gnu.org/licenses/>.
+
+"""Indexes of the usernames in use, for the uniqueness check of usernames."""
+
+import threading
+from collections import namedtuple
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple  # noqa: F401
+
+from ldap.filter import filter_format
+
+if TYPE_CHECKING:
+    from .ldap_connection import LoType  # noqa: F401
+
+UsernameUniquenessTuple = namedtuple("UsernameUniquenessTuple", ["record_uid", "source_uid", "dn"])
+
+
+class UsernameIndex(object):
+    """
+    Index of the usernames in use. Used by :py:meth:`ImportUser.validate()`
+    to check that a username is not already used by another user.
+
+    The import updates the index through :py:meth:`add()` and
+    :py:meth:`remove()` when it creates or renames users.
+    """
+
+    ldap_attributes = ["uid", "ucsschoolRecordUID", "ucsschoolSourceUID"]
+
+    def get(self, lo, name):  # type: (LoType, str) -> Optional[UsernameUniquenessTuple]
+        """
+        Get the user, that has the username `name`.
+
+        :param lo: LDAP connection object
+        :param str name: username
+        :return: IDs and DN of the user or None if the username is not in use
+        :rtype: UsernameUniquenessTuple or None
+        """
+        raise NotImplementedError()
+
+    def prefetch(self, lo, names):  # type: (LoType, Iterable[str]) -> None
+        """
+        Hint, that the usernames `names` will be looked up soon. Allows
+        implementations to fetch them in batches.
+
+        :param lo: LDAP connection object
+        :param names: usernames
+        :return: None
+        """
+
+    def add(self, name, record_uid, source_uid, dn):  # type: (str, str, str, str) -> None
+        """
+        Store that the username `name` is in use by a user.
+
+        :param str name: username
+        :param str record_uid: record_uid of the user
+        :param str source_uid: source_uid of the user
+        :param str dn: DN of the user
+        :return: None
+        """
+        raise NotImplementedError()
+
+    def remove(self, name):  # type: (str) -> None
+        """
+        Store that the username `name` is not in use anymore.
+
+        :param str name: username
+        :return: None
+        """
+        raise NotImplementedError()
+
+    @staticmethod
+    def from_ldap(dn, attr):
+        # type: (str, Dict[str, List[bytes]]) -> Tuple[str, UsernameUniquenessTuple]
+        """
+        Create index entry from LDAP search result.
+
+        :param str dn: DN of the user
+        :param dict attr: LDAP attributes of the user (:py:attr:`ldap_attributes`)
+        :return: username and index entry
+        :rtype: tuple(str, UsernameUniquenessTuple)
+        """
+        return attr["uid"][0].decode("UTF-8"), UsernameUniquenessTuple(
+            attr.get("ucsschoolRecordUID", [b""])[0].decode("UTF-8") or None,
+            attr.get("ucsschoolSourceUID", [b""])[0].decode("UTF-8") or None,
+            dn,
+        )
+
+
+class MemoryUsernameIndex(UsernameIndex):
+    """
+    Fetches the usernames of all users once per import job (in
+    :py:meth:`prefetch()` or on the first lookup) and keeps them in memory.
+    Fast lookups, but the initial search is expensive in directories with
+    many users.
+    """
+
+    def __init__(self):  # type: () -> None
+        self._usernames = None  # type: Optional[Dict[str, UsernameUniquenessTuple]]
+        # users are validated and created by several threads in concurrent mode
+        self._lock = threading.Lock()
+
+    def _load(self, lo):  # type: (LoType) -> None
+        with self._lock:
+            if self._usernames is not None:
+                return
+            # its faster to filter out computer names in Python than in LDAP
+            # (and we have to loop over the query result anyway)
+            self._usernames = dict(
+                self.from_ldap(dn, attr)
+                for dn, attr in lo.search("objectClass=posixAccount", attr=self.ldap_attributes)
+                if not attr["uid"][0].endswith(b"$")
+            )
+
+    def get(self, lo, name):  # type: (LoType, str) -> Optional[UsernameUniquenessTuple]
+        if self._usernames is None:
+            self._load(lo)
+        return self._usernames.get(name)
+
+    def prefetch(self, lo, names):  # type: (LoType, Iterable[str]) -> None
+        # load all usernames before the users are validated in the worker threads
+        if self._usernames is None:
+            self._load(lo)
+
+    def add(self, name, record_uid, source_uid, dn):  # type: (str, str, str, str) -> None
+        with self._lock:
+            # if not loaded yet, the user will be found by the search in _load()
+            if self._usernames is not None:
+                self._usernames[name] = UsernameUniquenessTuple(record_uid, source_uid, dn)
+
+    def remove(self, name):  # type: (str) -> None
+        with self._lock:
+            if self._usernames is not None:
+                self._usernames.pop(name, None)
+
+
+class LdapUsernameIndex(UsernameIndex):
+    """
+    Searches LDAP for usernames, when they are looked up for the first time,
+    and remembers the results. :py:meth:`prefetch()` searches up to
+    :py:attr:`batch_size` usernames with a single query.
+    """
+
+    batch_size = 500
+
+    def __init__(self):  # type: () -> None
+        # username -> index entry or None if not in use
+        self._usernames = {}  # type: Dict[str, Optional[UsernameUniquenessTuple]]
+
+    def get(self, lo, name):  # type: (LoType, str) -> Optional[UsernameUniquenessTuple]
+        if name not in self._usernames:
+            self.prefetch(lo, [name])
+        return self._usernames.get(name)
+
+    def prefetch(self, lo, names):  # type: (LoType, Iterable[str]) -> None
+        missing = sorted({name for name in names if name and name not in self._usernames})
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i : i + self.batch_size]
+            filter_s = "(&(objectClass=posixAccount)(|{}))".format(
+                "".join(filter_format("(uid=%s)", (name,)) for name in batch)
+            )
+            results = {}  # type: Dict[str, Optional[UsernameUniquenessTuple]]
+            for dn, attr in lo.search(filter_s, attr=self.ldap_attributes):
+                if not attr["uid"][0].endswith(b"$"):
+                    name, entry = self.from_ldap(dn, attr)
+                    results[name] = entry
+            # don't overwrite entries added in the meantime
+            for name in batch:
+                self._usernames.setdefault(name, results.pop(name, None))
+            for name, entry in results.items():  # case differs from searched name
+                self._usernames.setdefault(name, entry)
+
+    def add(self, name, record_uid, source_uid, dn):  # type: (str, str, str, str) -> None
+        self._usernames[name] = UsernameUniquenessTuple(record_uid, source_uid, dn)
+
+    def remove(self, name):  # type: (str) -> None
+        self._usernames[name] = None
@@ -31,10 +31,9 @@
 
 """Write the passwords of newly created users to a CSV file."""
 
-import itertools
-
 from ..factory import Factory
 from ..models.import_user import ImportUser
+from ..utils.result_spool import merge_by_entry_count
 from ..writer.result_exporter import ResultExporter
 
 
@@ -50,9 +49,7 @@ class NewUserPasswordCsvExporter(ResultExporter):
 
     def get_iter(self, user_import):
         """Return only the new users."""
-        li = list(itertools.chain(*user_import.added_users.values()))
-        li.sort(key=lambda x: int(x["entry_count"]) if isinstance(x, dict) else int(x.entry_count))
-        return li
+        return merge_by_entry_count(*user_import.added_users.values())
 
     def get_writer(self):
         """Use the user result csv writer."""
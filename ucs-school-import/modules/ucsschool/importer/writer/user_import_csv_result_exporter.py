@@ -35,6 +35,7 @@ from ucsschool.lib.roles import role_pupil
 
 from ..exceptions import UcsSchoolImportError
 from ..factory import Factory
+from ..utils.result_spool import merge_by_entry_count
 from .result_exporter import ResultExporter
 
 
@@ -86,13 +87,12 @@ class UserImportCsvResultExporter(ResultExporter):
                 entry_count = 0
             return max(exc.entry_count, entry_count)
 
-        li = sorted(user_import.errors, key=exc_count)
+        iterables = [sorted(user_import.errors, key=exc_count)]
         for users in [user_import.added_users, user_import.modified_users, user_import.deleted_users]:
             for u in users.values():
                 if u:
-                    li.extend(u)
-        li.sort(key=lambda x: int(x["entry_count"]) if isinstance(x, dict) else int(x.entry_count))
-        return li
+                    iterables.append(u)
+        return merge_by_entry_count(*iterables)
 
     def get_writer(self):
         """
@@ -453,12 +453,12 @@ def list_objs(ctx, model, dn, name, school, attr_filters, filter_str, print_attr
     def get_and_print_with_school(lo, model_cls, school, filter_str):
         # type: (LoType, Type[UCSSchoolModel], str, str) -> None
         filter_str = udm_filter_from_school_filter(filter_str)
-        objs = model_cls.get_all(lo, school=school, filter_str=filter_str)
-        if not objs:
+        found = False
+        for obj in model_cls.iter_all(lo, school=school, filter_str=filter_str, sort_by="name"):
+            found = True
+            print_object(obj, print_attrs)
+        if not found:
             logger.warning("No objects found.")
-        else:
-            for obj in objs:
-                print_object(obj, print_attrs)
 
     def get_and_print_without_school(lo, model_cls, base="", filter_str=""):
         # type: (LoType, Type[UCSSchoolModel], str, str) -> None
@@ -30,12 +30,12 @@
 # /usr/share/common-licenses/AGPL-3; if not, see
 # <http://www.gnu.org/licenses/>.
 
-from copy import deepcopy
 from typing import (
     TYPE_CHECKING,
     Any,  # noqa: F401
     Dict,  # noqa: F401
     Iterable,  # noqa: F401
+    Iterator,  # noqa: F401
     List,  # noqa: F401
     Optional,  # noqa: F401
     Sequence,  # noqa: F401
@@ -48,6 +48,8 @@ from typing import (
 
 import lazy_object_proxy
 import ldap
+from ldap.controls import SimplePagedResultsControl
+from ldap.controls.sss import SSSRequestControl
 from ldap.dn import escape_dn_chars, explode_rdn
 from ldap.filter import escape_filter_chars
 from six import add_metaclass, iteritems
@@ -62,8 +64,8 @@ from ..pyhooks.pyhooks_loader import PyHooksLoader
 from ..roles import all_roles, create_ucsschool_role_string
 from ..schoolldap import SchoolSearchBase
 from .attributes import CommonName, Roles, SchoolAttribute, ValidationError
-from .meta import UCSSchoolHelperMetaClass
-from .utils import _, ucr
+from .meta import ModelRecord, UCSSchoolHelperMetaClass
+from .utils import BoundedCache, _, ucr
 from .validator import validate
 
 if TYPE_CHECKING:
@@ -80,6 +82,7 @@ UCSSchoolHelperAbstractClassTV = TypeVar(
 )
 
 
+DEFAULT_PAGE_SIZE = 1000
 PYHOOKS_PATH = "/var/lib/ucs-school-lib/hooks"
 PYHOOKS_BASE_CLASS = "ucsschool.lib.models.hook.Hook"
 _pyhook_loader = lazy_object_proxy.Proxy(
@@ -87,6 +90,22 @@ _pyhook_loader = lazy_object_proxy.Proxy(
 )  # type: PyHooksLoader
 
 
+def _copy_value(value):  # type: (Any) -> Any
+    """
+    Copy the lists, dicts and sets in `value` (recursively), but share everything
+    else. Attribute values of models and UDM objects are strings or containers of
+    strings, so this is equivalent to but much cheaper than :py:func:`copy.deepcopy()`.
+    """
+    value_type = type(value)
+    if value_type is list:
+        return [_copy_value(v) for v in value]
+    if value_type is dict:
+        return {k: _copy_value(v) for k, v in iteritems(value)}
+    if value_type is set:
+        return set(value)
+    return value
+
+
 class NoObject(noObject):
     def __init__(self, dn=None, type=None, *args):  # type: (str, Type[UCSSchoolModel], *Any) -> None
         self.dn = dn
@@ -127,6 +146,40 @@ class MultipleObjectsError(Exception):
         self.objs = objs
 
 
+class ProjectedEntry(object):
+    """
+    Minimal stand-in for a UDM object, built from a raw LDAP search result.
+
+    Only the UDM properties whose LDAP attributes were requested are available
+    (in `info`, unmapped by the UDM module's mapping). It exists so that
+    :py:meth:`UCSSchoolHelperAbstractClass.get_class_for_udm_obj()` can be used
+    without opening the UDM object.
+    """
+
+    def __init__(self, dn, attrs, lo, module):
+        # type: (str, Dict[str, List[bytes]], LoType, Any) -> None
+        self.dn = dn
+        self.oldattr = attrs
+        self.lo = lo
+        self.info = {}  # type: Dict[str, Any]
+        for ldap_attr, values in iteritems(attrs):
+            try:
+                udm_name = module.mapping.unmapName(ldap_attr)
+            except KeyError:
+                continue
+            if udm_name:
+                self.info[udm_name] = module.mapping.unmapValue(ldap_attr, values)
+
+    def __getitem__(self, key):  # type: (str) -> Any
+        return self.info[key]
+
+    def __contains__(self, key):  # type: (str) -> bool
+        return key in self.info
+
+    def get(self, key, default=None):  # type: (str, Any) -> Any
+        return self.info.get(key, default)
+
+
 @add_metaclass(UCSSchoolHelperMetaClass)
 class UCSSchoolHelperAbstractClass(object):
     """
@@ -231,7 +284,7 @@ class UCSSchoolHelperAbstractClass(object):
                 hook_path = 'computer'
     """
 
-    _cache = {}  # type: Dict[Tuple[str, Tuple[str, str]], UCSSchoolModel]
+    _cache = {}  # type: Dict[str, BoundedCache]  # class name -> instances by kwargs
     _machine_connection = None  # type: LoType
     _search_base_cache = {}  # type: Dict[str, SchoolSearchBase]
     _initialized_udm_modules = []  # type: List[str]
@@ -247,6 +300,9 @@ class UCSSchoolHelperAbstractClass(object):
         Initializes a new instance and caches it for subsequent calls.
         Useful when using School.cache(school_name) a lot in different
         functions, in loops, etc.
+
+        The cache of each class is limited by the `cache_maxsize` and
+        `cache_ttl` (seconds) options of its `Meta` class.
         """
         # TODO: rewrite function to have optional positional 'name' and 'school' arguments
         args = list(args)
@@ -258,10 +314,16 @@ class UCSSchoolHelperAbstractClass(object):
             (k, kwargs[k]) for k in sorted(kwargs)
         ]  # TODO: rewrite: sorted(kwargs.items())
         key = tuple(key)
-        if key not in cls._cache:
+        cache = cls._cache.get(cls.__name__)
+        if cache is None:
+            cache = cls._cache.setdefault(
+                cls.__name__, BoundedCache(cls._meta.cache_maxsize, cls._meta.cache_ttl)
+            )
+        obj = cache.get(key)
+        if obj is None:
             obj = cls(**kwargs)
-            cls._cache[key] = obj
-        return cls._cache[key]
+            cache[key] = obj
+        return obj
 
     @classmethod
     def invalidate_all_caches(cls):  # type: () -> None
@@ -269,7 +331,8 @@ class UCSSchoolHelperAbstractClass(object):
         from ucsschool.lib.models.user import User
         from ucsschool.lib.models.utils import _pw_length_cache
 
-        cls._cache.clear()
+        for cache in cls._cache.values():
+            cache.clear()
         # cls._search_base_cache.clear() # useless to clear
         _pw_length_cache.clear()
         Network._netmask_cache.clear()
@@ -278,9 +341,22 @@ class UCSSchoolHelperAbstractClass(object):
 
     @classmethod
     def invalidate_cache(cls):  # type: () -> None
-        keys_to_remove = [key for key in cls._cache.keys() if key[0] == cls.__name__]
-        for key in keys_to_remove:
-            del cls._cache[key]
+        cache = cls._cache.get(cls.__name__)
+        if cache is not None:
+            cache.clear()
+
+    @classmethod
+    def cache_stats(cls):  # type: () -> Dict[str, Any]
+        """
+        Statistics of the instance cache of this class, see :py:meth:`cache()`.
+
+        :return: number of hits, misses and entries and the configured limits
+        :rtype: dict
+        """
+        cache = cls._cache.get(cls.__name__) or BoundedCache(
+            cls._meta.cache_maxsize, cls._meta.cache_ttl
+        )
+        return cache.stats()
 
     @classmethod
     def supports_school(cls):  # type: () -> bool
@@ -305,6 +381,7 @@ class UCSSchoolHelperAbstractClass(object):
         """
         self._udm_obj_searched = False
         self._udm_obj = None
+        self._projected_fields = None  # type: Optional[Set[str]]
         kwargs["name"] = name
         kwargs["school"] = school
         for key, attr in self._attributes.items():
@@ -615,6 +692,7 @@ class UCSSchoolHelperAbstractClass(object):
         If the object exists, modifies it, returns True and
         calls post-hooks.
         """
+        self.complete_projection(lo)
         self.call_hooks("pre", "modify", lo)
         success = self.modify_without_hooks(lo, validate, move_if_necessary)
         if success:
@@ -624,6 +702,7 @@ class UCSSchoolHelperAbstractClass(object):
     def modify_without_hooks(self, lo, validate=True, move_if_necessary=None):
         # type: (LoType, Optional[bool], Optional[bool]) -> bool
         self.logger.info("Modifying %r", self)
+        self.complete_projection(lo)
 
         if move_if_necessary is None:
             move_if_necessary = self._meta.allow_school_change
@@ -641,7 +720,7 @@ class UCSSchoolHelperAbstractClass(object):
             return False
 
         try:
-            old_attrs = deepcopy(udm_obj.info)
+            old_attrs = _copy_value(udm_obj.info)
             self.modify_without_hooks_roles(udm_obj)
             self.do_modify(udm_obj, lo)
             # get it fresh from the database
@@ -732,6 +811,7 @@ class UCSSchoolHelperAbstractClass(object):
         self.update_ucsschool_roles(lo)
 
     def change_school(self, school, lo):  # type: (str, LoType) -> bool
+        self.complete_projection(lo)
         if self.school in self.schools:
             self.schools.remove(self.school)
         if school not in self.schools:
@@ -906,16 +986,210 @@ class UCSSchoolHelperAbstractClass(object):
 
     @classmethod
     def get_all(
-        cls, lo, school, filter_str=None, easy_filter=False, superordinate=None, school_prefix=False
+        cls,
+        lo,
+        school,
+        filter_str=None,
+        easy_filter=False,
+        superordinate=None,
+        school_prefix=False,
+        fields=None,
+        as_records=False,
     ):
-        # type: (LoType, str, Optional[str], Optional[bool], Optional[SuperOrdinateType], Optional[bool]) -> List[UCSSchoolModel]  # noqa: E501
+        # type: (LoType, str, Optional[str], Optional[bool], Optional[SuperOrdinateType], Optional[bool], Optional[Iterable[str]], Optional[bool]) -> List[Union[UCSSchoolModel, ModelRecord]]  # noqa: E501
         """
         Returns a list of all objects that can be found in cls.get_container() with the
         correct udm_module
         If filter_str is given, all udm properties with include_in_default_search are
         queried for that string (so that it should be the value)
+
+        If fields is given, no UDM objects are opened. Instead a single LDAP search
+        requesting only the LDAP attributes of the named attributes is issued and
+        partial instances are built from the results: the attributes not listed in
+        fields (and those not mapped directly to an LDAP attribute) are None. The UDM
+        object is opened lazily when such an instance is modified, see
+        :py:meth:`complete_projection()`.
+
+        If as_records is True, read-only :py:class:`ModelRecord` objects are
+        returned instead of model instances. They are built the same way (from
+        `fields` or, if not given, from all attributes mapped to LDAP attributes),
+        but need much less memory. Use ``record.to_model()`` to get a model instance.
         """
+        if as_records and fields is None:
+            fields = cls._attributes.keys()
+        if fields is not None and superordinate is not None:
+            raise ValueError("'fields' cannot be used together with 'superordinate'.")
         cls.init_udm_module(lo)
+        complete_filter = cls._get_all_filter(school, filter_str, easy_filter, school_prefix)
+        cls.logger.debug("Getting all %s of %s with filter %r", cls.__name__, school, complete_filter)
+        ret = []
+        if fields is not None:
+            fields = set(fields)
+            for dn, attrs in cls.lookup_projected(lo, school, complete_filter, fields):
+                try:
+                    ret.append(cls.from_projected_entry(dn, attrs, school, lo, fields, as_records))
+                except NoObject:
+                    continue
+            return ret
+        for udm_obj in cls.lookup(lo, school, complete_filter, superordinate=superordinate):
+            try:
+                ret.append(cls.from_udm_obj(udm_obj, school, lo))
+            except NoObject:
+                continue
+        return ret
+
+    @classmethod
+    def iter_all(
+        cls,
+        lo,
+        school,
+        filter_str=None,
+        easy_filter=False,
+        superordinate=None,
+        school_prefix=False,
+        fields=None,
+        page_size=DEFAULT_PAGE_SIZE,
+        sort_by=None,
+        as_records=False,
+    ):
+        # type: (LoType, str, Optional[str], Optional[bool], Optional[SuperOrdinateType], Optional[bool], Optional[Iterable[str]], Optional[int], Optional[str], Optional[bool]) -> Iterator[Union[UCSSchoolModel, ModelRecord]]  # noqa: E501
+        """
+        Like :py:meth:`get_all()`, but returns a generator. The LDAP search uses the
+        simple paged results control, so objects are yielded as soon as the first
+        page (of `page_size` entries) has arrived, and only one page is held in
+        memory at a time.
+
+        If `sort_by` is the name of an attribute (prefixed with ``-`` for descending
+        order), server side sorting is requested for its LDAP attribute. The control
+        is not critical: if the LDAP server does not support it, the objects are
+        yielded in the order the server returns them. If the class does several LDAP
+        searches (see :py:meth:`_lookup_searches()`), each is paged and sorted on its own.
+
+        Classes overriding :py:meth:`get_all()` post-process the complete result, so
+        their objects are taken from `get_all()` without paging. `school_prefix` is
+        applied to `filter_str` before it is passed on, the objects are sorted by
+        `sort_by` in Python and the partial instances or records for `fields` are built
+        from the complete objects. `page_size` is ignored.
+        """
+        if as_records and fields is None:
+            fields = cls._attributes.keys()
+        if fields is not None and superordinate is not None:
+            raise ValueError("'fields' cannot be used together with 'superordinate'.")
+        cls.init_udm_module(lo)
+        if cls.get_all.__func__ is not UCSSchoolHelperAbstractClass.get_all.__func__:
+            # get_all() of this class post-processes the complete result, so it cannot be paged
+            if school_prefix:
+                filter_str = school + "-" + filter_str
+            objs = cls.get_all(lo, school, filter_str, easy_filter, superordinate)
+            if sort_by:
+                objs = cls._sort_objects(objs, sort_by)
+            for obj in objs:
+                if fields is not None:
+                    obj = obj._project(fields, as_records)
+                yield obj
+            return
+        complete_filter = cls._get_all_filter(school, filter_str, easy_filter, school_prefix)
+        cls.logger.debug(
+            "Iterating over all %s of %s with filter %r (page size %r, sorted by %r)",
+            cls.__name__,
+            school,
+            complete_filter,
+            page_size,
+            sort_by,
+        )
+        if fields is not None:
+            fields = set(fields)
+        sort_ctrls = [cls._sort_control(sort_by)] if sort_by else []
+        searches = cls._lookup_searches(school, complete_filter)
+        seen = set()  # type: Set[str]
+        for search_filter, base in searches:
+            # a paged results cookie is only valid for the search it was returned for
+            cookie = ""
+            while True:
+                page_ctrl = SimplePagedResultsControl(True, size=page_size, cookie=cookie)
+                response = {}  # type: Dict[str, Any]
+                if fields is not None:
+                    page = cls._lookup_projected_search(
+                        lo,
+                        school,
+                        search_filter,
+                        base,
+                        fields,
+                        serverctrls=[page_ctrl] + sort_ctrls,
+                        response=response,
+                    )
+                    for dn, attrs in page:
+                        if len(searches) > 1:
+                            if dn in seen:
+                                continue
+                            seen.add(dn)
+                        try:
+                            yield cls.from_projected_entry(dn, attrs, school, lo, fields, as_records)
+                        except NoObject:
+                            continue
+                else:
+                    page = cls._lookup_search(
+                        lo,
+                        school,
+                        search_filter,
+                        base,
+                        superordinate=superordinate,
+                        serverctrls=[page_ctrl] + sort_ctrls,
+                        response=response,
+                    )
+                    for udm_obj in page:
+                        if len(searches) > 1:
+                            if udm_obj.dn in seen:
+                                continue
+                            seen.add(udm_obj.dn)
+                        try:
+                            yield cls.from_udm_obj(udm_obj, school, lo)
+                        except NoObject:
+                            continue
+                del page
+                for ctrl in response.get("ctrls") or []:
+                    if ctrl.controlType == SimplePagedResultsControl.controlType:
+                        cookie = ctrl.cookie
+                        break
+                else:
+                    cookie = ""
+                if not cookie:
+                    break
+
+    @classmethod
+    def _sort_control(cls, sort_by):  # type: (str) -> SSSRequestControl
+        reverse = sort_by.startswith("-")
+        name = sort_by.lstrip("-")
+        try:
+            attr = cls._attributes[name]
+        except KeyError:
+            raise ValueError("{!r} has no attribute {!r}.".format(cls.__name__, name))
+        udm_name = "school" if name == "schools" else attr.udm_name
+        ldap_attr = udm_name and udm_modules.get(cls._meta.udm_module).mapping.mapName(udm_name)
+        if not ldap_attr:
+            raise ValueError("Attribute {!r} of {!r} cannot be sorted by.".format(name, cls.__name__))
+        return SSSRequestControl(
+            criticality=False, ordering_rules=["{}{}".format("-" if reverse else "", ldap_attr)]
+        )
+
+    @classmethod
+    def _sort_objects(cls, objs, sort_by):
+        # type: (Iterable[UCSSchoolModel], str) -> List[UCSSchoolModel]
+        """Sort `objs` like the server side sorting requested by :py:meth:`_sort_control()`."""
+        reverse = sort_by.startswith("-")
+        name = sort_by.lstrip("-")
+        if name not in cls._attributes:
+            raise ValueError("{!r} has no attribute {!r}.".format(cls.__name__, name))
+
+        def sort_key(obj):
+            value = getattr(obj, name)
+            return value is None, value
+
+        return sorted(objs, key=sort_key, reverse=reverse)
+
+    @classmethod
+    def _get_all_filter(cls, school, filter_str, easy_filter, school_prefix):
+        # type: (str, Optional[str], bool, bool) -> str
         complete_filter = cls._meta.udm_filter
         if school_prefix:
             filter_str = school + "-" + filter_str
@@ -932,39 +1206,219 @@ class UCSSchoolHelperAbstractClass(object):
                 complete_filter = conjunction("&", [complete_filter, filter_from_filter_str])
             else:
                 complete_filter = filter_from_filter_str
-        complete_filter = str(complete_filter)
-        cls.logger.debug("Getting all %s of %s with filter %r", cls.__name__, school, complete_filter)
-        ret = []
-        for udm_obj in cls.lookup(lo, school, complete_filter, superordinate=superordinate):
-            try:
-                ret.append(cls.from_udm_obj(udm_obj, school, lo))
-            except NoObject:
-                continue
-        return ret
+        return str(complete_filter)
 
     @classmethod
-    def lookup(cls, lo, school, filter_s="", superordinate=None):
-        # type: (LoType, str, Optional[UldapFilter], Optional[SuperOrdinateType]) -> List[UdmObject]
+    def _lookup_searches(cls, school, filter_s=""):
+        # type: (str, Optional[UldapFilter]) -> List[Tuple[str, str]]
+        """
+        The LDAP searches done by :py:meth:`lookup()`, :py:meth:`lookup_projected()` and
+        :py:meth:`iter_all()`, as (filter, search base) tuples. The results of all searches
+        are merged. Override this (instead of `lookup()`) to change which objects are found.
+        """
+        return [("{}".format(filter_s or ""), cls.get_container(school))]
+
+    @classmethod
+    def _lookup_search(
+        cls, lo, school, filter_s, base, superordinate=None, serverctrls=None, response=None
+    ):
+        # type: (LoType, str, str, str, Optional[SuperOrdinateType], Optional[List[ldap.controls.LDAPControl]], Optional[Dict[str, Any]]) -> List[UdmObject]  # noqa: E501
         try:
             return udm_modules.lookup(
                 cls._meta.udm_module,
                 None,
                 lo,
                 filter=filter_s,
-                base=cls.get_container(school),
+                base=base,
                 scope="sub",
                 superordinate=superordinate,
+                serverctrls=serverctrls,
+                response=response,
+            )
+        except noObject as exc:
+            cls.logger.warning(
+                "Error while getting all %s of %s (probably %r does not exist): %s",
+                cls.__name__,
+                school,
+                base,
+                exc,
+            )
+            return []
+
+    @classmethod
+    def lookup(cls, lo, school, filter_s="", superordinate=None, serverctrls=None, response=None):
+        # type: (LoType, str, Optional[UldapFilter], Optional[SuperOrdinateType], Optional[List[ldap.controls.LDAPControl]], Optional[Dict[str, Any]]) -> List[UdmObject]  # noqa: E501
+        searches = cls._lookup_searches(school, filter_s)
+        if serverctrls and len(searches) > 1:
+            raise ValueError(
+                "{}.lookup() does {} LDAP searches, 'serverctrls' cannot be used.".format(
+                    cls.__name__, len(searches)
+                )
+            )
+        objects = []
+        dns = set()
+        for search_filter, base in searches:
+            for obj in cls._lookup_search(
+                lo, school, search_filter, base, superordinate, serverctrls, response
+            ):
+                if obj.dn not in dns:
+                    dns.add(obj.dn)
+                    objects.append(obj)
+        return objects
+
+    @classmethod
+    def projected_ldap_attributes(cls, fields):  # type: (Iterable[str]) -> List[str]
+        """
+        Returns the LDAP attributes needed to build partial instances with the
+        attributes in `fields` using :py:meth:`from_projected_entry()`.
+        """
+        mapping = udm_modules.get(cls._meta.udm_module).mapping
+        ldap_attrs = {"objectClass"}
+        for name in fields:
+            attr = cls._attributes.get(name)
+            if attr is None:
+                raise ValueError("{!r} has no attribute {!r}.".format(cls.__name__, name))
+            udm_name = "school" if name == "schools" else attr.udm_name
+            if not udm_name:
+                continue
+            ldap_attr = mapping.mapName(udm_name)
+            if ldap_attr:
+                ldap_attrs.add(ldap_attr)
+        return sorted(ldap_attrs)
+
+    @classmethod
+    def _lookup_projected_search(
+        cls, lo, school, filter_s, base, fields, serverctrls=None, response=None
+    ):
+        # type: (LoType, str, str, str, Iterable[str], Optional[List[ldap.controls.LDAPControl]], Optional[Dict[str, Any]]) -> List[Tuple[str, Dict[str, List[bytes]]]]  # noqa: E501
+        module = udm_modules.get(cls._meta.udm_module)
+        ldap_filter = str(module.lookup_filter(str(filter_s or ""), lo))
+        try:
+            return lo.search(
+                filter=ldap_filter,
+                base=base,
+                scope="sub",
+                attr=cls.projected_ldap_attributes(fields),
+                serverctrls=serverctrls,
+                response=response,
             )
         except noObject as exc:
             cls.logger.warning(
                 "Error while getting all %s of %s (probably %r does not exist): %s",
                 cls.__name__,
                 school,
-                cls.get_container(school),
+                base,
                 exc,
             )
             return []
 
+    @classmethod
+    def lookup_projected(cls, lo, school, filter_s, fields, serverctrls=None, response=None):
+        # type: (LoType, str, UldapFilter, Iterable[str], Optional[List[ldap.controls.LDAPControl]], Optional[Dict[str, Any]]) -> List[Tuple[str, Dict[str, List[bytes]]]]  # noqa: E501
+        """
+        Like :py:meth:`lookup()`, but returns the raw LDAP search results, holding
+        only the LDAP attributes of the attributes in `fields`.
+        """
+        searches = cls._lookup_searches(school, filter_s)
+        if serverctrls and len(searches) > 1:
+            raise ValueError(
+                "{}.lookup_projected() does {} LDAP searches, 'serverctrls' cannot be used.".format(
+                    cls.__name__, len(searches)
+                )
+            )
+        results = []
+        dns = set()
+        for search_filter, base in searches:
+            for dn, attrs in cls._lookup_projected_search(
+                lo, school, search_filter, base, fields, serverctrls, response
+            ):
+                if dn not in dns:
+                    dns.add(dn)
+                    results.append((dn, attrs))
+        return results
+
+    @classmethod
+    def from_projected_entry(cls, dn, attrs, school, lo, fields, as_record=False):
+        # type: (str, Dict[str, List[bytes]], str, LoType, Set[str], Optional[bool]) -> Union[UCSSchoolModel, ModelRecord]  # noqa: E501
+        """
+        Creates a new partial instance from a raw LDAP search result (see
+        :py:meth:`lookup_projected()`), without opening the UDM object.
+        Uses get_class_for_udm_obj() with a :py:class:`ProjectedEntry`.
+        If `as_record` is True, a read-only :py:class:`ModelRecord` is returned instead.
+        """
+        entry = ProjectedEntry(dn, attrs, lo, udm_modules.get(cls._meta.udm_module))
+        klass = cls.get_class_for_udm_obj(entry, school)
+        if klass is None:
+            cls.logger.warning(
+                "UDM object %r does not correspond to a Python class in the UCS school lib.", dn
+            )
+            raise UnknownModel(dn, cls)
+        if klass is not cls and not issubclass(klass, cls):
+            # security! see from_udm_obj()
+            raise WrongModel(dn, klass, cls)
+        module = udm_modules.get(klass._meta.udm_module)
+        attrs = {"school": klass.get_school_from_dn(dn) or school}
+        for name in fields:
+            attr = klass._attributes.get(name)
+            if attr is None or name == "school":
+                continue
+            udm_name = "school" if name == "schools" else attr.udm_name
+            if not udm_name:
+                continue
+            udm_value = entry.get(udm_name)
+            if udm_value is None:
+                prop = module.property_descriptions.get(udm_name)
+                udm_value = [] if prop is not None and prop.multivalue else None
+            elif udm_value == "":
+                udm_value = None
+            attrs[name] = udm_value
+        if as_record:
+            return klass._record_class(dn, attrs)
+        obj = klass(**attrs)
+        obj.set_dn(dn)
+        obj._projected_fields = set(attrs)
+        return obj
+
+    def _project(self, fields, as_record=False):
+        # type: (Iterable[str], Optional[bool]) -> Union[UCSSchoolModel, ModelRecord]
+        """
+        Creates a partial instance (or a read-only :py:class:`ModelRecord`, if
+        `as_record` is True) with only the attributes in `fields`, like
+        :py:meth:`from_projected_entry()` does from an LDAP search result.
+        """
+        attrs = {"school": self.school}
+        for name in fields:
+            if name in self._attributes and name != "school":
+                attrs[name] = getattr(self, name)
+        if as_record:
+            return self._record_class(self.dn, attrs)
+        obj = self.__class__(**attrs)
+        obj.set_dn(self.dn)
+        obj._projected_fields = set(attrs)
+        return obj
+
+    @property
+    def is_projected(self):  # type: () -> bool
+        """Whether this is a partial instance created by get_all(..., fields=[...])."""
+        return self._projected_fields is not None
+
+    def complete_projection(self, lo):  # type: (LoType) -> None
+        """
+        Loads the attributes missing from a partial instance (see
+        :py:meth:`get_all()`) from its UDM object. Attributes that were requested
+        keep their (possibly changed) values. Does nothing for complete instances.
+        """
+        if self._projected_fields is None:
+            return
+        udm_obj = self.get_udm_object(lo)
+        if not udm_obj:
+            return
+        complete = self.__class__.from_udm_obj(udm_obj, self.school, lo)
+        for name in self._attributes:
+            if name not in self._projected_fields:
+                setattr(self, name, getattr(complete, name))
+        self._projected_fields = None
+
     @classmethod
     def _attrs_for_easy_filter(cls):  # type: () -> List[str]
         ret = []
@@ -1028,7 +1482,7 @@ class UCSSchoolHelperAbstractClass(object):
                 if udm_value == "":
                     udm_value = None
                 attrs[name] = udm_value
-        obj = cls(**deepcopy(attrs))
+        obj = cls(**_copy_value(attrs))
         obj.set_dn(udm_obj.dn)
         obj._udm_obj_searched = True
         obj._udm_obj = udm_obj
@@ -1171,6 +1625,23 @@ class UCSSchoolHelperAbstractClass(object):
                 ret[name] = getattr(self, name)
         return ret
 
+    def snapshot(self):  # type: () -> UCSSchoolModel
+        """
+        Returns a copy of this instance, e.g. to keep the state of an object before
+        changing it. Unlike :py:func:`copy.deepcopy()` this neither runs
+        :py:meth:`to_dict()` nor :py:meth:`__init__()`: it copies the instance
+        state, only duplicating list, dict and set values. The UDM object is not
+        shared, it will be searched again when required.
+
+        :return: a new instance of the same class
+        """
+        obj = self.__class__.__new__(self.__class__)
+        for key, value in iteritems(self.__dict__):
+            obj.__dict__[key] = _copy_value(value)
+        obj._udm_obj_searched = False
+        obj._udm_obj = None
+        return obj
+
     def __deepcopy__(self, memo):  # type: (Dict[int]) -> UCSSchoolModel
         id_self = id(self)
         if not memo.get(id_self):
@@ -1335,7 +1806,7 @@ class RoleSupportMixin(object):
                 {"context": new_school, "context_type": "school", "role": role}
                 for role in self.default_roles
             )
-        for role in deepcopy(roles):
+        for role in list(roles):
             if role["context_type"] == "school" and role["context"] in removed_schools:
                 roles.remove(role)
         if new_schools or removed_schools:
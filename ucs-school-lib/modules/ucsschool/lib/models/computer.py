@@ -32,7 +32,7 @@
 
 import re
 from ipaddress import AddressValueError, IPv4Interface, NetmaskValueError
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type  # noqa: F401
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type  # noqa: F401
 
 import six
 from ldap.filter import filter_format
@@ -229,8 +229,8 @@ class SchoolComputer(UCSSchoolHelperAbstractClass):
     DEFAULT_PREFIX_LEN = 24  # 255.255.255.0
 
     @classmethod
-    def lookup(cls, lo, school, filter_s="", superordinate=None):
-        # type: (LoType, str, Optional[str], Optional[SuperOrdinateType]) -> List[UdmObject]
+    def _lookup_searches(cls, school, filter_s=""):
+        # type: (str, Optional[str]) -> List[Tuple[str, str]]
         """
         This override limits the returned objects to actual ucsschoolComputers. Does not contain
         School Replica Directory Nodes and others anymore.
@@ -240,7 +240,7 @@ class SchoolComputer(UCSSchoolHelperAbstractClass):
             school_computer_filter = "(&%s%s)" % (object_class_filter, filter_s)
         else:
             school_computer_filter = object_class_filter
-        return super(SchoolComputer, cls).lookup(lo, school, school_computer_filter, superordinate)
+        return super(SchoolComputer, cls)._lookup_searches(school, school_computer_filter)
 
     def get_inventory_numbers(self):  # type: () -> List[str]
         if isinstance(self.inventory_number, six.string_types):
@@ -33,7 +33,7 @@
 import inspect
 import logging
 from functools import partial
-from typing import Any, Dict  # noqa: F401
+from typing import Any, Dict, Tuple  # noqa: F401
 
 import lazy_object_proxy
 from six import iteritems
@@ -53,6 +53,9 @@ class UCSSchoolHelperOptions(object):
         self.set_from_meta_object(meta, "name_is_unique", False)
         self.set_from_meta_object(meta, "allow_school_change", False)
         self.set_from_meta_object(meta, "ignore_meta", False)
+        # limits of the instance cache used by UCSSchoolHelperAbstractClass.cache()
+        self.set_from_meta_object(meta, "cache_maxsize", 1000)
+        self.set_from_meta_object(meta, "cache_ttl", None)
         udm_module_short = None
         if self.udm_module:
             udm_module_short = self.udm_module.split("/")[1]
@@ -92,6 +95,76 @@ class UCSSchoolHelperOptions(object):
         setattr(self, name, getattr(meta, name, default))
 
 
+class ModelRecord(object):
+    """
+    Read-only and compact representation of a model instance.
+
+    A subclass with ``__slots__`` for all attributes of a model is created by
+    :py:class:`UCSSchoolHelperMetaClass` (``Model._record_class``). Records have
+    no ``__dict__``, no UDM object and no validation state. They are returned by
+    ``Model.get_all(..., as_records=True)`` and ``Model.iter_all(..., as_records=True)``.
+    Multi-value attributes are stored as tuples.
+    Use :py:meth:`to_model()` to get a (partial) model instance, that can be modified.
+    """
+
+    __slots__ = ("dn", "_loaded")
+    _model = None  # type: type
+    _fields = ()  # type: Tuple[str, ...]
+
+    def __init__(self, dn, values):  # type: (str, Dict[str, Any]) -> None
+        object.__setattr__(self, "dn", dn)
+        object.__setattr__(self, "_loaded", frozenset(values))
+        for name in self._fields:
+            value = values.get(name)
+            if isinstance(value, list):
+                value = tuple(value)
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):  # type: (str, Any) -> None
+        raise AttributeError("{} is read-only.".format(self.__class__.__name__))
+
+    def __delattr__(self, name):  # type: (str) -> None
+        raise AttributeError("{} is read-only.".format(self.__class__.__name__))
+
+    def __repr__(self):  # type: () -> str
+        return "{}(name={!r}, dn={!r})".format(
+            self.__class__.__name__, getattr(self, "name", None), self.dn
+        )
+
+    def to_dict(self):  # type: () -> Dict[str, Any]
+        """Like the models `to_dict()`, but only with the attributes of the model class."""
+        ret = {"$dn$": self.dn, "objectType": self._model._meta.udm_module}
+        for name in self._fields:
+            if not self._model._attributes[name].internal:
+                value = getattr(self, name)
+                ret[name] = list(value) if isinstance(value, tuple) else value
+        return ret
+
+    def to_model(self):  # type: () -> Any
+        """
+        Create a model instance from this record. Attributes that were not loaded
+        are read from the UDM object when the instance is modified (see
+        `complete_projection()`).
+        """
+        attrs = {}
+        for name in self._loaded:
+            value = getattr(self, name)
+            attrs[name] = list(value) if isinstance(value, tuple) else value
+        obj = self._model(**attrs)
+        obj.set_dn(self.dn)
+        obj._projected_fields = set(self._loaded)
+        return obj
+
+
+def make_record_class(klass):  # type: (type) -> type
+    fields = tuple(sorted(klass._attributes))
+    return type(
+        "{}Record".format(klass.__name__),
+        (ModelRecord,),
+        {"__slots__": fields, "_model": klass, "_fields": fields, "__module__": klass.__module__},
+    )
+
+
 class UCSSchoolHelperMetaClass(type):
     def __new__(mcs, cls_name, bases, attrs):
         attributes = {}
@@ -131,6 +204,7 @@ class UCSSchoolHelperMetaClass(type):
         cls = super(UCSSchoolHelperMetaClass, mcs).__new__(mcs, cls_name, bases, dict(attrs))
         cls._attributes = attributes
         cls._meta = UCSSchoolHelperOptions(cls, meta)
+        cls._record_class = make_record_class(cls)
         cls.logger = lazy_object_proxy.Proxy(
             lambda: logging.getLogger(inspect.getmodule(cls).__name__)
         )  # type: logging.Logger
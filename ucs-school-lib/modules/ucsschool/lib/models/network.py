@@ -39,7 +39,7 @@ from univention.admin.uexceptions import noObject
 from .attributes import Netmask, NetworkAttribute, NetworkBroadcastAddress, SubnetName
 from .base import UCSSchoolHelperAbstractClass
 from .dhcp import DHCPSubnet
-from .utils import _, ucr
+from .utils import BoundedCache, _, ucr
 
 
 class Network(UCSSchoolHelperAbstractClass):
@@ -47,7 +47,7 @@ class Network(UCSSchoolHelperAbstractClass):
     network = NetworkAttribute(_("Network"))
     broadcast = NetworkBroadcastAddress(_("Broadcast"))
 
-    _netmask_cache = {}
+    _netmask_cache = BoundedCache(maxsize=1000, ttl=3600)
 
     @classmethod
     def get_container(cls, school):
@@ -124,7 +124,8 @@ class Network(UCSSchoolHelperAbstractClass):
 
     @classmethod
     def get_netmask(cls, dn, school, lo):
-        if dn not in cls._netmask_cache:
+        netmask = cls._netmask_cache.get(dn)
+        if netmask is None:
             try:
                 network = cls.from_dn(dn, school, lo)
             except noObject:
@@ -139,7 +140,7 @@ class Network(UCSSchoolHelperAbstractClass):
                 netmask = str(ipv4_network.netmask)  # e.g. '255.255.255.0'
             cls.logger.debug("Network mask: %r is %r", dn, netmask)
             cls._netmask_cache[dn] = netmask
-        return cls._netmask_cache[dn]
+        return netmask
 
     class Meta:
         udm_module = "networks/network"
@@ -720,6 +720,14 @@ class School(RoleSupportMixin, UCSSchoolHelperAbstractClass):
             schools = [school for school in schools if school.name in ous]
         return cls._filter_local_schools(schools, lo)
 
+    @classmethod
+    def iter_all(cls, lo, filter_str=None, easy_filter=False, respect_local_oulist=True):
+        """
+        Like :py:meth:`get_all()`, but returns an iterator. The schools are
+        filtered as a whole, so the LDAP search is not paged.
+        """
+        return iter(cls.get_all(lo, filter_str, easy_filter, respect_local_oulist))
+
     @classmethod
     def _filter_local_schools(cls, schools, lo):
         if ucr.get("server/role") in ("domaincontroller_master", "domaincontroller_backup"):
@@ -978,3 +986,5 @@ class School(RoleSupportMixin, UCSSchoolHelperAbstractClass):
     class Meta:
         udm_module = "container/ou"
         udm_filter = "objectClass=ucsschoolOrganizationalUnit"
+        # School.cache() is used a lot, but OUs may be changed by other processes
+        cache_ttl = 300
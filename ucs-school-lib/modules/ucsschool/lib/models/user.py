@@ -38,7 +38,6 @@ from ldap.dn import escape_dn_chars, explode_rdn
 from ldap.filter import filter_format
 from six import iteritems
 
-import univention.admin.modules as udm_modules
 from univention.admin import syntax
 from univention.admin.filter import conjunction, parse
 from univention.admin.uexceptions import noObject, valueError
@@ -62,7 +61,7 @@ from .computer import AnyComputer
 from .group import BasicGroup, Group, SchoolClass, SchoolGroup, WorkGroup
 from .misc import MailDomain
 from .school import School
-from .utils import _, create_passwd, ucr
+from .utils import BoundedCache, _, create_passwd, ucr
 
 if TYPE_CHECKING:
     from .base import LoType, SuperOrdinateType, UdmObject, UldapFilter  # noqa: F401
@@ -104,8 +103,8 @@ class User(RoleSupportMixin, UCSSchoolHelperAbstractClass):
         "(|(objectClass=ucsschoolTeacher)(objectClass=ucsschoolStaff)(objectClass=ucsschoolStudent))"
     )
 
-    _profile_path_cache = {}  # type: Dict[str, str]
-    _samba_home_path_cache = {}  # type: Dict[str, str]
+    _profile_path_cache = BoundedCache(maxsize=1000, ttl=300)  # type: Dict[str, str]
+    _samba_home_path_cache = BoundedCache(maxsize=1000, ttl=300)  # type: Dict[str, Optional[str]]
     # _samba_home_path_cache is invalidated in School.invalidate_cache()
 
     roles = []  # type: List[str]
@@ -145,16 +144,16 @@ class User(RoleSupportMixin, UCSSchoolHelperAbstractClass):
             # in single server environments the Primary Directory Node is always the fileserver
             samba_home_path = r"\\%s" % ucr.get("hostname")
         # if there's a cached result then use it
-        elif school.dn not in self._samba_home_path_cache:
-            samba_home_path = None
-            # get windows home server from OU object
-            school = self.get_school_obj(lo)
-            home_share_file_server = school.home_share_file_server
-            if home_share_file_server:
-                samba_home_path = r"\\%s" % self.get_name_from_dn(home_share_file_server)
-            self._samba_home_path_cache[school.dn] = samba_home_path
         else:
-            samba_home_path = self._samba_home_path_cache[school.dn]
+            samba_home_path = self._samba_home_path_cache.get(school.dn, BoundedCache.MISSING)
+            if samba_home_path is BoundedCache.MISSING:
+                samba_home_path = None
+                # get windows home server from OU object
+                school = self.get_school_obj(lo)
+                home_share_file_server = school.home_share_file_server
+                if home_share_file_server:
+                    samba_home_path = r"\\%s" % self.get_name_from_dn(home_share_file_server)
+                self._samba_home_path_cache[school.dn] = samba_home_path
         if samba_home_path is not None:
             return r"%s\%s" % (samba_home_path, self.name)
 
@@ -163,7 +162,8 @@ class User(RoleSupportMixin, UCSSchoolHelperAbstractClass):
         if ucr_variable is not None:
             return ucr_variable
         school = School.cache(self.school)
-        if school.dn not in self._profile_path_cache:
+        profile_path = self._profile_path_cache.get(school.dn)
+        if profile_path is None:
             profile_path = r"%s\%%USERNAME%%\windows-profiles\default"
             for computer in AnyComputer.get_all(
                 lo, self.school, "univentionService=Windows Profile Server"
@@ -173,7 +173,7 @@ class User(RoleSupportMixin, UCSSchoolHelperAbstractClass):
             else:
                 profile_path = profile_path % "%LOGONSERVER%"
             self._profile_path_cache[school.dn] = profile_path
-        return self._profile_path_cache[school.dn]
+        return profile_path
 
     def is_student(self, lo):  # type: (LoType) -> bool
         return self.__check_object_class(lo, "ucsschoolStudent", self._legacy_is_student)
@@ -787,8 +787,12 @@ class User(RoleSupportMixin, UCSSchoolHelperAbstractClass):
         return cls.get_search_base(school).users
 
     @classmethod
-    def lookup(cls, lo, school, filter_s="", superordinate=None):
-        # type: (LoType, str, Optional[UldapFilter], Optional[SuperOrdinateType]) -> List[UdmObject]
+    def _lookup_searches(cls, school, filter_s=""):
+        # type: (str, Optional[UldapFilter]) -> List[Tuple[str, str]]
+        """
+        Users of `school` are found in the whole LDAP tree (by their `ucsschoolSchool`
+        attribute) and below the school's users container.
+        """
         filter_object_type = conjunction(
             "&",
             [
@@ -797,21 +801,10 @@ class User(RoleSupportMixin, UCSSchoolHelperAbstractClass):
             ],
         )
         if filter_s:
-            filter_object_type = conjunction("&", [filter_object_type, parse(filter_s)])
-        objects = udm_modules.lookup(
-            cls._meta.udm_module,
-            None,
-            lo,
-            filter="{}".format(filter_object_type),
-            scope="sub",
-            superordinate=superordinate,
-        )
-        objects.extend(
-            obj
-            for obj in super(User, cls).lookup(lo, school, filter_s, superordinate=superordinate)
-            if not any(obj.dn == x.dn for x in objects)
-        )
-        return objects
+            filter_object_type = conjunction("&", [filter_object_type, parse("{}".format(filter_s))])
+        searches = [("{}".format(filter_object_type), "")]
+        searches.extend(super(User, cls)._lookup_searches(school, filter_s))
+        return searches
 
     class Meta:
         udm_module = "users/user"
@@ -39,16 +39,32 @@ import pwd
 import string
 import subprocess
 import sys
+import threading
+import time
 from contextlib import contextmanager
 from io import IOBase
 from logging.handlers import MemoryHandler, TimedRotatingFileHandler
 from random import choice, shuffle
-from typing import IO, Any, Dict, List, Optional, Sequence, Tuple, Union  # noqa: F401
+from typing import (  # noqa: F401
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import apt
 import colorlog
 import lazy_object_proxy
 import ruamel.yaml
+from ldap.controls import SimplePagedResultsControl
 from six import string_types
 
 import univention.debug as ud
@@ -56,6 +72,14 @@ from univention.config_registry import ConfigRegistry, handler_set
 from univention.lib.i18n import Translation
 from univention.lib.policy_result import policy_result
 
+try:
+    from collections.abc import MutableMapping
+except ImportError:  # Python 2
+    from collections import MutableMapping
+
+if TYPE_CHECKING:
+    from univention.admin.uldap import access as LoType  # noqa: F401
+
 # "global" translation for ucsschool.lib.models
 _ = Translation("python-ucs-school").translate
 LOGGING_CONFIG_PATH = "/etc/ucsschool/logging.yaml"
@@ -84,6 +108,106 @@ class ValidationDataFilter(logging.Filter):
         return record.name != "UCSSchool-Validation"
 
 
+class BoundedCache(MutableMapping):
+    """
+    Thread safe mapping with a maximum size and a maximum age of its entries.
+
+    When `maxsize` is reached, the least recently used entry is removed.
+    Entries older than `ttl` seconds are treated as missing. Lookups with
+    :py:meth:`get()` and ``[]`` are counted in :py:attr:`hits` and
+    :py:attr:`misses`.
+    """
+
+    MISSING = object()  # sentinel for get(), to cache None values
+
+    def __init__(self, maxsize=None, ttl=None, timer=getattr(time, "monotonic", time.time)):
+        # type: (Optional[int], Optional[float], Callable[[], float]) -> None
+        """
+        :param int maxsize: maximum number of entries, `None` for unlimited
+        :param float ttl: maximum age of entries in seconds, `None` for unlimited
+        :param timer: function returning the current time in seconds
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()  # type: Dict[Hashable, Tuple[float, Any]]
+        self._lock = threading.RLock()
+
+    def _lookup(self, key):  # type: (Hashable) -> Any
+        # caller must hold self._lock
+        try:
+            expires, value = self._data.pop(key)
+        except KeyError:
+            return self.MISSING
+        if expires is not None and expires <= self.timer():
+            return self.MISSING
+        self._data[key] = (expires, value)  # move to end: most recently used
+        return value
+
+    def get(self, key, default=None):  # type: (Hashable, Any) -> Any
+        with self._lock:
+            value = self._lookup(key)
+            if value is self.MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def __getitem__(self, key):  # type: (Hashable) -> Any
+        value = self.get(key, self.MISSING)
+        if value is self.MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):  # type: (Hashable, Any) -> None
+        expires = None if self.ttl is None else self.timer() + self.ttl
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (expires, value)
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+    def __delitem__(self, key):  # type: (Hashable) -> None
+        with self._lock:
+            del self._data[key]
+
+    def __contains__(self, key):  # type: (Any) -> bool
+        with self._lock:
+            return self._lookup(key) is not self.MISSING
+
+    def __iter__(self):  # type: () -> Iterator[Hashable]
+        with self._lock:
+            return iter(list(self._data))
+
+    def __len__(self):  # type: () -> int
+        return len(self._data)
+
+    def clear(self):  # type: () -> None
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):  # type: () -> Dict[str, Any]
+        """
+        :return: number of hits, misses and entries and the configured limits
+        :rtype: dict
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+        }
+
+    def __repr__(self):  # type: () -> str
+        return "{}(maxsize={!r}, ttl={!r}, size={!r})".format(
+            self.__class__.__name__, self.maxsize, self.ttl, len(self._data)
+        )
+
+
 def _load_logging_config(
     path=LOGGING_CONFIG_PATH,
 ):  # type: (Optional[str]) -> Dict[str, Dict[str, str]]
@@ -105,7 +229,7 @@ LOG_DATETIME_FORMAT = lazy_object_proxy.Proxy(lambda: _logging_config["date"])
 LOG_COLORS = lazy_object_proxy.Proxy(lambda: _logging_config["colors"])  # type: Dict[str, str]
 
 _handler_cache = {}  # type: Dict[str, logging.Handler]
-_pw_length_cache = {}  # type: Dict[str, int]
+_pw_length_cache = BoundedCache(maxsize=1000, ttl=300)  # type: Dict[str, int]
 ucr = lazy_object_proxy.Proxy(_ucr)  # type: ConfigRegistry  # "global" ucr for ucsschool.lib.models
 ucr_username_max_length = lazy_object_proxy.Proxy(
     lambda: int(ucr.get("ucsschool/username/max_length", 20))
@@ -750,6 +874,45 @@ def get_package_version(package_name):  # type: (str) -> str
     return package.installed.version
 
 
+def paged_search(lo, filter_s, attr=None, base="", scope="sub", page_size=1000):
+    # type: (LoType, str, Optional[List[str]], Optional[str], Optional[str], Optional[int]) -> Iterator[Tuple[str, Dict[str, List[bytes]]]]  # noqa: E501
+    """
+    Search LDAP using the simple paged results control (RFC 2696).
+
+    The results are yielded page by page, so large result sets neither hit the
+    LDAP servers size limit nor have to be held in memory completely.
+
+    :param univention.admin.uldap.access lo: LDAP connection object
+    :param str filter_s: LDAP filter
+    :param attr: attributes to retrieve, `None` for all
+    :type attr: list(str) or None
+    :param str base: search base, LDAP base if empty
+    :param str scope: search scope (`base`, `one` or `sub`)
+    :param int page_size: number of entries to request per page
+    :return: iterator of (dn, attributes) tuples
+    :rtype: Iterator(tuple(str, dict))
+    """
+    page_control = SimplePagedResultsControl(True, size=page_size, cookie="")
+    while True:
+        response = {}
+        for result in lo.search(
+            filter_s,
+            base=base,
+            scope=scope,
+            attr=attr or [],
+            serverctrls=[page_control],
+            response=response,
+        ):
+            yield result
+        cookie = None
+        for control in response.get("ctrls", []):
+            if control.controlType == SimplePagedResultsControl.controlType:
+                cookie = control.cookie
+        if not cookie:
+            break
+        page_control.cookie = cookie
+
+
 def add_or_remove_ucrv_value(ucrv, action, value, delimiter):
     """
     Adds or removes a value to a ucrv. Delimiter splits the value of the existing ucr.
@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2024 Univention GmbH
+#
+# http://www.univention.de/
+#
+# All rights reserved.
+#
+# The source code of this program is made available
+# under the terms of the GNU Affero General Public License version 3
+# (GNU AGPL V3) as published by the Free Software Foundation.
+#
+# Binary versions of this program provided by Univention to you as
+# well as other copyrighted, protected or trademarked materials like
+# Logos, graphics, fonts, specific documentations and configurations,
+# cryptographic keys etc. are subject to a license agreement between
+# you and Univention and not subject to the GNU AGPL V3.
+#
+# In the case you use this program under the terms of the GNU AGPL V3,
+# the program is provided in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public
+# License with the Debian GNU/Linux or Univention distribution in file
+# /usr/share/common-licenses/AGPL-3; if not, see
+# <http://www.gnu.org/licenses/>.
+
+"""
+Store of the members of the user groups of the local schools. The ``pupilgroups`` listener module
+keeps it up to date. The web proxy builds its squidGuard user lists from it, and RADIUS uses it to
+find the groups of a user.
+
+There is one file per group in :py:data:`STORE_DIR`. The first line is the name of the group, and
+each following line is the UID of one member.
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import Dict, Iterable, List, Optional  # noqa: F401
+
+STORE_DIR = "/var/cache/ucs-school-webproxy/usergroups"
+
+
+def _group_path(name):  # type: (str) -> str
+    # group names may contain characters that are not allowed in file names
+    return os.path.join(STORE_DIR, hashlib.sha1(name.encode("UTF-8")).hexdigest())  # nosec
+
+
+def _read_file(path):  # type: (str) -> Optional[List[str]]
+    try:
+        with open(path) as fd:
+            return fd.read().splitlines()
+    except EnvironmentError:
+        return None
+
+
+def get_members(name):  # type: (str) -> List[str]
+    """Returns the UIDs of the members of group `name`, or an empty list if it is not stored."""
+    lines = _read_file(_group_path(name))
+    return lines[1:] if lines else []
+
+
+def get_all():  # type: () -> Dict[str, List[str]]
+    """Returns the UIDs of the members of all stored groups, by group name."""
+    groups = {}  # type: Dict[str, List[str]]
+    try:
+        filenames = os.listdir(STORE_DIR)
+    except EnvironmentError:
+        return groups
+    for filename in filenames:
+        lines = _read_file(os.path.join(STORE_DIR, filename))
+        if lines:
+            groups[lines[0]] = lines[1:]
+    return groups
+
+
+def set_members(name, members):  # type: (str, Iterable[str]) -> bool
+    """
+    Stores the members of group `name`. A group without members is removed from the store.
+
+    :param name: The name of the group
+    :param members: The UIDs of the members of the group
+    :return: Whether the stored members changed
+    :rtype: bool
+    """
+    path = _group_path(name)
+    members = list(members)
+    old = _read_file(path)
+    if not members:
+        if old is None:
+            return False
+        os.unlink(path)
+        return True
+    new = [name] + members
+    if old == new:
+        return False
+    if not os.path.isdir(STORE_DIR):
+        os.makedirs(STORE_DIR, 0o755)
+    fd, tmp_path = tempfile.mkstemp(dir=STORE_DIR, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as tmp:
+            tmp.write("\n".join(new) + "\n")
+        os.chmod(tmp_path, 0o644)
+        os.rename(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return True
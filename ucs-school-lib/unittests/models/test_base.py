@@ -0,0 +1,135 @@
+import sys
+
+import pytest
+from ldap.controls import SimplePagedResultsControl
+
+sys.path.insert(1, "modules")
+from ucsschool.lib.models.base import UCSSchoolHelperAbstractClass  # noqa: E402
+from ucsschool.lib.models.computer import SchoolComputer  # noqa: E402
+from ucsschool.lib.models.share import WorkGroupShare  # noqa: E402
+from ucsschool.lib.models.user import User  # noqa: E402
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+school_name = "MustermannSchule"
+users_container = "cn=users,ou={},dc=test".format(school_name)
+computers_container = "cn=computers,ou={},dc=test".format(school_name)
+
+
+class FakeUdmObj(object):
+    def __init__(self, dn):
+        self.dn = dn
+
+
+class FakePagedLookup(object):
+    """Replacement for `udm_modules.lookup()` that pages like the LDAP server."""
+
+    def __init__(self, results):
+        self.results = results  # {search base: [dn, ..]}
+        self.calls = []
+
+    def __call__(self, module, co, lo, filter="", base="", scope="sub", superordinate=None, **kwargs):
+        (page_ctrl,) = [
+            ctrl
+            for ctrl in kwargs["serverctrls"]
+            if ctrl.controlType == SimplePagedResultsControl.controlType
+        ]
+        self.calls.append((filter, base, page_ctrl.cookie))
+        start = int(page_ctrl.cookie or 0)
+        end = start + page_ctrl.size
+        dns = self.results.get(base, [])
+        cookie = str(end) if end < len(dns) else ""
+        kwargs["response"]["ctrls"] = [SimplePagedResultsControl(True, size=0, cookie=cookie)]
+        return [FakeUdmObj(dn) for dn in dns[start:end]]
+
+
+def from_udm_obj(cls, udm_obj, school, lo):
+    return udm_obj.dn
+
+
+@pytest.fixture
+def paged_lookup():
+    patches = []
+
+    def _func(results):
+        fake_lookup = FakePagedLookup(results)
+        patches.extend(
+            [
+                mock.patch("ucsschool.lib.models.base.udm_modules.lookup", fake_lookup),
+                mock.patch.object(UCSSchoolHelperAbstractClass, "init_udm_module"),
+                mock.patch.object(User, "get_container", return_value=users_container),
+                mock.patch.object(SchoolComputer, "get_container", return_value=computers_container),
+                mock.patch.object(User, "from_udm_obj", classmethod(from_udm_obj)),
+                mock.patch.object(SchoolComputer, "from_udm_obj", classmethod(from_udm_obj)),
+            ]
+        )
+        for patch in patches:
+            patch.start()
+        return fake_lookup
+
+    yield _func
+    for patch in patches:
+        patch.stop()
+
+
+def test_user_iter_all_pages_through_both_searches(paged_lookup):
+    outside = ["uid=out{},cn=users,dc=test".format(i) for i in range(5)]
+    inside = ["uid=in{},{}".format(i, users_container) for i in range(4)]
+    fake_lookup = paged_lookup({"": outside + inside[:1], users_container: inside})
+
+    dns = list(User.iter_all(mock.Mock(), school_name, page_size=2))
+
+    assert dns == outside + inside
+    # every search starts without cookie and only gets the cookies it returned itself
+    assert [(base, cookie) for _filter, base, cookie in fake_lookup.calls] == [
+        ("", ""),
+        ("", "2"),
+        ("", "4"),
+        (users_container, ""),
+        (users_container, "2"),
+    ]
+    assert "ucsschoolSchool={}".format(school_name) in fake_lookup.calls[0][0]
+
+
+def test_school_computer_iter_all_pages_and_filters_school_computers(paged_lookup):
+    computers = ["cn=pc{},{}".format(i, computers_container) for i in range(7)]
+    fake_lookup = paged_lookup({computers_container: computers})
+
+    dns = list(SchoolComputer.iter_all(mock.Mock(), school_name, filter_str="cn=pc*", page_size=3))
+
+    assert dns == computers
+    assert [cookie for _filter, _base, cookie in fake_lookup.calls] == ["", "3", "6"]
+    for _filter, base, _cookie in fake_lookup.calls:
+        assert base == computers_container
+        assert _filter.startswith("(&(objectClass=ucsschoolComputer)")
+        assert "(cn=pc*)" in _filter
+
+
+def test_lookup_rejects_server_controls_for_several_searches(paged_lookup):
+    paged_lookup({})
+    with pytest.raises(ValueError):
+        User.lookup(mock.Mock(), school_name, serverctrls=[SimplePagedResultsControl(True, size=2)])
+
+
+def test_iter_all_of_class_overriding_get_all_prefixes_and_sorts():
+    shares = [FakeUdmObj("cn={}-b".format(school_name)), FakeUdmObj("cn={}-a".format(school_name))]
+    for share in shares:
+        share.name = share.dn[3:]
+    get_all = mock.Mock(return_value=shares)
+
+    with mock.patch.object(UCSSchoolHelperAbstractClass, "init_udm_module"), mock.patch.object(
+        WorkGroupShare, "get_all", classmethod(lambda cls, *args: get_all(*args))
+    ):
+        result = list(
+            WorkGroupShare.iter_all(
+                mock.sentinel.lo, school_name, "cn=*", school_prefix=True, sort_by="name"
+            )
+        )
+        with pytest.raises(ValueError):
+            list(WorkGroupShare.iter_all(mock.sentinel.lo, school_name, sort_by="unknown"))
+
+    assert result == shares[::-1]
+    get_all.assert_any_call(mock.sentinel.lo, school_name, school_name + "-cn=*", False, None)
@@ -0,0 +1,45 @@
+import sys
+
+sys.path.insert(1, "modules")
+from ucsschool.lib.models.utils import BoundedCache  # noqa: E402
+
+
+class FakeTimer(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bounded_cache_evicts_least_recently_used():
+    cache = BoundedCache(maxsize=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache["a"] == 1
+    cache["c"] = 3
+    assert sorted(cache) == ["a", "c"]
+    assert "b" not in cache
+
+
+def test_bounded_cache_expires_entries():
+    timer = FakeTimer()
+    cache = BoundedCache(ttl=10, timer=timer)
+    cache["a"] = 1
+    timer.now = 9
+    assert cache.get("a") == 1
+    timer.now = 10
+    assert cache.get("a") is None
+    assert "a" not in cache
+    assert len(cache) == 0
+
+
+def test_bounded_cache_counts_hits_and_misses():
+    cache = BoundedCache()
+    cache["a"] = None
+    assert cache.get("a", BoundedCache.MISSING) is None
+    assert cache.get("b") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1, "maxsize": None, "ttl": None}
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.hits == 1
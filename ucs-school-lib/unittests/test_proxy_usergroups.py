@@ -0,0 +1,40 @@
+import sys
+
+import pytest
+
+sys.path.insert(1, "modules")
+from ucsschool.lib import proxy_usergroups  # noqa: E402
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    path = tmp_path / "usergroups"
+    monkeypatch.setattr(proxy_usergroups, "STORE_DIR", str(path))
+    return path
+
+
+def test_set_and_get_members(store_dir):
+    assert proxy_usergroups.set_members("school-1a", ["anton1", "bertram9"]) is True
+    assert proxy_usergroups.get_members("school-1a") == ["anton1", "bertram9"]
+    assert proxy_usergroups.get_members("school-1b") == []
+    assert proxy_usergroups.get_all() == {"school-1a": ["anton1", "bertram9"]}
+
+
+def test_set_members_unchanged(store_dir):
+    proxy_usergroups.set_members("school-1a", ["anton1"])
+    assert proxy_usergroups.set_members("school-1a", ["anton1"]) is False
+    assert proxy_usergroups.set_members("school-1a", ["anton1", "klaus3"]) is True
+    assert proxy_usergroups.get_members("school-1a") == ["anton1", "klaus3"]
+
+
+def test_set_no_members_removes_group(store_dir):
+    proxy_usergroups.set_members("school-1a", ["anton1"])
+    assert proxy_usergroups.set_members("school-1a", []) is True
+    assert proxy_usergroups.set_members("school-1a", []) is False
+    assert proxy_usergroups.get_all() == {}
+
+
+def test_special_characters_in_group_name(store_dir):
+    proxy_usergroups.set_members("school-../Igel Gruppe", ["anton1"])
+    assert proxy_usergroups.get_all() == {"school-../Igel Gruppe": ["anton1"]}
+    assert [path.parent for path in store_dir.iterdir()] == [store_dir]
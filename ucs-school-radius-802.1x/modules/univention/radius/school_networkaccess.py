@@ -35,6 +35,11 @@
 
 from univention.radius.networkaccess import NetworkAccess
 
+try:
+    from ucsschool.lib import proxy_usergroups
+except ImportError:
+    proxy_usergroups = None
+
 
 class SchoolNetworkAccess(NetworkAccess):
     def __init__(self, *args, **kwargs):
@@ -46,9 +51,13 @@ class SchoolNetworkAccess(NetworkAccess):
         self.load_info()
 
     def load_info(self):
-        self.logger.debug("Loading proxy rules from UCR")
+        self.logger.debug("Loading proxy rules from UCR and the pupil group store")
+        if proxy_usergroups is not None:
+            for group, users in proxy_usergroups.get_all().items():
+                for user in users:
+                    self.user_to_group.setdefault(user.lower(), []).append(group)
         for key in self.configRegistry:
-            if key.startswith("proxy/filter/usergroup/"):
+            if key.startswith("proxy/filter/usergroup/") and proxy_usergroups is None:
                 group = key[len("proxy/filter/usergroup/") :]
                 users = self.configRegistry[key].split(",")
                 for user in users:
@@ -58,12 +58,13 @@ define([
 	"umc/widgets/ComboBox",
 	"umc/widgets/ProgressBar",
 	"umc/modules/computerroom/ScreenshotView",
+	"umc/modules/computerroom/screenshot",
 	"umc/modules/computerroom/SettingsDialog",
 	"umc/i18n!umc/modules/computerroom",
 	"xstyle/css!./computerroom.css"
 ], function(declare, lang, array, ioQuery, on, topic, dom, domClass, Deferred, Observable, Memory, all,
 			Tooltip, styles, entities, UMCApp, dialog, tools, Dialog, Grid, Button, Module, Page,
-			Form, ContainerWidget, Text, ComboBox, ProgressBar, ScreenshotView, SettingsDialog, _) {
+			Form, ContainerWidget, Text, ComboBox, ProgressBar, ScreenshotView, screenshot, SettingsDialog, _) {
 
 	var isConnected = function(item) { return item.connection === 'connected'; };
 
@@ -105,6 +106,8 @@ define([
 		_screenLockIntervalTime: 5000,
 
 		_updateTimer: null,
+		// seconds an update request waits on the server for changes of the computers
+		_updateWait: 10,
 		_examEndTimer: null,
 		_screenLockTimer: null,
 
@@ -375,9 +378,9 @@ define([
 			if (items.length === 0) {
 				return;
 			}
-			array.forEach(items, lang.hitch(this, function(comp) {
-				this.umcpCommand('computerroom/user/logout', { computer: comp.id });
-			}));
+			this.umcpCommand('computerroom/user/logout/bulk', {
+				computers: array.map(items, function(comp) { return comp.id; })
+			});
 
 			this.addNotification(_('The selected users are logging off.'));
 		},
@@ -386,12 +389,10 @@ define([
 			if (items.length === 0) {
 				return;
 			}
-			array.forEach(items, lang.hitch(this, function(comp) {
-				this.umcpCommand('computerroom/computer/state', {
-					computer: comp.id,
-					state: state
-				});
-			}));
+			this.umcpCommand('computerroom/computer/state/bulk', {
+				computers: array.map(items, function(comp) { return comp.id; }),
+				state: state
+			});
 
 			var msg = {
 				poweroff: _('The selected computers are shutting down.'),
@@ -431,16 +432,20 @@ define([
 		},
 
 		_lockInput: function(lock, ids, items) {
+			var computers = [];
 			array.forEach(items, lang.hitch(this, function(comp) {
 				if (this._canExecuteLockInput(comp, !lock)) {
-					this.umcpCommand('computerroom/lock', {
-						computer: comp.id,
-						device: 'input',
-						lock: lock
-					});
+					computers.push(comp.id);
 					this._objStore.put({ id: comp.id, InputLock: null });
 				}
 			}));
+			if (computers.length) {
+				this.umcpCommand('computerroom/lock/bulk', {
+					computers: computers,
+					device: 'input',
+					lock: lock
+				});
+			}
 			this.addNotification(lock ? _('The selected computers are being locked.') : _('The selected computers are being unlocked.'));
 		},
 
@@ -452,6 +457,7 @@ define([
 		},
 
 		_lockScreen: function(lock, ids, items) {
+			var computers = [];
 			array.forEach(items, lang.hitch(this, function(comp) {
 				if (this._canExecuteLockScreen(comp, !lock)) {
 					if (!lock && this._toScreenLock[comp.id]) {
@@ -459,14 +465,17 @@ define([
 					} else if (lock) {
 						this._toScreenLock[comp.id] = comp
 					}
-					this.umcpCommand('computerroom/lock', {
-						computer: comp.id,
-						device: 'screen',
-						lock: lock
-					});
+					computers.push(comp.id);
 					this._objStore.put({ id: comp.id, ScreenLock: null });
 				}
 			}));
+			if (computers.length) {
+				this.umcpCommand('computerroom/lock/bulk', {
+					computers: computers,
+					device: 'screen',
+					lock: lock
+				});
+			}
 			this.addNotification(lock ? _('The selected computers are being locked.') : _('The selected computers are being unlocked.'));
 		},
 
@@ -713,7 +722,7 @@ define([
 						onShow: function() {
 							var image = dom.byId('screenshotTooltip-' + id);
 							if (image) {
-								image.src = '/univention/command/computerroom/screenshot?computer=' + encodeURIComponent(id) + '&random=' + encodeURIComponent(Math.random());
+								screenshot.load(image, id);
 							}
 						}
 					});
@@ -1197,7 +1206,7 @@ define([
 				array.forEach(response.result, function(item) {
 					this._objStore.put(item);
 				}, this);
-				this._updateTimer = window.setTimeout(lang.hitch(this, '_updateRoom', {}), 2000);
+				this._updateTimer = window.setTimeout(lang.hitch(this, '_updateRoom', true), 2000);
 				if (this._screenLockIntervalTime > 0) {
 					this._screenLockTimer = window.setInterval(lang.hitch(this, '_screenLockInterval', {}), this._screenLockIntervalTime);
 				}
@@ -1216,8 +1225,9 @@ define([
 			}
 		},
 
-		_updateRoom: function() {
-			return this.umcpCommand('computerroom/update', {}, false).then(lang.hitch(this, function(response) {
+		_updateRoom: function(longPoll) {
+			var wait = longPoll === true ? this._updateWait : 0;
+			return this.umcpCommand('computerroom/update', { wait: wait }, false).then(lang.hitch(this, function(response) {
 				var demo = false, demo_server = null, demo_user = null, demo_systems = 0;
 
 				if (this.get('roomInfo') !== response.result.room_info) {
@@ -1242,7 +1252,7 @@ define([
 					return;
 				}
 
-				this._updateTimer = window.setTimeout(lang.hitch(this, '_updateRoom', {}), 2000);
+				this._updateTimer = window.setTimeout(lang.hitch(this, '_updateRoom', true), 100);
 				array.forEach(response.result.computers, function(item) {
 					this._objStore.put(item);
 					if (this._toScreenLock[item.id] || item.ScreenLock) {
@@ -1336,7 +1346,7 @@ define([
 						// success :) .... nothing needs to be done as _acquireRoom() takes care of anything
 					}, lang.hitch(this, function() {
 						// failure :( ... try again after some idle time
-						this._updateTimer = window.setTimeout(lang.hitch(this, '_updateRoom', {}), 1000 * this._nUpdateFailures);
+						this._updateTimer = window.setTimeout(lang.hitch(this, '_updateRoom', true), 1000 * this._nUpdateFailures);
 					}));
 				} else {
 					// fall back, automatic reinitialization failed, show initial dialog to choose a room
@@ -46,9 +46,10 @@ define([
 	"umc/widgets/StandbyMixin",
 	"umc/widgets/Text",
 	"put-selector/put",
+	"umc/modules/computerroom/screenshot",
 	"umc/i18n!umc/modules/computerroom"
 ], function(declare, lang, array, aspect, dom, domClass, entities, ContentPane, _Contained, Tooltip,
-		ComboBox, ContainerWidget, Button, Page, StandbyMixin, Text, put, _) {
+		ComboBox, ContainerWidget, Button, Page, StandbyMixin, Text, put, screenshot, _) {
 
 	// README: This is an alternative view
 	// var Item = declare( "umc.modules.computerroom.Item", [ dijit.TitlePane, _Contained ], {
@@ -130,12 +131,6 @@ define([
 		// image object
 		image: null,
 
-		// random extension to the URL to avoid caching
-		random: null,
-
-		// pattern for the image URI
-		_pattern: '/univention/command/computerroom/screenshot?computer={computer}&random={random}',
-
 		// tiemr to update the iamges
 		_timer: null,
 
@@ -148,14 +143,6 @@ define([
 			}
 		},
 
-		_createURI: function() {
-			this.random = Math.random();
-			return lang.replace(this._pattern, {
-				computer: encodeURIComponent(this.computer),
-				random: encodeURIComponent(this.random)
-			});
-		},
-
 		_updateImage: function() {
 			var img = dom.byId(lang.replace('img-{computer}', this));
 			var userTag = dom.byId(lang.replace('userTag-{computer}', this));
@@ -164,9 +151,9 @@ define([
 				userTag.innerHTML = entities.encode(this.username) || '<i>' + entities.encode(_('No user logged in')) + '</i>';
 			}
 			if (img) {
-				var new_uri = this._createURI();
-				img.src = new_uri;
-				this._currentURI = new_uri;
+				screenshot.load(img, this.computer).then(lang.hitch(this, function(uri) {
+					this._currentURI = uri;
+				}));
 			}
 			if (this._timer) {
 				window.clearTimeout(this._timer);
@@ -206,7 +193,7 @@ define([
 						tooltip.close();
 						return;
 					}
-					imageTooltip.src = this._currentURI ? this._currentURI: this._createURI();
+					imageTooltip.src = this._currentURI ? this._currentURI : screenshot.uri(this.computer);
 				})
 			});
 
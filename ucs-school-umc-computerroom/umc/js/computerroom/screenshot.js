@@ -0,0 +1,64 @@
+/*
+ * Copyright 2024 Univention GmbH
+ *
+ * http://www.univention.de/
+ *
+ * All rights reserved.
+ *
+ * The source code of this program is made available
+ * under the terms of the GNU Affero General Public License version 3
+ * (GNU AGPL V3) as published by the Free Software Foundation.
+ *
+ * Binary versions of this program provided by Univention to you as
+ * well as other copyrighted, protected or trademarked materials like
+ * Logos, graphics, fonts, specific documentations and configurations,
+ * cryptographic keys etc. are subject to a license agreement between
+ * you and Univention and not subject to the GNU AGPL V3.
+ *
+ * In the case you use this program under the terms of the GNU AGPL V3,
+ * the program is provided in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU Affero General Public License for more details.
+ *
+ * You should have received a copy of the GNU Affero General Public
+ * License with the Debian GNU/Linux or Univention distribution in file
+ * /usr/share/common-licenses/AGPL-3; if not, see
+ * <http://www.gnu.org/licenses/>.
+ */
+/*global define,window*/
+
+define([
+	"dojo/_base/lang"
+], function(lang) {
+	// Every computer has one stable screenshot URL. The server sends an ETag with each
+	// screenshot, so reloading it with the "no-cache" mode revalidates the cached image and
+	// only transfers it again if the screenshot changed.
+	return {
+		uri: function(computer) {
+			return lang.replace('/univention/command/computerroom/screenshot?computer={0}', [encodeURIComponent(computer)]);
+		},
+
+		// Loads the current screenshot of the computer into the image node. The node is only
+		// updated if the screenshot changed. The promise resolves to the URI shown by the node.
+		load: function(img, computer) {
+			return window.fetch(this.uri(computer), {cache: 'no-cache', credentials: 'same-origin'}).then(function(response) {
+				var etag = response.headers.get('ETag');
+				if (!response.ok || (etag && etag === img.getAttribute('data-etag'))) {
+					return img.src;
+				}
+				return response.blob().then(function(blob) {
+					var oldSrc = img.src;
+					img.src = window.URL.createObjectURL(blob);
+					img.setAttribute('data-etag', etag || '');
+					if (oldSrc.indexOf('blob:') === 0) {
+						window.URL.revokeObjectURL(oldSrc);
+					}
+					return img.src;
+				});
+			}, function() {
+				return img.src;
+			});
+		}
+	};
+});
@@ -39,8 +39,10 @@ import itertools
 import os
 import signal
 import subprocess
+import threading
 import time
 import traceback
+from collections import OrderedDict
 from ipaddress import ip_address
 from pipes import quote
 from random import Random
@@ -75,11 +77,17 @@ from univention.lib.i18n import Translation
 from univention.management.console.config import ucr
 from univention.management.console.log import MODULE
 from univention.management.console.modules import UMC_Error
-from univention.management.console.modules.decorators import allow_get_request, sanitize, simple_response
+from univention.management.console.modules.decorators import (
+    allow_get_request,
+    sanitize,
+    simple_response,
+    threaded,
+)
 from univention.management.console.modules.sanitizers import (
     BooleanSanitizer,
     ChoicesSanitizer,
     DNSanitizer,
+    IntegerSanitizer,
     ListSanitizer,
     Sanitizer,
     StringSanitizer,
@@ -92,6 +100,16 @@ _SCREENSHOT_DIR = "/usr/share/univention-management-console-frontend/js/dijit/th
 FN_SCREENSHOT_DENIED = os.path.join(_SCREENSHOT_DIR, _("screenshot_denied.svg"))
 FN_SCREENSHOT_NOTREADY = os.path.join(_SCREENSHOT_DIR, _("screenshot_notready.svg"))
 
+PID_CHECK_MAX_AGE = 5.0
+# room information (owner, exam, end of the settings) is written by other processes as well, so a
+# waiting update request checks it in this interval (in seconds)
+ROOM_STATE_CHECK_INTERVAL = 2.0
+DISPLAY_NAME_CACHE_SIZE = 128
+_room_info_cache = {}  # room file -> ((mtime, size, inode), parsed info)
+_pid_check_cache = {}  # PID -> (time of check, is UMC process)
+_display_name_cache = OrderedDict()  # user DN -> display name, least recently used first
+_display_name_lock = threading.Lock()
+
 
 def compare_dn(a, b):
     return a and b and a.lower() == b.lower()
@@ -106,6 +124,19 @@ def _getRoomFile(roomDN):
 
 
 def _isUmcProcess(pid):
+    """Checks if `pid` is a computerroom UMC module. The result is cached for a few seconds."""
+    now = time.monotonic()
+    checked_at, result = _pid_check_cache.get(pid, (None, None))
+    if checked_at is None or now - checked_at > PID_CHECK_MAX_AGE:
+        result = _checkUmcProcess(pid)
+        for old_pid, (old_checked_at, _) in list(_pid_check_cache.items()):
+            if now - old_checked_at > PID_CHECK_MAX_AGE:
+                _pid_check_cache.pop(old_pid, None)
+        _pid_check_cache[pid] = (now, result)
+    return result
+
+
+def _checkUmcProcess(pid):
     if not psutil.pid_exists(pid):
         return False  # process is not running anymore
     # process is running
@@ -120,15 +151,25 @@ def _readRoomInfo(roomDN):
     """returns a dict of properties for the current room."""
     roomFile = _getRoomFile(roomDN)
     info = {}
-    if os.path.exists(roomFile):
-        try:
-            with open(roomFile) as f:
-                # the room file contains key-value pairs, separated by '='
-                # ... parse the file as dict
-                lines = f.readlines()
-                info = dict(iline.strip().split("=", 1) for iline in lines if "=" in iline)
-        except (OSError, IOError, ValueError) as exc:
-            MODULE.warn("Failed to read file %s: %s" % (roomFile, exc))
+    try:
+        stat = os.stat(roomFile)
+    except (OSError, IOError):
+        _room_info_cache.pop(roomFile, None)
+    else:
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        cached_key, cached_info = _room_info_cache.get(roomFile, (None, None))
+        if cached_key == key:
+            info = dict(cached_info)
+        else:
+            try:
+                with open(roomFile) as f:
+                    # the room file contains key-value pairs, separated by '='
+                    # ... parse the file as dict
+                    lines = f.readlines()
+                    info = dict(iline.strip().split("=", 1) for iline in lines if "=" in iline)
+                _room_info_cache[roomFile] = (key, dict(info))
+            except (OSError, IOError, ValueError) as exc:
+                MODULE.warn("Failed to read file %s: %s" % (roomFile, exc))
 
     # special handling for the PID
     if "pid" in info:
@@ -166,6 +207,7 @@ def _writeRoomInfo(roomDN, user=None, exam=None, examDescription=None, examEndTi
         "pid": os.getpid(),
     }
     MODULE.info('Writing info file for room "%s": %s' % (roomDN, info))
+    _room_info_cache.pop(_getRoomFile(roomDN), None)
     try:
         # write user DN in the room file
         with open(_getRoomFile(roomDN), "w") as fd:
@@ -189,6 +231,29 @@ def _getRoomOwner(roomDN):
     return info.get("user")
 
 
+def _getUserDisplayName(userDN, lo):
+    """
+    Returns a displayable name for the given user. The names of the most recently
+    requested users are cached. If the user cannot be opened, the DN is returned.
+    """
+    with _display_name_lock:
+        if userDN in _display_name_cache:
+            _display_name_cache.move_to_end(userDN)
+            return _display_name_cache[userDN]
+    try:
+        # open the corresponding UDM object to get a displayable user name
+        name = Display.user(User.from_dn(userDN, None, lo).get_udm_object(lo))
+    except udm_exceptions.base as exc:
+        # could not oben the LDAP object, show the DN
+        MODULE.warn("Cannot open LDAP information for user %r: %s" % (userDN, exc))
+        return userDN
+    with _display_name_lock:
+        _display_name_cache[userDN] = name
+        while len(_display_name_cache) > DISPLAY_NAME_CACHE_SIZE:
+            _display_name_cache.popitem(last=False)
+    return name
+
+
 def _freeRoom(roomDN, userDN):
     """Remove the lock file if the room is locked by the given user"""
     roomFile = _getRoomFile(roomDN)
@@ -365,10 +430,7 @@ class Instance(SchoolBaseModule):
                     % (self._computerroom.room, self._computerroom.roomDN)
                 )
                 _freeRoom(self._computerroom.roomDN, self.__init_user_dn)
-            for comp in self._computerroom.values():
-                comp.should_run = False
-            while any(comp.is_alive() for comp in self._computerroom.values()):
-                time.sleep(0.1)
+            self._computerroom.stop_polling(wait=True)
             MODULE.info("All threads dead!")
 
     def lessons(self, request):
@@ -493,13 +555,7 @@ class Instance(SchoolBaseModule):
                 and ("pid" in room_info or "exam" in room_info)
             )
             if locked:
-                try:
-                    # open the corresponding UDM object to get a displayable user name
-                    user_dn = Display.user(
-                        User.from_dn(user_dn, None, ldap_user_read).get_udm_object(ldap_user_read)
-                    )
-                except udm_exceptions.base as exc:
-                    MODULE.warn("Cannot open LDAP information for user %r: %s" % (user_dn, exc))
+                user_dn = _getUserDisplayName(user_dn, ldap_user_read)
 
             rooms.append(
                 {
@@ -554,9 +610,11 @@ class Instance(SchoolBaseModule):
         if userDN and not compare_dn(userDN, request.user_dn):
             raise UMC_Error(_("A different user is already running a computer room session."))
 
-    def _get_computers(self, only_changed=False):
+    def _get_computers(self, only_changed=False, names=None):
         result = []
         for computer in self._computerroom.values():
+            if names is not None and computer.name not in names:
+                continue
             if only_changed and not computer.hasChanged:
                 continue
             result.append(computer.dict)
@@ -575,17 +633,31 @@ class Instance(SchoolBaseModule):
         MODULE.info("computerroom.query: result: %s" % (result,))
         self.finished(request.id, result)
 
+    @sanitize(wait=IntegerSanitizer(default=0, minimum=0, maximum=60))
+    @threaded
     @LDAP_Connection()
     def update(self, request, ldap_user_read=None):
         """
         Returns an update for the computers in the selected
         room. Just attributes that have changed since the last call will
-        be included in the result
+        be included in the result. With `wait`, the request blocks for up to
+        that many seconds until the state of a computer or of the room (owner,
+        exam, end of the settings) changes.
         """
         if not self._computerroom.school or not self._computerroom.room:
             raise UMC_Error(_("no room selected"))
-        computers = self._get_computers(only_changed=True)
-        info = _readRoomInfo(self._computerroom.roomDN)
+        info, setting_ends_in = self._get_room_state()
+        deadline = time.monotonic() + request.options["wait"]
+        while True:
+            timeout = min(ROOM_STATE_CHECK_INTERVAL, deadline - time.monotonic())
+            changed = self._computerroom.changes.wait(max(timeout, 0))
+            if changed or time.monotonic() >= deadline:
+                break
+            room_state = self._get_room_state()
+            if room_state != (info, setting_ends_in):
+                info, setting_ends_in = room_state
+                break
+        computers = self._get_computers(only_changed=True, names=changed)
         result = {
             "computers": computers,
             "room_info": info,
@@ -594,25 +666,28 @@ class Instance(SchoolBaseModule):
         }
 
         if result["locked"] and "pid" in info:
-            result["user"] = info["user"]
             # somebody else acquired the room, the room is locked
-            try:
-                # open the corresponding UDM object to get a displayable user name
-                result["user"] = Display.user(
-                    User.from_dn(result["user"], None, ldap_user_read).get_udm_object(ldap_user_read)
-                )
-            except udm_exceptions.base as exc:
-                # could not oben the LDAP object, show the DN
-                MODULE.warn("Cannot open LDAP information for user %r: %s" % (result["user"], exc))
+            result["user"] = _getUserDisplayName(info["user"], ldap_user_read)
 
         # settings info
+        if setting_ends_in is not None:
+            result["settingEndsIn"] = setting_ends_in
+
+        MODULE.info("Update: result: %s" % (result,))
+        return result
+
+    def _get_room_state(self):
+        """
+        Returns the room information and the minutes until the settings end, which `update()`
+        reports besides the changed computers.
+        """
+        info = _readRoomInfo(self._computerroom.roomDN)
+        setting_ends_in = None
         if self._ruleEndAt is not None:
             diff = self._positiveTimeDiff()
             if diff is not None:
-                result["settingEndsIn"] = diff.seconds // 60
-
-        MODULE.info("Update: result: %s" % (result,))
-        self.finished(request.id, result)
+                setting_ends_in = diff.seconds // 60
+        return info, setting_ends_in
 
     def _positiveTimeDiff(self):
         now = datetime.datetime.now()
@@ -637,39 +712,58 @@ class Instance(SchoolBaseModule):
         else:
             computer.lockInput(lock)
 
+    @check_room_access
+    @sanitize(
+        computers=ListSanitizer(required=True, sanitizer=ComputerSanitizer(), min_elements=1),
+        device=ChoicesSanitizer(["screen", "input"], required=True),
+        lock=BooleanSanitizer(required=True),
+    )
+    @simple_response
+    def lock_bulk(self, computers, device, lock):
+        """
+        Lock or Unlock the screen or input of several computers concurrently.
+        Returns the result for each computer.
+        """
+        MODULE.warn("Locking device %s of %d computers" % (device, len(computers)))
+        if device == "screen":
+            return self._computerroom.fan_out(computers, lambda computer: computer.lockScreen(lock))
+        return self._computerroom.fan_out(computers, lambda computer: computer.lockInput(lock))
+
     @allow_get_request
     @check_room_access
     @sanitize(computer=ComputerSanitizer(required=True))
     def screenshot(self, request):
         """
         Returns a JPEG image containing a screenshot of the given computer
-        or a premade SVG image for special situations like when a screenshots is not ready yet
+        or a premade SVG image for special situations like when a screenshots is not ready yet.
+        Screenshots are cached for a few seconds and carry an ETag, so a matching If-None-Match
+        header is answered with 304 Not Modified.
         """
         computer = request.options["computer"]
-        tmpfile = computer.screenshot
+        MODULE.info("screenshot(%s): hide screenshot = %r" % (computer.name, computer.hide_screenshot))
+        screenshot = None
         if computer.hide_screenshot:
-            mimetype = "image/svg+xml"
             filename = FN_SCREENSHOT_DENIED
-        elif tmpfile is None:
-            mimetype = "image/svg+xml"
-            filename = FN_SCREENSHOT_NOTREADY
         else:
-            mimetype = "image/jpeg"
-            filename = tmpfile.name
+            screenshot = self._computerroom.screenshots.get(computer)
+            filename = FN_SCREENSHOT_NOTREADY
 
-        MODULE.info("screenshot(%s): hide screenshot = %r" % (computer.name, computer.hide_screenshot))
+        if screenshot is not None:
+            etag = '"%s"' % (screenshot.etag,)
+            headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+            if (getattr(request, "headers", None) or {}).get("If-None-Match") == etag:
+                self.finished(request.id, b"", mimetype="image/jpeg", status=304, headers=headers)
+            else:
+                self.finished(request.id, screenshot.image, mimetype="image/jpeg", headers=headers)
+            return
+
+        response = None
         try:
             with open(filename, "rb") as fd:
                 response = fd.read()
         except EnvironmentError as exc:
             MODULE.error("Unable to load screenshot file %r: %s" % (filename, exc))
-        try:
-            if tmpfile:
-                os.unlink(tmpfile.name)
-        except EnvironmentError as exc:
-            MODULE.error("Unable to remove temporary screenshot file %r: %s" % (tmpfile.name, exc))
-
-        self.finished(request.id, response, mimetype=mimetype)
+        self.finished(request.id, response, mimetype="image/svg+xml")
 
     def _read_rules_end_at(self):
         room_file = _getRoomFile(self._computerroom.roomDN)
@@ -994,6 +1088,21 @@ class Instance(SchoolBaseModule):
             computer.restart()
         return True
 
+    @sanitize(
+        state=ChoicesSanitizer(["poweroff", "restart"], required=True),
+        computers=ListSanitizer(required=True, sanitizer=ComputerSanitizer(), min_elements=1),
+    )
+    @check_room_access
+    @simple_response
+    def computer_state_bulk(self, computers, state):
+        """
+        Stops or restarts several computers concurrently. Returns the result for each computer.
+        Computers are not started in bulk, the frontend delays each wake up to avoid power peaks.
+        """
+        if state == "poweroff":
+            return self._computerroom.fan_out(computers, lambda computer: computer.powerOff())
+        return self._computerroom.fan_out(computers, lambda computer: computer.restart())
+
     @check_room_access
     @sanitize(computer=ComputerSanitizer(required=True))
     @simple_response
@@ -1002,6 +1111,13 @@ class Instance(SchoolBaseModule):
         computer.logOut()
         return True
 
+    @check_room_access
+    @sanitize(computers=ListSanitizer(required=True, sanitizer=ComputerSanitizer(), min_elements=1))
+    @simple_response
+    def user_logout_bulk(self, computers):
+        """Log out the users at several computers concurrently. Returns the result for each computer."""
+        return self._computerroom.fan_out(computers, lambda computer: computer.logOut())
+
     @simple_response
     def plugins_load(self):
         plugins = {"buttons": []}
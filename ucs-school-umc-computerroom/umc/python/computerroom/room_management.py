@@ -31,15 +31,18 @@
 # /usr/share/common-licenses/AGPL-3; if not, see
 # <http://www.gnu.org/licenses/>.
 
+import concurrent.futures
 import copy
+import functools
+import hashlib
 import random
 import re
-import tempfile
 import threading
 import time
 import traceback
 import uuid
-from typing import TYPE_CHECKING, Any, List, Optional, TypeVar  # noqa: F401
+from collections import defaultdict, namedtuple
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Set, TypeVar  # noqa: E501, F401
 
 import ldap
 from ldap.dn import explode_rdn
@@ -54,6 +57,7 @@ from ucsschool.veyon_client.models import (
     AuthenticationMethod,
     Dimension,
     Feature,
+    FeatureStatuses,
     ScreenshotFormat,
     VeyonError,
 )
@@ -74,6 +78,9 @@ VEYON_USER_REGEX = r"(?P<domain>.*)\\(?P<username>[^\(\\]+)$"
 
 VEYON_KEY_FILE = "/etc/ucsschool-veyon/key.pem"
 
+# seconds between two updates of a reachable computer (plus up to the same amount of random jitter)
+POLL_INTERVAL = 1.0
+
 
 class ComputerRoomError(Exception):
     pass
@@ -161,13 +168,14 @@ class UserMap(dict):
 
 
 class LockableAttribute(object):
-    def __init__(self, initial_value=None, locking=True):
-        # type: (Optional[LV], Optional[bool]) -> None
+    def __init__(self, initial_value=None, locking=True, on_change=None):
+        # type: (Optional[LV], Optional[bool], Optional[Callable[[], None]]) -> None
         self._lock = locking and threading.Lock() or None
         # MODULE.info('Locking object: %s' % self._lock)
         self._old = initial_value
         self._has_changed = False
         self._current = copy.deepcopy(initial_value)
+        self._on_change = on_change
 
     def lock(self):  # type: () -> None
         if self._lock is None:
@@ -218,12 +226,150 @@ class LockableAttribute(object):
 
     def set(self, value, force=False):  # type: (LV, Optional[bool]) -> None
         self.lock()
-        if value != self._current or force:
-            if value != self._current:
+        changed = value != self._current
+        if changed or force:
+            if changed:
                 self._has_changed = True
             self._old = copy.deepcopy(self._current)
             self._current = copy.deepcopy(value)
         self.unlock()
+        if changed and self._on_change:
+            self._on_change()
+
+
+def max_workers():  # type: () -> int
+    """Number of threads used to poll or control the computers of a room concurrently."""
+    return max(1, ucr.get_int("ucsschool/umc/computerroom/poll/workers", 8))
+
+
+class RoomPoller(threading.Thread):
+    """
+    Updates the state of all computers of a room using a bounded pool of worker
+    threads, instead of one thread per computer.
+
+    Reachable computers are updated every :py:data:`POLL_INTERVAL` to
+    ``2 * POLL_INTERVAL`` seconds. The interval of unreachable computers is
+    doubled after each failed update, up to the value of the UCR variable
+    ``ucsschool/umc/computerroom/poll/max-interval``.
+    """
+
+    def __init__(self, computers):  # type: (List[VeyonComputer]) -> None
+        super(RoomPoller, self).__init__(name="RoomPoller")
+        self.daemon = True
+        self._computers = list(computers)
+        self._workers = max_workers()
+        self._max_interval = max(
+            POLL_INTERVAL, ucr.get_int("ucsschool/umc/computerroom/poll/max-interval", 30)
+        )
+        self._stop_event = threading.Event()
+
+    def stop(self):  # type: () -> None
+        self._stop_event.set()
+
+    def interval(self, computer):  # type: (VeyonComputer) -> float
+        if computer.failed_updates:
+            interval = min(POLL_INTERVAL * 2**computer.failed_updates, self._max_interval)
+        else:
+            interval = POLL_INTERVAL
+        return interval + random.uniform(0, interval)  # nosec
+
+    def run(self):  # type: () -> None
+        MODULE.info("Polling %d computers with %d workers." % (len(self._computers), self._workers))
+        next_update = [0.0] * len(self._computers)
+        running = {}  # type: Dict[concurrent.futures.Future, int]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._workers) as executor:
+            while not self._stop_event.is_set():
+                now = time.monotonic()
+                busy = set(running.values())
+                timeout = POLL_INTERVAL
+                for index, computer in enumerate(self._computers):
+                    if index in busy or not computer.should_run:
+                        continue
+                    if next_update[index] > now:
+                        timeout = min(timeout, next_update[index] - now)
+                        continue
+                    running[executor.submit(computer.update)] = index
+                timeout = max(timeout, 0.05)
+                if running:
+                    done, _ = concurrent.futures.wait(
+                        list(running), timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        index = running.pop(future)
+                        next_update[index] = time.monotonic() + self.interval(self._computers[index])
+                else:
+                    self._stop_event.wait(timeout)
+        MODULE.info("Stopped polling computers.")
+
+
+class ChangeFeed(object):
+    """
+    Collects the names of the computers of a room whose state changed, so a
+    request can block until there is something new instead of polling.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._changed = set()  # type: Set[str]
+
+    def notify(self, name):  # type: (str) -> None
+        with self._condition:
+            self._changed.add(name)
+            self._condition.notify_all()
+
+    def wait(self, timeout):  # type: (float) -> Set[str]
+        """
+        Blocks until the state of a computer changed or `timeout` seconds passed.
+
+        :return: The names of the computers that changed since the last call.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._changed, timeout)
+            changed, self._changed = self._changed, set()
+        return changed
+
+    def clear(self):  # type: () -> None
+        with self._condition:
+            self._changed.clear()
+
+
+Screenshot = namedtuple("Screenshot", ["image", "etag", "timestamp"])
+
+
+class ScreenshotCache(object):
+    """
+    Keeps the latest screenshot of each computer of a room in memory.
+
+    A screenshot is fetched from Veyon at most once per `max_age` seconds and
+    computer, no matter how many requests ask for it in the meantime. The
+    `etag` of a screenshot is a hash of its content.
+    """
+
+    def __init__(self, max_age):  # type: (float) -> None
+        self._max_age = max_age
+        self._screenshots = {}  # type: Dict[str, Screenshot]
+        self._locks = defaultdict(threading.Lock)  # type: defaultdict[str, threading.Lock]
+        self._locks_lock = threading.Lock()
+
+    def get(self, computer):  # type: (VeyonComputer) -> Optional[Screenshot]
+        with self._locks_lock:
+            lock = self._locks[computer.name]
+        with lock:
+            screenshot = self._screenshots.get(computer.name)
+            if screenshot and time.monotonic() - screenshot.timestamp < self._max_age:
+                return screenshot
+            image = computer.screenshot
+            if image is None:
+                self._screenshots.pop(computer.name, None)
+                return None
+            screenshot = Screenshot(image, hashlib.sha1(image).hexdigest(), time.monotonic())  # nosec
+            self._screenshots[computer.name] = screenshot
+            return screenshot
+
+    def clear(self):  # type: () -> None
+        with self._locks_lock:
+            self._screenshots.clear()
+            self._locks.clear()
 
 
 class ComputerRoomManager(dict):
@@ -236,7 +382,12 @@ class ComputerRoomManager(dict):
         dict.__init__(self)
         self._user_map = UserMap(VEYON_USER_REGEX)
         self._veyon_client = None  # type: Optional[VeyonClient]
+        self._poller = None  # type: Optional[RoomPoller]
         self.screenshot_dimension = self.get_screenshot_dimension()
+        self.changes = ChangeFeed()
+        self.screenshots = ScreenshotCache(
+            ucr.get_int("ucsschool/umc/computerroom/screenshot/max-age", 2)
+        )
 
     @staticmethod
     def get_screenshot_dimension():
@@ -325,6 +476,8 @@ class ComputerRoomManager(dict):
                 "http://localhost:11080/api/v1",
                 credentials={"keyname": "teacher", "keydata": key_data},
                 auth_method=AuthenticationMethod.AUTH_KEYS,
+                pool_size=ucr.get_int("ucsschool/umc/computerroom/veyon/pool-size", 32),
+                timeout=ucr.get_int("ucsschool/umc/computerroom/veyon/timeout", 10),
             )
         return self._veyon_client
 
@@ -335,7 +488,19 @@ class ComputerRoomManager(dict):
 
         return [x.ipAddress for x in values]
 
+    def stop_polling(self, wait=False):  # type: (Optional[bool]) -> None
+        """Stop updating the state of the computers of the room."""
+        poller, self._poller = self._poller, None
+        if poller is None:
+            return
+        poller.stop()
+        if wait:
+            poller.join()
+
     def _clear(self):
+        self.stop_polling()
+        self.changes.clear()
+        self.screenshots.clear()
         if ComputerRoomManager.ROOM:
             for computer in self.values():
                 computer.stop()
@@ -389,11 +554,13 @@ class ComputerRoomManager(dict):
                     self.veyon_client,
                     self._user_map,
                     self.screenshot_dimension,
+                    change_feed=self.changes,
                 )
-                comp.start()
                 self.__setitem__(comp.name, comp)
             except ComputerRoomError as exc:
                 MODULE.warn("Computer could not be added: {}".format(exc))
+        self._poller = RoomPoller(self.values())
+        self._poller.start()
 
     @property
     def isDemoActive(self):
@@ -409,6 +576,38 @@ class ComputerRoomManager(dict):
     def demoClients(self):
         return [comp for comp in self.values() if comp.demoClient]
 
+    def fan_out(self, computers, action):
+        # type: (Iterable[VeyonComputer], Callable[[VeyonComputer], Any]) -> Dict[str, Dict[str, Any]]
+        """
+        Runs `action` for the given computers concurrently, using at most :py:func:`max_workers`
+        threads.
+
+        :param computers: The computers to run the action for
+        :param action: Called with each computer. The action failed if it raises an exception or
+            returns False.
+        :return: Maps the name of each computer to a dict with the keys `success` and `message`,
+            the latter containing the error message if the action raised an exception.
+        """
+        computers = list(computers)
+        results = {}  # type: Dict[str, Dict[str, Any]]
+        if not computers:
+            return results
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(len(computers), max_workers())
+        ) as executor:
+            futures = {executor.submit(action, computer): computer.name for computer in computers}
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                try:
+                    success = future.result() is not False
+                    message = None
+                except Exception as exc:
+                    MODULE.error("{}: {}".format(name, traceback.format_exc()))
+                    success = False
+                    message = str(exc)
+                results[name] = {"success": success, "message": message}
+        return results
+
     def startDemo(self, demo_server, fullscreen=True):
         if self.isDemoActive:
             self.stopDemo()
@@ -418,7 +617,9 @@ class ComputerRoomManager(dict):
             raise AttributeError("unknown system %s" % demo_server)
 
         # start demo server
-        clients = [comp for comp in self.values() if comp.name != demo_server and comp.connected()]
+        candidates = [comp for comp in self.values() if comp.name != demo_server]
+        connected = self.fan_out(candidates, lambda comp: comp.connected())
+        clients = [comp for comp in candidates if connected[comp.name]["success"]]
         MODULE.info("Demo server is %s" % (demo_server,))
         MODULE.info("Demo clients: %s" % ", ".join(x.name for x in clients))
         MODULE.info("Demo client users: %s" % ", ".join(str(x.user.current) for x in clients))
@@ -435,48 +636,47 @@ class ComputerRoomManager(dict):
         MODULE.info("Demo clients (teachers): %s" % ", ".join(teachers))
         demo_access_token = str(uuid.uuid4())
         server.startDemoServer(token=demo_access_token)
-        for client in clients:
-            client.startDemoClient(
+        self.fan_out(
+            clients,
+            lambda client: client.startDemoClient(
                 server=server,
                 token=demo_access_token,
                 full_screen=False if client.name in teachers else fullscreen,
-            )
+            ),
+        )
 
     def stopDemo(self):
         if self.demoServer is not None:
             self.demoServer.stopDemoServer()
         # This is necessary since Veyon has a considerable delay with exposing its demo client status.
         # So we just end the demo client on all computers.
-        clients = self.values()
-        for client in clients:
-            client.stopDemoClient()
+        self.fan_out(self.values(), lambda client: client.stopDemoClient())
 
 
-class VeyonComputer(threading.Thread):
-    def __init__(self, computer, veyon_client, user_map, screenshot_dimension):
-        # type: (Any, VeyonClient, UserMap) -> None
-        super(VeyonComputer, self).__init__()
+class VeyonComputer(object):
+    """State of a computer in a room, updated regularly by the rooms :py:class:`RoomPoller`."""
+
+    def __init__(self, computer, veyon_client, user_map, screenshot_dimension, change_feed=None):
+        # type: (Any, VeyonClient, UserMap, Optional[Dimension], Optional[ChangeFeed]) -> None
         self._computer = computer  # type: Any
         self._veyon_client = veyon_client  # type: VeyonClient
         self._user_map = user_map
         self._ip_addresses = self._computer.info.get("ip", [])  # type: List[str]
         self._reachable_ip = None
-        self._username = LockableAttribute()
-        self._state = LockableAttribute(initial_value="disconnected")
-        self._teacher = LockableAttribute(initial_value=False)
-        self._screen_lock = LockableAttribute(initial_value=None)
-        self._input_lock = LockableAttribute(initial_value=None)
-        self._demo_server = LockableAttribute(initial_value=None)
-        self._demo_client = LockableAttribute(initial_value=None)
+        on_change = functools.partial(change_feed.notify, self.name) if change_feed else None
+        self._username = LockableAttribute(on_change=on_change)
+        self._state = LockableAttribute(initial_value="disconnected", on_change=on_change)
+        self._teacher = LockableAttribute(initial_value=False, on_change=on_change)
+        self._screen_lock = LockableAttribute(initial_value=None, on_change=on_change)
+        self._input_lock = LockableAttribute(initial_value=None, on_change=on_change)
+        self._demo_server = LockableAttribute(initial_value=None, on_change=on_change)
+        self._demo_client = LockableAttribute(initial_value=None, on_change=on_change)
+        self._feature_statuses = None  # type: Optional[FeatureStatuses]
         self._timer = None
         self.should_run = True
+        self.failed_updates = 0  # number of consecutive unsuccessful updates
         self.screenshot_dimension = screenshot_dimension
 
-    def run(self):
-        while self.should_run:
-            self.update()
-            time.sleep(1.0 + random.uniform(0, 1))  # nosec
-
     @property
     def name(self):  # type: () -> Optional[str]
         return self._computer.info.get("name", None)
@@ -546,7 +746,7 @@ class VeyonComputer(threading.Thread):
         )
 
     @property
-    def screenshot(self):
+    def screenshot(self):  # type: () -> Optional[bytes]
         if not self.connected():
             MODULE.warn("{} not connected - skipping screenshot".format(self.name))
             return None
@@ -568,9 +768,7 @@ class VeyonComputer(threading.Thread):
             if image:
                 break
         if image:
-            tmp_file = tempfile.NamedTemporaryFile(delete=False)
-            tmp_file.write(image)
-            return tmp_file
+            return image
         else:
             MODULE.warn("{}: no screenshot available yet".format(self.name))
             return None
@@ -640,13 +838,21 @@ class VeyonComputer(threading.Thread):
                 return ip_address
         return None
 
-    def _fetch_feature_status(self, feature):  # type: (Feature) -> Optional[bool]
-        try:
-            return self._veyon_client.get_feature_status(feature, host=self.ipAddress)
-        except VeyonError as exc:
+    def _fetch_feature_statuses(self):  # type: () -> FeatureStatuses
+        statuses = self._veyon_client.get_feature_statuses(
+            [
+                Feature.INPUT_DEVICE_LOCK,
+                Feature.SCREEN_LOCK,
+                Feature.DEMO_SERVER,
+                Feature.DEMO_CLIENT_FULLSCREEN,
+                Feature.DEMO_CLIENT_WINDOWED,
+            ],
+            host=self.ipAddress,
+        )
+        for feature, exc in statuses.errors.items():
             # might just be a non reachable IP. TODO: Catch errors other than 404:
-            MODULE.error("Fetching feature status failed: {}".format(exc))
-        return None
+            MODULE.error("Fetching feature status of {} failed: {}".format(feature.name, exc))
+        return statuses
 
     def connected(self):
         return self._veyon_client.ping(host=self.ipAddress)
@@ -655,26 +861,16 @@ class VeyonComputer(threading.Thread):
         MODULE.info("{}: updating information.".format(self.name))
         try:
             veyon_user = None
-            input_lock = None
-            screen_lock = None
-            demo_server = None
-            demo_client = None
+            statuses = FeatureStatuses()
             if not self._veyon_client.ping(self.ipAddress):
                 MODULE.info("Ping not successfull for {} with IP {}".format(self.name, self.ipAddress))
                 MODULE.info("{}: Updating information was not successful.".format(self.name))
+                self.failed_updates += 1
                 self.reset_state()
                 return
             try:
                 veyon_user = self._veyon_client.get_user_info(host=self.ipAddress)
-                input_lock = self._fetch_feature_status(Feature.INPUT_DEVICE_LOCK)
-                screen_lock = self._fetch_feature_status(Feature.SCREEN_LOCK)
-                demo_server = self._fetch_feature_status(Feature.DEMO_SERVER)
-                demo_client = any(
-                    [
-                        self._fetch_feature_status(Feature.DEMO_CLIENT_FULLSCREEN),
-                        self._fetch_feature_status(Feature.DEMO_CLIENT_WINDOWED),
-                    ]
-                )
+                statuses = self._fetch_feature_statuses()
             except VeyonError as exc:
                 MODULE.warn("Veyon error on {}: {}".format(self.name, exc))
                 # InvalidConnection (2)from WebAPI
@@ -684,15 +880,28 @@ class VeyonComputer(threading.Thread):
                     self._veyon_client.remove_session(host=self.ipAddress)
             if veyon_user is None:
                 MODULE.warn("{}: Updating information was not successful.".format(self.name))
+                self.failed_updates += 1
                 self.reset_state()
                 return
+            self.failed_updates = 0
             self.state.set("connected")
             self.user.set(veyon_user.login)
-            self._input_lock.set(input_lock)
-            self._screen_lock.set(screen_lock)
             self.teacher.set(self.isTeacher)
-            self._demo_server.set(demo_server)
-            self._demo_client.set(demo_client)
+            changed = statuses.changed(self._feature_statuses)
+            self._feature_statuses = statuses
+            if not changed:
+                return
+            MODULE.info(
+                "{}: features changed: {}".format(
+                    self.name, ", ".join(sorted(feature.name for feature in changed))
+                )
+            )
+            self._input_lock.set(statuses.get(Feature.INPUT_DEVICE_LOCK))
+            self._screen_lock.set(statuses.get(Feature.SCREEN_LOCK))
+            self._demo_server.set(statuses.get(Feature.DEMO_SERVER))
+            self._demo_client.set(
+                statuses.any_active(Feature.DEMO_CLIENT_FULLSCREEN, Feature.DEMO_CLIENT_WINDOWED)
+            )
         except Exception:
             MODULE.error(
                 "Error updating information for {}: {}".format(
@@ -700,6 +909,7 @@ class VeyonComputer(threading.Thread):
                     traceback.format_exc(),
                 )
             )
+            self.failed_updates += 1
             self.reset_state()
 
     def stop(self):
@@ -713,6 +923,7 @@ class VeyonComputer(threading.Thread):
         self._screen_lock.set(None)
         self._demo_client.set(None)
         self._demo_server.set(None)
+        self._feature_statuses = None
 
     def open(self):
         pass  # Nothing to do for the VeyonComputer
@@ -721,20 +932,21 @@ class VeyonComputer(threading.Thread):
         for ip_address in self._ip_addresses:
             self._veyon_client.remove_session(ip_address)
 
-    def _set_feature(self, feature, active=True):  # type: (Feature, bool) -> None
+    def _set_feature(self, feature, active=True):  # type: (Feature, bool) -> bool
         if not self.connected():
             MODULE.warn("{} not connected - skipping setting feature {}".format(self.name, feature))
-            return
+            return False
         try:
             self._veyon_client.set_feature(feature, host=self.ipAddress, active=active)
         except VeyonError:
-            pass
+            return False
+        return True
 
-    def lockScreen(self, lock):  # type: (bool) -> None
-        self._set_feature(Feature.SCREEN_LOCK, lock)
+    def lockScreen(self, lock):  # type: (bool) -> bool
+        return self._set_feature(Feature.SCREEN_LOCK, lock)
 
-    def lockInput(self, lock):  # type: (bool) -> None
-        self._set_feature(Feature.INPUT_DEVICE_LOCK, lock)
+    def lockInput(self, lock):  # type: (bool) -> bool
+        return self._set_feature(Feature.INPUT_DEVICE_LOCK, lock)
 
     def startDemoServer(self, token):  # type: (str) -> None
         MODULE.process("Starting demo server on %s with token: %s" % (self.ipAddress, token))
@@ -742,8 +954,8 @@ class VeyonComputer(threading.Thread):
             Feature.DEMO_SERVER, host=self.ipAddress, active=True, arguments={"demoAccessToken": token}
         )
 
-    def stopDemoServer(self):
-        self._set_feature(Feature.DEMO_SERVER, active=False)
+    def stopDemoServer(self):  # type: () -> bool
+        return self._set_feature(Feature.DEMO_SERVER, active=False)
 
     def startDemoClient(self, server, token, full_screen=False):
         MODULE.process(
@@ -754,12 +966,13 @@ class VeyonComputer(threading.Thread):
         feature = Feature.DEMO_CLIENT_FULLSCREEN if full_screen else Feature.DEMO_CLIENT_WINDOWED
         self._veyon_client.set_feature(feature, host=self.ipAddress, active=True, arguments=arguments)
 
-    def stopDemoClient(self):
-        self._set_feature(Feature.DEMO_CLIENT_FULLSCREEN, active=False)
-        self._set_feature(Feature.DEMO_CLIENT_WINDOWED, active=False)
+    def stopDemoClient(self):  # type: () -> bool
+        fullscreen = self._set_feature(Feature.DEMO_CLIENT_FULLSCREEN, active=False)
+        windowed = self._set_feature(Feature.DEMO_CLIENT_WINDOWED, active=False)
+        return fullscreen and windowed
 
-    def powerOff(self):
-        self._set_feature(Feature.POWER_DOWN)
+    def powerOff(self):  # type: () -> bool
+        return self._set_feature(Feature.POWER_DOWN)
 
     def powerOn(self):
         if self.macAddress:
@@ -790,8 +1003,8 @@ class VeyonComputer(threading.Thread):
         else:
             MODULE.error("%s: no MAC address set - skipping powerOn" % (self.ipAddress,))
 
-    def restart(self):
-        self._set_feature(Feature.REBOOT)
+    def restart(self):  # type: () -> bool
+        return self._set_feature(Feature.REBOOT)
 
-    def logOut(self):
-        self._set_feature(Feature.USER_LOGOFF)
+    def logOut(self):  # type: () -> bool
+        return self._set_feature(Feature.USER_LOGOFF)
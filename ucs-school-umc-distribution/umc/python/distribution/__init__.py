@@ -157,16 +157,16 @@ class Instance(SchoolBaseModule):
         result = [
             {
                 # only show necessary information
-                "description": i.description,
-                "name": i.name,
-                "sender": i.sender.username,
-                "recipients": len(i.recipients),
-                "files": len(i.files),
-                "isDistributed": i.isDistributed,
+                "description": i["description"],
+                "name": i["name"],
+                "sender": i["sender"],
+                "recipients": i["recipients"],
+                "files": i["files"],
+                "isDistributed": i["isDistributed"],
             }
-            for i in util.Project.list()
-            if (pattern.match(i.name) or pattern.match(i.description))
-            and (filter == "all" or compare_dn(i.sender.dn, request.user_dn))
+            for i in util.Project.catalogue()
+            if (pattern.match(i["name"]) or pattern.match(i["description"]))
+            and (filter == "all" or compare_dn(i["senderDN"], request.user_dn))
         ]
         return result
 
@@ -32,12 +32,16 @@
 # <http://www.gnu.org/licenses/>.
 
 import errno
+import fcntl
+import hashlib
 import itertools
 import json
 import os
 import re
 import shutil
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from pipes import quote
 
@@ -64,7 +68,13 @@ POSTFIX_DATADIR_SENDER_PROJECT_SUFFIX = ucr.get(
 POSTFIX_DATADIR_RECIPIENT = ucr.get(
     "ucsschool/datadistribution/datadir/recipient", "Unterrichtsmaterial"
 )
+CATALOGUE_FILE = os.path.join(DISTRIBUTION_DATA_PATH, ".catalogue.json")
+MANIFESTS_PATH = os.path.join(DISTRIBUTION_DATA_PATH, ".manifests")
 PAM_HOMEDIR_SESSION = ucr.is_true("homedir/create", True)
+DISTRIBUTION_WORKERS = max(1, ucr.get_int("ucsschool/datadistribution/distribute/workers", 4))
+COLLECT_INCREMENTAL = ucr.is_true("ucsschool/datadistribution/collect/incremental", False)
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int), see ioctl_ficlone(2)
 
 TYPE_USER = "USER"
 TYPE_GROUP = "GROUP"
@@ -79,6 +89,38 @@ class InvalidProjectFilename(DistributionException):
     pass
 
 
+def copy_file(src, target):
+    """
+    Copy the content of the file `src` to `target`.
+
+    If the filesystem supports it, the data blocks are shared (reflink) or copied inside the
+    kernel (:py:func:`os.copy_file_range`), otherwise the content is copied in userspace.
+    """
+    with open(src, "rb") as fsrc, open(target, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            return
+        except (OSError, IOError):
+            pass  # different filesystems or no reflink support
+        if hasattr(os, "copy_file_range"):  # Python >= 3.8
+            try:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+                else:
+                    return
+            except OSError as exc:
+                if exc.errno not in (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL):
+                    raise
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+        shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+
+
 class _Dict(object):
     """
     Custom dict-like class. The initial set of keyword arguments is stored
@@ -253,6 +295,33 @@ def openRecipients(entryDN, ldap_connection):
         return group
 
 
+@contextmanager
+def _catalogue_lock():
+    """Serialize the modifications of the project catalogue between processes."""
+    with open(CATALOGUE_FILE + ".lock", "a") as fd:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def _read_catalogue():
+    """:return: `{filename: {"mtime_ns": int, "size": int, "project": dict or None}}`"""
+    try:
+        with open(CATALOGUE_FILE) as fd:
+            return json.load(fd)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def _write_catalogue(entries):
+    new_catalogue_file = "%s.new" % (CATALOGUE_FILE,)
+    with open(new_catalogue_file, "w") as fd:
+        json.dump(entries, fd)
+    os.rename(new_catalogue_file, CATALOGUE_FILE)
+
+
 class Project(_Dict):
     def __init__(self, *args, **_props):
         # init empty project dict
@@ -299,6 +368,11 @@ class Project(_Dict):
         """The absolute path of the project cache directory."""
         return os.path.join(DISTRIBUTION_DATA_PATH, "%s.data" % self.name)
 
+    @property
+    def manifestdir(self):
+        """The absolute path of the directory with the manifests of incremental collections."""
+        return os.path.join(MANIFESTS_PATH, self.name)
+
     @property
     def sender_projectdir(self):
         """The absolute path of the project directory in the senders home."""
@@ -435,6 +509,7 @@ class Project(_Dict):
             os.rename(new_projecfile, self.projectfile)
         except EnvironmentError as exc:
             raise IOError(_("Could not save project file: %s (%s)") % (self.projectfile, str(exc)))
+        self._update_catalogue()
 
     def _createCacheDir(self):
         """Create cache directory."""
@@ -580,29 +655,20 @@ class Project(_Dict):
 
         # iterate over all recipients
         MODULE.info('Distributing project "%s" with files: %s' % (self.name, ", ".join(files)))
-        for user in self.getRecipients() + [self.sender]:
+        users = self.getRecipients() + [self.sender]
+        for user in users:
             # create user project directory
+            # (not concurrently, as this changes the umask of the process and may open a PAM session)
             MODULE.info("recipient: uid=%s" % user.username)
             self._create_project_dir(user, self.user_projectdir(user))
 
-            # copy files from cache to recipient
-            for fn in files:
-                src = str(os.path.join(self.cachedir, fn))
-                target = str(os.path.join(self.user_projectdir(user), fn))
-                try:
-                    if os.path.islink(src):
-                        raise IOError("Symlinks are not allowed")
-                    shutil.copyfile(src, target)
-                except (OSError, IOError) as e:
-                    MODULE.error('failed to copy "%s" to "%s": %s' % (src, target, str(e)))
-                    usersFailed.append(user)
-                try:
-                    os.chown(target, int(user.uidNumber), int(user.gidNumber))
-                except (OSError, IOError) as e:
-                    MODULE.error('failed to chown "%s": %s' % (target, str(e)))
-                    usersFailed.append(user)
-            else:
-                MODULE.info("No new files to distribute in project: %s" % self.name)
+        if not files:
+            MODULE.info("No new files to distribute in project: %s" % self.name)
+        else:
+            # copy files from cache to the recipients
+            with ThreadPoolExecutor(max_workers=DISTRIBUTION_WORKERS) as executor:
+                results = executor.map(lambda user: self._distribute_files(user, files), users)
+                usersFailed.extend(user for user, success in zip(users, results) if not success)
 
         # remove cached files
         for fn in files:
@@ -619,6 +685,30 @@ class Project(_Dict):
 
         return len(usersFailed) == 0
 
+    def _distribute_files(self, user, files):
+        """
+        Copy the files from the cache directory to the project directory of `user`.
+
+        :return: whether all files could be copied
+        """
+        success = True
+        for fn in files:
+            src = str(os.path.join(self.cachedir, fn))
+            target = str(os.path.join(self.user_projectdir(user), fn))
+            try:
+                if os.path.islink(src):
+                    raise IOError("Symlinks are not allowed")
+                copy_file(src, target)
+            except (OSError, IOError) as e:
+                MODULE.error('failed to copy "%s" to "%s": %s' % (src, target, str(e)))
+                success = False
+            try:
+                os.chown(target, int(user.uidNumber), int(user.gidNumber))
+            except (OSError, IOError) as e:
+                MODULE.error('failed to chown "%s": %s' % (target, str(e)))
+                success = False
+        return success
+
     def _all_versions(self, recipient):
         """
         Returns a generator containing all version numbers of existing results for a given recipient.
@@ -706,69 +796,241 @@ class Project(_Dict):
             else:
                 MODULE.warn("Could not remove ntacl:\n{}".format(exc))
 
-    def collect(self, dirsFailed=None, readOnly=False, compress=False):
+    def _manifest_path(self, recipient):
+        return os.path.join(self.manifestdir, "%s.json" % (recipient.username,))
+
+    def _load_manifest(self, recipient):
+        """
+        Load the manifest of the last incremental collection of the results of `recipient`.
+
+        :return: `{"target": str, "readOnly": bool, "files": {relpath: entry}}` or `None`
+        """
+        try:
+            with open(self._manifest_path(recipient)) as fd:
+                return json.load(fd)
+        except (OSError, IOError, ValueError):
+            return None
+
+    def _save_manifest(self, recipient, manifest):
+        path = self._manifest_path(recipient)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path), 0o700)
+        with open(path + ".tmp", "w") as fd:
+            json.dump(manifest, fd)
+        os.rename(path + ".tmp", path)
+
+    @staticmethod
+    def _file_hash(path):
+        digest = hashlib.sha1()  # nosec
+        with open(path, "rb") as fd:
+            for chunk in iter(lambda: fd.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _is_unchanged(self, src, src_stat, previous_target, entry):
+        """
+        Check whether the file `src` is unchanged since it has been collected to `previous_target`,
+        which must not have been modified since (e.g. by the teacher).
+        """
+        try:
+            target_stat = os.stat(previous_target)
+        except OSError:
+            return False
+        if [target_stat.st_size, target_stat.st_mtime_ns] != entry["target"]:
+            return False
+        if src_stat.st_size != entry["size"]:
+            return False
+        if src_stat.st_mtime_ns == entry["mtime_ns"]:
+            return True
+        # modification time changed, but the content may still be the same
+        if not entry.get("sha1"):
+            entry["sha1"] = self._file_hash(previous_target)
+        return self._file_hash(src) == entry["sha1"]
+
+    def _collect_incremental(self, recipient, srcdir, targetdir, readOnly):
+        """
+        Copy the project directory `srcdir` of `recipient` to `targetdir`. Files that are unchanged
+        since the previous incremental collection are copied from the previous version with
+        :py:func:`copy_file`, which shares their data blocks (reflink) if the filesystem supports
+        it. They are not hardlinked, as the teacher may modify the collected files.
+
+        :return: whether there was enough space to collect the results
+        """
+        manifest = self._load_manifest(recipient)
+        previous_dir = None
+        previous_files = {}
+        if manifest and manifest.get("readOnly") == readOnly:
+            previous_dir = os.path.join(self.sender_projectdir, manifest["target"])
+            if os.path.isdir(previous_dir):
+                previous_files = manifest["files"]
+
+        # determine which files have to be copied from the recipient and which from previous_dir
+        dirs = []  # relative paths of the directories to create
+        files = {}  # {relpath: entry}
+        unchanged = set()  # relative paths of the files to copy from previous_dir
+        needed_space = 0
+        for root, dirnames, filenames in os.walk(srcdir):
+            # !important" don't let symlinks be copied (e.g. /etc/shadow).
+            dirnames[:] = [name for name in dirnames if not os.path.islink(os.path.join(root, name))]
+            reldir = os.path.relpath(root, srcdir)
+            dirs.append(reldir)
+            for name in filenames:
+                src = os.path.join(root, name)
+                if os.path.islink(src):
+                    continue
+                relpath = os.path.normpath(os.path.join(reldir, name))
+                src_stat = os.stat(src)
+                # shared data blocks are charged to the quota as well
+                needed_space += src_stat.st_size
+                entry = previous_files.get(relpath)
+                if entry and self._is_unchanged(
+                    src, src_stat, os.path.join(previous_dir, relpath), entry
+                ):
+                    unchanged.add(relpath)
+                    files[relpath] = entry
+                else:
+                    files[relpath] = {
+                        "size": src_stat.st_size,
+                        "mtime_ns": src_stat.st_mtime_ns,
+                        "sha1": None,
+                    }
+
+        if self._get_available_space() - needed_space < 0:
+            return False
+
+        MODULE.info(
+            "collecting %d files for user %r, %d of them unchanged since %s"
+            % (len(files), recipient.username, len(unchanged), previous_dir)
+        )
+        for reldir in dirs:
+            path = os.path.normpath(os.path.join(targetdir, reldir))
+            os.makedirs(path)
+            self._fix_permissions(path)
+        for relpath, entry in files.items():
+            target = os.path.join(targetdir, relpath)
+            if relpath in unchanged:
+                previous_target = os.path.join(previous_dir, relpath)
+                copy_file(previous_target, target)
+                shutil.copystat(previous_target, target)
+            else:
+                shutil.copy2(os.path.join(srcdir, relpath), target)
+            self._fix_permissions(target)
+            if readOnly:
+                os.chmod(target, 0o400)
+            target_stat = os.stat(target)
+            entry["target"] = [target_stat.st_size, target_stat.st_mtime_ns]
+        for reldir in reversed(dirs):
+            shutil.copystat(
+                os.path.join(srcdir, reldir), os.path.normpath(os.path.join(targetdir, reldir))
+            )
+
+        self._save_manifest(
+            recipient,
+            {"target": os.path.basename(targetdir), "readOnly": readOnly, "files": files},
+        )
+        return True
+
+    def collect(self, dirsFailed=None, readOnly=False, compress=False, incremental=None):
+        """
+        Collect the project directories of all recipients into the project directory of the sender.
+
+        :param bool incremental: copy the files that are unchanged since the previous collection from
+            there (reflinked if possible) instead of from the recipient (not if `compress` is set).
+            Defaults to the UCR variable
+            `ucsschool/datadistribution/collect/incremental`.
+        """
         if not isinstance(dirsFailed, list):
             dirsFailed = []
-        compressed_suffix = ".zip" if compress else ""
+        if incremental is None:
+            incremental = COLLECT_INCREMENTAL
 
         # make sure all necessary directories exist
         self._createProjectDir()
 
         # collect data from all recipients
-        for recipient in self.getRecipients():
-            targetdir = self._next_target(recipient)
-
-            # copy entire directory of the recipient
-            srcdir = os.path.join(self.user_projectdir(recipient))
-            # check space requirements
-            src_size = self._get_directory_size(srcdir)
-            available_space = self._get_available_space()
-            if available_space - src_size < 0:
-                MODULE.warn("not enough space to copy from %s to %s" % (srcdir, targetdir))
-                dirsFailed.append(srcdir)
-                continue
-            MODULE.info(
-                'collecting data for user "%s" from %s to %s' % (recipient.username, srcdir, targetdir)
-            )
-            if not os.path.isdir(srcdir):
-                MODULE.info("Source directory does not exist (no files distributed?)")
-            else:
-                try:
-                    # copy dir
-                    def ignore(src, names):
-                        # !important" don't let symlinks be copied (e.g. /etc/shadow).
-                        # don't use shutil.copytree(symlinks=True) for this as it changes the
-                        # owner + mode + flags of the symlinks afterwards
-                        return [name for name in names if os.path.islink(os.path.join(src, name))]
-
-                    # zip is hard coded for now. But it could be possible to make it configurable
-                    if compress and "zip" in (e[0] for e in shutil.get_archive_formats()):
-                        shutil.make_archive(targetdir, "zip", srcdir)
-                    else:
-                        shutil.copytree(srcdir, targetdir, ignore=ignore)
-
-                    # Necessary for correct filename in the permission fixing
-                    targetdir = targetdir + compressed_suffix
-                    # fix permission
-                    self._fix_permissions(targetdir)
-                    if compress:
-                        os.chmod(targetdir, 0o600)
-                    for root, dirs, files in os.walk(targetdir):
-                        for momo in dirs + files:
-                            self._fix_permissions(os.path.join(root, momo))
-                        if readOnly:
-                            for file in files:
-                                os.chmod(os.path.join(root, file), 0o400)
-
-                except (OSError, IOError, ValueError):
-                    MODULE.warn('Copy failed: "%s" ->  "%s"' % (srcdir, targetdir))
-                    MODULE.info("Traceback:\n%s" % traceback.format_exc())
+        with ThreadPoolExecutor(max_workers=DISTRIBUTION_WORKERS) as executor:
+            for srcdir in executor.map(
+                lambda recipient: self._collect_recipient(recipient, readOnly, compress, incremental),
+                self.getRecipients(),
+            ):
+                if srcdir:
                     dirsFailed.append(srcdir)
 
         return len(dirsFailed) == 0
 
+    def _collect_recipient(self, recipient, readOnly, compress, incremental):
+        """
+        Collect the project directory of `recipient`.
+
+        :return: the project directory of `recipient` if collecting failed, else `None`
+        """
+        compressed_suffix = ".zip" if compress else ""
+        targetdir = self._next_target(recipient)
+
+        # copy entire directory of the recipient
+        srcdir = os.path.join(self.user_projectdir(recipient))
+        if incremental and not compress and os.path.isdir(srcdir):
+            MODULE.info(
+                'collecting data for user "%s" from %s to %s (incremental)'
+                % (recipient.username, srcdir, targetdir)
+            )
+            try:
+                if not self._collect_incremental(recipient, srcdir, targetdir, readOnly):
+                    MODULE.warn("not enough space to copy from %s to %s" % (srcdir, targetdir))
+                    return srcdir
+            except (OSError, IOError, ValueError):
+                MODULE.warn('Copy failed: "%s" ->  "%s"' % (srcdir, targetdir))
+                MODULE.info("Traceback:\n%s" % traceback.format_exc())
+                return srcdir
+            return None
+
+        # check space requirements
+        src_size = self._get_directory_size(srcdir)
+        available_space = self._get_available_space()
+        if available_space - src_size < 0:
+            MODULE.warn("not enough space to copy from %s to %s" % (srcdir, targetdir))
+            return srcdir
+        MODULE.info(
+            'collecting data for user "%s" from %s to %s' % (recipient.username, srcdir, targetdir)
+        )
+        if not os.path.isdir(srcdir):
+            MODULE.info("Source directory does not exist (no files distributed?)")
+        else:
+            try:
+                # copy dir
+                def ignore(src, names):
+                    # !important" don't let symlinks be copied (e.g. /etc/shadow).
+                    # don't use shutil.copytree(symlinks=True) for this as it changes the
+                    # owner + mode + flags of the symlinks afterwards
+                    return [name for name in names if os.path.islink(os.path.join(src, name))]
+
+                # zip is hard coded for now. But it could be possible to make it configurable
+                if compress and "zip" in (e[0] for e in shutil.get_archive_formats()):
+                    shutil.make_archive(targetdir, "zip", srcdir)
+                else:
+                    shutil.copytree(srcdir, targetdir, ignore=ignore)
+
+                # Necessary for correct filename in the permission fixing
+                targetdir = targetdir + compressed_suffix
+                # fix permission
+                self._fix_permissions(targetdir)
+                if compress:
+                    os.chmod(targetdir, 0o600)
+                for root, dirs, files in os.walk(targetdir):
+                    for momo in dirs + files:
+                        self._fix_permissions(os.path.join(root, momo))
+                    if readOnly:
+                        for file in files:
+                            os.chmod(os.path.join(root, file), 0o400)
+
+            except (OSError, IOError, ValueError):
+                MODULE.warn('Copy failed: "%s" ->  "%s"' % (srcdir, targetdir))
+                MODULE.info("Traceback:\n%s" % traceback.format_exc())
+                return srcdir
+        return None
+
     def purge(self):
-        """Remove project's cache directory, project file, and at job registrations."""
+        """Remove project's cache directory, manifests, project file, and at job registrations."""
         if not self.projectfile or not os.path.exists(self.projectfile):
             MODULE.error("cannot remove empty or non existing projectfile: %s" % self.projectfile)
             return
@@ -785,11 +1047,22 @@ class Project(_Dict):
             except (OSError, IOError) as e:
                 MODULE.error("failed to cleanup cache directory: %s [%s]" % (self.cachedir, str(e)))
 
+        # remove manifests of incremental collections
+        if self.manifestdir and os.path.exists(self.manifestdir):
+            try:
+                shutil.rmtree(self.manifestdir)
+            except (OSError, IOError) as e:
+                MODULE.error(
+                    "failed to cleanup manifest directory: %s [%s]" % (self.manifestdir, str(e))
+                )
+
         # remove projectfile
         try:
             os.remove(self.projectfile)
         except (OSError, IOError) as e:
             MODULE.error("cannot remove projectfile: %s [%s]" % (self.projectfile, str(e)))
+        else:
+            self._update_catalogue(removed=True)
 
     @staticmethod
     def sanitize_project_filename(path):
@@ -857,9 +1130,9 @@ class Project(_Dict):
         MODULE.info("distribution_search: WALK = %s" % fn_projectlist)
         projectlist = []
         for fn_project in fn_projectlist:
-            # make sure the entry is a file
+            # make sure the entry is a project file (and not e.g. the project catalogue)
             fname = os.path.join(DISTRIBUTION_DATA_PATH, fn_project)
-            if not os.path.isfile(fname):
+            if fn_project.startswith(".") or not os.path.isfile(fname):
                 continue
 
             # load the project and add it to the result list
@@ -876,6 +1149,85 @@ class Project(_Dict):
         projectlist.sort(key=lambda x: x.name.lower())
         return projectlist
 
+    @staticmethod
+    def _catalogue_entry(project, stat):
+        """The summary of `project` that is stored in the project catalogue."""
+
+        def time2str(time):
+            return datetime.strftime(time, "%Y-%m-%d %H:%M") if time else None
+
+        return {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "project": project
+            and {
+                "name": project.name,
+                "description": project.description,
+                "sender": project.sender.username,
+                "senderDN": project.sender.dn,
+                "starttime": time2str(project.starttime),
+                "deadline": time2str(project.deadline),
+                "isDistributed": project.isDistributed,
+                "recipients": len(project.recipients),
+                "files": len(project.files),
+            },
+        }
+
+    def _update_catalogue(self, removed=False):
+        """Update the entry of this project in the project catalogue."""
+        try:
+            with _catalogue_lock():
+                entries = _read_catalogue()
+                if removed:
+                    entries.pop(self.name, None)
+                else:
+                    entries[self.name] = self._catalogue_entry(self, os.stat(self.projectfile))
+                _write_catalogue(entries)
+        except EnvironmentError as exc:
+            MODULE.warn("Could not update the project catalogue %s: %s" % (CATALOGUE_FILE, exc))
+
+    @staticmethod
+    def catalogue(only_distributed=False):
+        """
+        Get a summary of all projects, without loading all project files: Only the project files
+        that have been changed since the catalogue has last been updated are read.
+
+        :return: list of dicts with the keys `name`, `description`, `sender` (the username),
+            `senderDN`, `starttime`, `deadline`, `isDistributed`, `recipients` (the number of
+            recipients) and `files` (the number of files), sorted by name
+        """
+        with _catalogue_lock():
+            entries = _read_catalogue()
+            changed = False
+            filenames = set()
+            for fn_project in os.listdir(DISTRIBUTION_DATA_PATH):
+                fname = os.path.join(DISTRIBUTION_DATA_PATH, fn_project)
+                if fn_project.startswith(".") or not os.path.isfile(fname):
+                    continue
+                filenames.add(fn_project)
+                stat = os.stat(fname)
+                entry = entries.get(fn_project)
+                if entry and (entry["mtime_ns"], entry["size"]) == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                entries[fn_project] = Project._catalogue_entry(Project.load(fname), stat)
+                changed = True
+            for fn_project in set(entries) - filenames:
+                del entries[fn_project]
+                changed = True
+            if changed:
+                try:
+                    _write_catalogue(entries)
+                except EnvironmentError as exc:
+                    MODULE.warn("Could not write the project catalogue %s: %s" % (CATALOGUE_FILE, exc))
+
+        projectlist = [
+            entry["project"]
+            for entry in entries.values()
+            if entry["project"] and (entry["project"]["isDistributed"] or not only_distributed)
+        ]
+        projectlist.sort(key=lambda x: x["name"].lower())
+        return projectlist
+
 
 def initPaths():
     try:
@@ -41,7 +41,8 @@ import os.path
 import re
 import traceback
 from collections import defaultdict
-from typing import Dict, List, Tuple  # noqa: F401
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple  # noqa: F401
 
 import ldap
 from ldap.dn import escape_dn_chars, str2dn
@@ -81,6 +82,9 @@ from univention.management.console.modules import UMC_Error
 from univention.management.console.modules.decorators import sanitize
 from univention.management.console.modules.sanitizers import DNSanitizer, ListSanitizer, StringSanitizer
 
+if TYPE_CHECKING:
+    from univention.admin.uldap import access as LoType  # noqa: F401
+
 _ = Translation("ucs-school-umc-exam-master").translate
 
 CREATE_USER_PRE_HOOK_DIR = "/usr/share/ucs-school-exam-master/pyhooks/create_exam_user_pre/"
@@ -94,6 +98,16 @@ if "schoolexam" not in list(logger.handlers):
     logger.addHandler(_module_handler)
 
 
+def get_blacklist_set(value):  # type: (str) -> Set[str]
+    """
+    Split a pipe-separated (|) blacklist. A double pipe (||) is an escaped pipe symbol.
+
+    >>> sorted(get_blacklist_set('|My|new|Value|with|Pipe||symbol'))
+    ['My', 'Pipe|symbol', 'Value', 'new', 'with']
+    """
+    return {x.replace("||", "|") for x in re.split("(?<![|])[|](?![|])", value) if x}
+
+
 class Instance(SchoolBaseModule):
     _pre_create_hooks = None
     _room_host_cache = {}
@@ -185,6 +199,8 @@ class Instance(SchoolBaseModule):
                     exam_user_container.open()
                     exam_user_container["name"] = examUserContainerName
                     exam_user_container.create()
+                except univention.admin.uexceptions.objectExists:
+                    pass  # created concurrently by create_exam_users()
                 except univention.admin.uexceptions.base:
                     raise UMC_Error(_("Failed to create exam container\n%s") % traceback.format_exc())
 
@@ -192,6 +208,40 @@ class Instance(SchoolBaseModule):
 
         return self._examUserContainerDN[school]
 
+    @staticmethod
+    def get_blacklists():  # type: () -> Tuple[Set[str], Dict[str, Set[str]]]
+        """
+        Read the attribute and attribute value blacklists for exam users from UCR.
+
+        :return: tuple of the set of blacklisted attribute names and a mapping of attribute names to
+            the sets of their blacklisted values
+        """
+        value_blacklists = {}
+        prefix = "ucsschool/exam/user/ldap/blacklist/"
+        for key, value in ucr.items():
+            if key.startswith(prefix):
+                value_blacklists[key[len(prefix) :]] = get_blacklist_set(value)
+        return get_blacklist_set(ucr.get("ucsschool/exam/user/ldap/blacklist", "")), value_blacklists
+
+    @staticmethod
+    def get_prohibited_usernames(ldap_admin_write):  # type: (LoType) -> List[Tuple[str, List[str]]]
+        """Read the names of all settings/prohibited_username objects and their usernames."""
+        return [
+            (prohibited_object["name"], prohibited_object["usernames"])
+            for prohibited_object in univention.admin.handlers.settings.prohibited_username.lookup(
+                None, ldap_admin_write, ""
+            )
+        ]
+
+    @staticmethod
+    def get_room(room_dn, ldap_user_read):  # type: (str, LoType) -> Optional[ComputerRoom]
+        if not room_dn:
+            return None
+        try:
+            return ComputerRoom.from_dn(room_dn, None, ldap_user_read)
+        except univention.admin.uexceptions.noObject:
+            raise UMC_Error("Room %r not found." % (room_dn,))
+
     @sanitize(
         userdn=StringSanitizer(required=True),
         room=StringSanitizer(default=""),
@@ -208,36 +258,118 @@ class Instance(SchoolBaseModule):
         The group has to be created earlier, e.g. by create_ou (ucs-school-import).
         This function also restricts the login of the original user
         """
-        school = request.options["school"]
-        userdn = request.options["userdn"]
-        room_dn = request.options["room"]
-        exam = request.options["exam"]
         logger.info(
             "school=%r userdn=%r room=%r description=%r",
+            request.options["school"],
+            request.options["userdn"],
+            request.options["room"],
+            request.options["description"],
+        )
+        result = self._create_exam_user(
+            ldap_admin_write,
+            ldap_position,
+            request.options["userdn"],
+            request.options["school"],
+            self.get_room(request.options["room"], ldap_user_read),
+            request.options["exam"],
+            request.options["description"],
+            self.get_prohibited_usernames(ldap_admin_write),
+            self.get_blacklists(),
+        )
+        self.finished(request.id, result)
+
+    @sanitize(
+        users=ListSanitizer(StringSanitizer(required=True), required=True),
+        room=StringSanitizer(default=""),
+        description=StringSanitizer(default=""),
+        school=StringSanitizer(default=""),
+        exam=StringSanitizer(default=""),
+    )
+    @LDAP_Connection(USER_READ, ADMIN_WRITE)
+    def create_exam_users(self, request, ldap_user_read=None, ldap_admin_write=None, ldap_position=None):
+        """
+        Create the exam accounts for a list of users, see :py:meth:`create_exam_user`.
+
+        The room, the exam group and container, the prohibited usernames and the attribute blacklists
+        are looked up once for all users, and the accounts are created concurrently.
+
+        :return: list with one result per user (in the order of `users`):
+            `{"userdn": str, "success": bool, "examuserdn": str, "message": str}`. `examuserdn` is
+            `None` if the user is disabled and thus ignored.
+        """
+        school = request.options["school"]
+        logger.info(
+            "school=%r users=%r room=%r description=%r",
             school,
-            userdn,
-            room_dn,
+            request.options["users"],
+            request.options["room"],
             request.options["description"],
         )
+        room = self.get_room(request.options["room"], ldap_user_read)
+        if room and room not in self._room_host_cache:
+            self._room_host_cache[room] = room.get_computers(ldap_admin_write)
+        if school:
+            self.examGroup(ldap_admin_write, ldap_position, school)
+            self.examUserContainerDN(ldap_admin_write, ldap_position, school)
+        self.load_pre_create_hooks(ldap_admin_write)
+        prohibited_usernames = self.get_prohibited_usernames(ldap_admin_write)
+        blacklists = self.get_blacklists()
+
+        def create(userdn):  # type: (str) -> Dict[str, Any]
+            try:
+                result = self._create_exam_user(
+                    ldap_admin_write,
+                    ldap_position,
+                    userdn,
+                    school,
+                    room,
+                    request.options["exam"],
+                    request.options["description"],
+                    prohibited_usernames,
+                    blacklists,
+                )
+            except Exception as exc:
+                logger.warning("Could not create exam user account for %r: %s", userdn, exc)
+                return {"userdn": userdn, "success": False, "examuserdn": None, "message": str(exc)}
+            if not result:  # disabled user
+                return {"userdn": userdn, "success": True, "examuserdn": None, "message": ""}
+            return dict(result, message="")
+
+        max_workers = max(1, ucr.get_int("ucsschool/exam/user/create/workers", 4))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(create, request.options["users"]))
+        self.finished(request.id, results)
+
+    def _create_exam_user(
+        self,
+        ldap_admin_write,
+        ldap_position,
+        userdn,
+        school,
+        room,
+        exam,
+        description,
+        prohibited_usernames,
+        blacklists,
+    ):  # type: (LoType, univention.admin.uldap.position, str, str, Optional[ComputerRoom], str, str, List[Tuple[str, List[str]]], Tuple[Set[str], Dict[str, Set[str]]]) -> Optional[Dict[str, Any]]  # noqa: E501
+        """
+        Create the exam account for the user `userdn`.
+
+        :return: `{"success": True, "userdn": str, "examuserdn": str}` or `None` if the user is disabled
+        :raises UMC_Error: if the exam account cannot be created
+        """
         try:
             user = Student.from_dn(userdn, None, ldap_admin_write)
         except univention.admin.uexceptions.noObject:
             raise UMC_Error(_("Student %r not found.") % (userdn,))
         except univention.admin.uexceptions.ldapError:
             raise
-        room = None
-        if room_dn != "":
-            try:
-                room = ComputerRoom.from_dn(room_dn, None, ldap_user_read)
-            except univention.admin.uexceptions.noObject:
-                raise UMC_Error("Room %r not found." % (room_dn,))
 
         user_orig = user.get_udm_object(ldap_admin_write)
 
         if user_orig["disabled"] == "1":
             logger.info("Ignored disabled user {}".format(userdn))
-            self.finished(request.id, None)
-            return
+            return None
 
         if len(user_orig["sambaUserWorkstations"]) == 0:
             user_orig["sambaUserWorkstations"] = ["$"]
@@ -286,14 +418,11 @@ class Instance(SchoolBaseModule):
                     exam_user.name,
                     exam,
                 )
-            self.finished(request.id, {"success": True, "userdn": userdn, "examuserdn": exam_user.dn})
-            return
+            return {"success": True, "userdn": userdn, "examuserdn": exam_user.dn}
 
         # Check if it's blacklisted
-        for prohibited_object in univention.admin.handlers.settings.prohibited_username.lookup(
-            None, ldap_admin_write, ""
-        ):
-            if exam_user_uid in prohibited_object["usernames"]:
+        for prohibited_object_name, prohibited_object_usernames in prohibited_usernames:
+            if exam_user_uid in prohibited_object_usernames:
                 raise UMC_Error(
                     _(
                         "Requested exam username %(exam_user_uid)s is not allowed according to "
@@ -301,7 +430,7 @@ class Instance(SchoolBaseModule):
                     )
                     % {
                         "exam_user_uid": exam_user_uid,
-                        "prohibited_object_name": prohibited_object["name"],
+                        "prohibited_object_name": prohibited_object_name,
                     }
                 )
 
@@ -315,10 +444,7 @@ class Instance(SchoolBaseModule):
         except univention.admin.uexceptions.noLock:
             univention.admin.allocators.release(ldap_admin_write, ldap_position, "uid", exam_user_uid)
             logger.warning("The exam account does already exist for: %r", exam_user_uid)
-            self.finished(
-                request.id, {"success": True, "userdn": userdn, "examuserdn": exam_user_dn}, success=True
-            )
-            return
+            return {"success": True, "userdn": userdn, "examuserdn": exam_user_dn}
 
         # Ok, we have a valid target uid, so start cloning the user
         # deepcopy(user_orig) does not help much, as we cannot use users.user.object.create()
@@ -359,26 +485,11 @@ class Instance(SchoolBaseModule):
                 alloc.append(("sid", userSid))
 
             # Determine description attribute for exam_user
-            exam_user_description = request.options.get("description")
+            exam_user_description = description
             if not exam_user_description:
                 exam_user_description = _("Exam for user %s") % user_orig["username"]
 
-            def getBlacklistSet(ucrvar):
-                """
-                >>> set([
-                        x.replace('||','|')
-                        for x in re.split('(?<![|])[|](?![|])', '|My|new|Value|with|Pipe||symbol')
-                        if x
-                    ])
-                set(['with', 'new', 'My', 'Value', 'Pipe|symbol'])
-                """
-                return {
-                    x.replace("||", "|")
-                    for x in re.split("(?<![|])[|](?![|])", ucr.get(ucrvar, ""))
-                    if x
-                }
-
-            blacklisted_attributes = getBlacklistSet("ucsschool/exam/user/ldap/blacklist")
+            blacklisted_attributes, value_blacklists = blacklists
 
             # Now create the addlist, fixing up attributes as we go
             al = []
@@ -405,7 +516,7 @@ class Instance(SchoolBaseModule):
                 if key == "sambaUserWorkstations":  # special handling for this attribute
                     continue
                 # ignore blacklisted attribute values
-                keyBlacklist = getBlacklistSet("ucsschool/exam/user/ldap/blacklist/%s" % key)
+                keyBlacklist = value_blacklists.get(key, set())
                 value = [x for x in value if x not in keyBlacklist]
                 if not value:
                     continue
@@ -527,7 +638,7 @@ class Instance(SchoolBaseModule):
         univention.admin.allocators.confirm(ldap_admin_write, ldap_position, "sid", userSid)
         univention.admin.allocators.confirm(ldap_admin_write, ldap_position, "uidNumber", uidNum)
 
-        self.finished(request.id, {"success": True, "userdn": userdn, "examuserdn": exam_user_dn})
+        return {"success": True, "userdn": userdn, "examuserdn": exam_user_dn}
 
     @sanitize(
         users=ListSanitizer(DNSanitizer(required=True), required=True),
@@ -790,14 +901,16 @@ class Instance(SchoolBaseModule):
 
         self.finished(request.id, {}, success=True)
 
-    def run_pre_create_hooks(self, exam_user_dn, al, ldap_admin_write):
-        if not self.exam_user_pre_create_hooks:
+    def load_pre_create_hooks(self, ldap_admin_write):
+        if self.exam_user_pre_create_hooks is None:
             add_module_logger_to_schoollib()
             pyhook_loader = ImportPyHookLoader(CREATE_USER_PRE_HOOK_DIR)
             hooks = pyhook_loader.init_hook(ExamUserPyHook, lo=ldap_admin_write, dry_run=False)
             self.exam_user_pre_create_hooks = hooks.get("pre_create", [])
+        return self.exam_user_pre_create_hooks
 
-        for hook in self.exam_user_pre_create_hooks:
+    def run_pre_create_hooks(self, exam_user_dn, al, ldap_admin_write):
+        for hook in self.load_pre_create_hooks(ldap_admin_write):
             al = hook(exam_user_dn, al)
 
         return al
@@ -40,11 +40,12 @@ import subprocess
 import tempfile
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from itertools import chain
-from typing import TYPE_CHECKING, List, Optional  # noqa: F401
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple  # noqa: F401
 
 import ldap
-from ldap.dn import escape_dn_chars
+from ldap.dn import dn2str, escape_dn_chars, str2dn
 from ldap.filter import filter_format
 from samba.auth_util import system_session_unix
 from samba.ntacls import getntacl, setntacl
@@ -102,6 +103,10 @@ if TYPE_CHECKING:
 _ = Translation("ucs-school-umc-exam").translate
 
 CREATE_USER_POST_HOOK_DIR = "/usr/share/ucs-school-exam/hooks/create_exam_user_post.d/"
+CREATE_EXAM_USERS_CHUNK_SIZE = 10  # students per schoolexam-master/create-exam-users request
+REPLICATION_SEARCH_CHUNK_SIZE = 100  # exam users per LDAP search while waiting for the replication
+REPLICATION_WAIT_MIN_DELAY = 0.5
+REPLICATION_WAIT_MAX_DELAY = 5.0
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 if "schoolexam" not in list(logger.handlers):
@@ -145,6 +150,55 @@ def load_smb_default_file() -> Optional[LoadParm]:
         )
 
 
+def _normalize_dn(dn: str) -> str:
+    return dn2str(str2dn(dn.lower()))
+
+
+def get_replicated_dns(lo: "LoType", dns: Iterable[str]) -> Set[str]:
+    """
+    Find out which of the LDAP objects `dns` exist in the local LDAP.
+
+    Instead of reading each object, one LDAP search (per chunk of objects) is done per parent container.
+
+    :return: the subset of `dns` that exists
+    """
+    by_parent: Dict[str, List[Tuple[List[Tuple[str, str, int]], str]]] = {}
+    for dn in dns:
+        rdns = str2dn(dn)
+        by_parent.setdefault(dn2str(rdns[1:]), []).append((rdns[0], dn))
+    found = set()
+    for parent, entries in by_parent.items():
+        wanted = {_normalize_dn(dn): dn for _rdn, dn in entries}
+        for start in range(0, len(entries), REPLICATION_SEARCH_CHUNK_SIZE):
+            ldap_filter = "(|%s)" % "".join(
+                filter_format("(%s=%s)", (attr, value))
+                for rdn, _dn in entries[start : start + REPLICATION_SEARCH_CHUNK_SIZE]
+                for attr, value, _flags in rdn
+            )
+            try:
+                result = lo.searchDn(ldap_filter, base=parent, scope="one")
+            except (ldap.NO_SUCH_OBJECT, noObject):
+                break  # the container has not been replicated yet
+            found.update(wanted[dn] for dn in map(_normalize_dn, result) if dn in wanted)
+    return found
+
+
+def run_create_user_post_hooks(user: util.distribution.User) -> None:
+    if 0 != subprocess.call(  # nosec
+        [
+            "/bin/run-parts",
+            CREATE_USER_POST_HOOK_DIR,
+            "--arg",
+            user.username,
+            "--arg",
+            user.dn,
+            "--arg",
+            user.homedir,
+        ]
+    ):
+        raise ValueError(f"failed to run hook scripts for user {user.username!r}")
+
+
 class Instance(SchoolBaseModule):
     def __init__(self):
         SchoolBaseModule.__init__(self)
@@ -643,40 +697,51 @@ class Instance(SchoolBaseModule):
             examUsers = set()
             student_dns = set()
             usersReplicated = set()
-            for num, iuser in enumerate(users, start=1):
+            for start in range(0, len(users), CREATE_EXAM_USERS_CHUNK_SIZE):
+                chunk = users[start : start + CREATE_EXAM_USERS_CHUNK_SIZE]
                 logger.info(
-                    "start_exam() Requesting exam user %02d/%02d to be created: %r",
-                    num,
+                    "start_exam() Requesting exam users %02d-%02d/%02d to be created: %r",
+                    start + 1,
+                    start + len(chunk),
                     len(users),
-                    iuser.dn,
-                )
-                progress.info(
-                    "(%02d/%02d) %s, %s (%s)"
-                    % (num, len(users), iuser.lastname, iuser.firstname, iuser.username)
+                    [iuser.dn for iuser in chunk],
                 )
                 try:
-                    ires = client.umc_command(
-                        "schoolexam-master/create-exam-user",
+                    results = client.umc_command(
+                        "schoolexam-master/create-exam-users",
                         {
                             "school": request.options["school"],
-                            "userdn": iuser.dn,
+                            "users": [iuser.dn for iuser in chunk],
                             "room": request.options["room"],
                             "exam": request.options["name"],
                         },
                     ).result
-                    if not ires:  # occurs if disabled user gets ignored
-                        continue
-                    examuser_dn = ires.get("examuserdn")
-                    examUsers.add(examuser_dn)
-                    student_dns.add(iuser.dn)
-                    logger.info("start_exam() Exam user has been created: %r", examuser_dn)
                 except (ConnectionError, HTTPError) as exc:
                     logger.warning(
-                        "start_exam() Could not create exam user account for %r: %s", iuser.dn, exc
+                        "start_exam() Could not create exam user accounts for %r: %s",
+                        [iuser.dn for iuser in chunk],
+                        exc,
                     )
+                    results = [{"userdn": iuser.dn, "success": False} for iuser in chunk]
 
-                # indicate the the user has been processed
-                progress.add_steps(percentPerUser)
+                for num, (iuser, ires) in enumerate(zip(chunk, results), start=start + 1):
+                    progress.info(
+                        "(%02d/%02d) %s, %s (%s)"
+                        % (num, len(users), iuser.lastname, iuser.firstname, iuser.username)
+                    )
+                    if not ires["success"]:
+                        logger.warning(
+                            "start_exam() Could not create exam user account for %r: %s",
+                            iuser.dn,
+                            ires.get("message"),
+                        )
+                    elif ires["examuserdn"]:  # None if disabled user gets ignored
+                        examUsers.add(ires["examuserdn"])
+                        student_dns.add(iuser.dn)
+                        logger.info("start_exam() Exam user has been created: %r", ires["examuserdn"])
+
+                    # indicate the the user has been processed
+                    progress.add_steps(percentPerUser)
 
             logger.info(
                 "start_exam() Sending DNs to add to group to Primary Directory Node: %r", student_dns
@@ -690,28 +755,35 @@ class Instance(SchoolBaseModule):
             # wait for the replication of all users to be finished
             progress.component(_("Preparing user home directories"))
             recipients = []  # list of User objects for all exam users
-            openAttempts = 30 * 60  # wait max. 30 minutes for replication
-            while (len(examUsers) > len(usersReplicated)) and (openAttempts > 0):
-                openAttempts -= 1
-                logger.info(
-                    "start_exam() waiting for replication to be finished, %d user objects missing",
-                    len(examUsers) - len(usersReplicated),
-                )
-                for idn in examUsers - usersReplicated:
-                    try:
-                        ldap_user_read.get(idn, required=True)
-                    except ldap.NO_SUCH_OBJECT:
-                        continue  # not replicated yet
-                    iuser = util.distribution.openRecipients(idn, ldap_user_read)
-                    if not iuser:
-                        continue  # not a users/user object
-                    logger.info("user has been replicated: %r", idn)
+            deadline = time.monotonic() + 30 * 60  # wait max. 30 minutes for replication
+            delay = REPLICATION_WAIT_MIN_DELAY
+            hook_workers = max(1, ucr.get_int("ucsschool/exam/user/create/post-hook/workers", 4))
+            with ThreadPoolExecutor(max_workers=hook_workers) as executor:
+                while (len(examUsers) > len(usersReplicated)) and time.monotonic() < deadline:
+                    logger.info(
+                        "start_exam() waiting for replication to be finished, %d user objects missing",
+                        len(examUsers) - len(usersReplicated),
+                    )
+                    replicated = []
+                    for idn in get_replicated_dns(ldap_user_read, examUsers - usersReplicated):
+                        iuser = util.distribution.openRecipients(idn, ldap_user_read)
+                        if not iuser:
+                            continue  # not a users/user object
+                        logger.info("user has been replicated: %r", idn)
+                        replicated.append((idn, iuser))
+
+                    if not replicated:
+                        # back off, until the next users have been replicated
+                        time.sleep(delay)
+                        delay = min(delay * 2, REPLICATION_WAIT_MAX_DELAY)
+                        continue
+                    delay = REPLICATION_WAIT_MIN_DELAY
 
                     # Bug #52307:
                     # Creating two exams quickly in succession leads to the
                     # second exam mode using the same UIDs as the first.
-                    # -> clear user name cache to force Samba to get the
-                    # new UID from ldap.
+                    # -> clear user name cache (once for all newly replicated users)
+                    # to force Samba to get the new UID from ldap.
                     logger.info("Clear user name cache...")
                     cmd = ["/usr/sbin/nscd", "-i", "passwd"]
                     if subprocess.call(cmd):  # nosec
@@ -720,37 +792,27 @@ class Instance(SchoolBaseModule):
                         logger.info("Clearing user name cache finished successfully.")
 
                     # call hook scripts
-                    if 0 != subprocess.call(  # nosec
-                        [
-                            "/bin/run-parts",
-                            CREATE_USER_POST_HOOK_DIR,
-                            "--arg",
-                            iuser.username,
-                            "--arg",
-                            iuser.dn,
-                            "--arg",
-                            iuser.homedir,
-                        ]
-                    ):
-                        raise ValueError(f"failed to run hook scripts for user {iuser.username!r}")
+                    futures = [
+                        (idn, iuser, executor.submit(run_create_user_post_hooks, iuser))
+                        for idn, iuser in replicated
+                    ]
+                    for idn, iuser, future in futures:
+                        future.result()  # raises ValueError if the hook scripts failed
 
-                    # store User object in list of final recipients
-                    recipients.append(iuser)
+                        # store User object in list of final recipients
+                        recipients.append(iuser)
 
-                    # mark the user as replicated
-                    usersReplicated.add(idn)
-                    progress.info(
-                        f"({len(usersReplicated):02d}/{len(examUsers):02d}) {iuser.lastname}, "
-                        f"{iuser.firstname} ({iuser.username})"
-                    )
-                    progress.add_steps(percentPerUser)
-
-                # wait a second
-                time.sleep(1)
+                        # mark the user as replicated
+                        usersReplicated.add(idn)
+                        progress.info(
+                            f"({len(usersReplicated):02d}/{len(examUsers):02d}) {iuser.lastname}, "
+                            f"{iuser.firstname} ({iuser.username})"
+                        )
+                        progress.add_steps(percentPerUser)
 
             progress.add_steps(percentPerUser)
 
-            if openAttempts <= 0:
+            if len(examUsers) > len(usersReplicated):
                 logger.error(
                     "replication timeout - %d user objects missing: %r ",
                     (len(examUsers) - len(usersReplicated)),
@@ -259,7 +259,10 @@ class Instance(SchoolBaseModule):
             classes = []
             for school in schools:
                 classes += SchoolClass.get_all(
-                    ldap_user_read, school, filter_str=filter_format("uniqueMember=%s", (group_dn,))
+                    ldap_user_read,
+                    school,
+                    filter_str=filter_format("uniqueMember=%s", (group_dn,)),
+                    fields=("name",),
                 )
             result["classes"] = [
                 {"id": class_.dn, "label": class_.get_relative_name(), "school": class_.school}
@@ -451,7 +451,7 @@ class Instance(SchoolBaseModule, SchoolImport):
                 ret.append({"result": {"message": _('"%s" does not exist!') % obj.name}})
         return ret
 
-    def _get_all(self, klass, school, filter_str, lo, easy_filter=True, school_prefix=True):
+    def _get_all(self, klass, school, filter_str, lo, easy_filter=True, school_prefix=True, fields=None):
         if school:
             schools = [School.cache(school)]
         else:
@@ -461,18 +461,21 @@ class Instance(SchoolBaseModule, SchoolImport):
         objs = []
         for school in schools:
             try:
+                # convert page by page, so the UDM objects of large schools are not all kept in memory
                 objs.extend(
-                    klass.get_all(
+                    obj.to_dict()
+                    for obj in klass.iter_all(
                         lo,
                         school.name,
                         filter_str=filter_str,
                         easy_filter=easy_filter,
                         school_prefix=school_prefix,
+                        fields=fields,
                     )
                 )
             except noObject as exc:
                 MODULE.error("Could not get all objects of %r: %r" % (klass.__name__, exc))
-        return [obj.to_dict() for obj in objs]
+        return objs
 
     @sanitize(
         school=StringSanitizer(required=True),
@@ -621,7 +624,14 @@ class Instance(SchoolBaseModule, SchoolImport):
     @LDAP_Connection()
     def get_classes(self, request, ldap_user_read=None):
         school = request.options["school"]
-        return self._get_all(SchoolClass, school, request.options.get("filter"), ldap_user_read)
+        # the grid shows only these, so do not open every class (with all its members) in UDM
+        return self._get_all(
+            SchoolClass,
+            school,
+            request.options.get("filter"),
+            ldap_user_read,
+            fields=("name", "description"),
+        )
 
     get_class = _get_obj
     modify_class = _modify_obj
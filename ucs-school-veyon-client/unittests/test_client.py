@@ -40,6 +40,7 @@ from requests import ConnectionError, Response
 from veyon_client.client import VeyonClient
 from veyon_client.models import (
     AuthenticationMethod,
+    FeatureStatuses,
     VeyonConnectionError,
     VeyonError,
     VeyonSession,
@@ -128,7 +129,7 @@ def monkey_delete(*args, **kwargs):
 
 
 def test_connection_error_on_unreachable_url(monkeypatch):
-    monkeypatch.setattr(requests, "get", monkey_get)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
     with pytest.raises(ConnectionError):
         client = VeyonClient("unreachable", {})
         client.ping()
@@ -141,7 +142,7 @@ def test_connection_test(monkeypatch):
 
 
 def test_authentication_method_not_available(monkeypatch):
-    monkeypatch.setattr(requests, "post", monkey_post)
+    monkeypatch.setattr(requests.Session, "post", staticmethod(monkey_post))
     client = VeyonClient("wrong_method", {}, auth_method=AuthenticationMethod.AUTH_KEYS)
     with pytest.raises(VeyonError) as exc:
         client._create_session("localhost")
@@ -149,8 +150,8 @@ def test_authentication_method_not_available(monkeypatch):
 
 
 def test_wrong_credentials(monkeypatch):
-    monkeypatch.setattr(requests, "get", monkey_get)
-    monkeypatch.setattr(requests, "post", monkey_post)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
+    monkeypatch.setattr(requests.Session, "post", staticmethod(monkey_post))
     client = VeyonClient("wrong_credentials", {}, auth_method=AuthenticationMethod.AUTH_LOGON)
     with pytest.raises(VeyonError) as exc:
         client._create_session("localhost")
@@ -158,8 +159,8 @@ def test_wrong_credentials(monkeypatch):
 
 
 def test_create_session(monkeypatch):
-    monkeypatch.setattr(requests, "get", monkey_get)
-    monkeypatch.setattr(requests, "post", monkey_post)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
+    monkeypatch.setattr(requests.Session, "post", staticmethod(monkey_post))
     client = VeyonClient("create_session", {}, auth_method=AuthenticationMethod.AUTH_LOGON)
     assert client._create_session("localhost") == VeyonSession("42", 0)
 
@@ -175,8 +176,8 @@ def test_reuse_session():
 
 
 def test_second_host(monkeypatch):
-    monkeypatch.setattr(requests, "get", monkey_get)
-    monkeypatch.setattr(requests, "post", monkey_post)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
+    monkeypatch.setattr(requests.Session, "post", staticmethod(monkey_post))
     client = VeyonClient("create_session", {}, auth_method=AuthenticationMethod.AUTH_LOGON)
     time = datetime.now()
     client._session_cache["localhost"] = VeyonSession(
@@ -187,9 +188,9 @@ def test_second_host(monkeypatch):
 
 @pytest.mark.parametrize("screenshot_format,compression,quality", [("png", 6, 80), ("jpeg", 1, 20)])
 def test_framebuffer(monkeypatch, screenshot_format, compression, quality):
-    monkeypatch.setattr(requests, "get", monkey_get)
-    monkeypatch.setattr(requests, "post", monkey_post)
-    monkeypatch.setattr(requests, "delete", monkey_delete)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
+    monkeypatch.setattr(requests.Session, "post", staticmethod(monkey_post))
+    monkeypatch.setattr(requests.Session, "delete", staticmethod(monkey_delete))
     client = VeyonClient("framebuffer", {}, auth_method=AuthenticationMethod.AUTH_LOGON)
     assert client.get_screenshot(
         screenshot_format=screenshot_format, quality=quality, compression=compression
@@ -197,9 +198,9 @@ def test_framebuffer(monkeypatch, screenshot_format, compression, quality):
 
 
 def test_wrong_image_format(monkeypatch):
-    monkeypatch.setattr(requests, "get", monkey_get)
-    monkeypatch.setattr(requests, "post", monkey_post)
-    monkeypatch.setattr(requests, "delete", monkey_delete)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
+    monkeypatch.setattr(requests.Session, "post", staticmethod(monkey_post))
+    monkeypatch.setattr(requests.Session, "delete", staticmethod(monkey_delete))
     client = VeyonClient("framebuffer", {}, auth_method=AuthenticationMethod.AUTH_LOGON)
     with pytest.raises(VeyonError) as exc:
         client.get_screenshot(screenshot_format="gif")
@@ -207,9 +208,9 @@ def test_wrong_image_format(monkeypatch):
 
 
 def test_encoding_error(monkeypatch):
-    monkeypatch.setattr(requests, "get", monkey_get)
-    monkeypatch.setattr(requests, "post", monkey_post)
-    monkeypatch.setattr(requests, "delete", monkey_delete)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
+    monkeypatch.setattr(requests.Session, "post", staticmethod(monkey_post))
+    monkeypatch.setattr(requests.Session, "delete", staticmethod(monkey_delete))
     client = VeyonClient("encoding_error", {}, auth_method=AuthenticationMethod.AUTH_LOGON)
     with pytest.raises(VeyonError) as exc:
         client.get_screenshot()
@@ -217,9 +218,9 @@ def test_encoding_error(monkeypatch):
 
 
 def test_invalid_feature(monkeypatch):
-    monkeypatch.setattr(requests, "get", monkey_get)
-    monkeypatch.setattr(requests, "post", monkey_post)
-    monkeypatch.setattr(requests, "delete", monkey_delete)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
+    monkeypatch.setattr(requests.Session, "post", staticmethod(monkey_post))
+    monkeypatch.setattr(requests.Session, "delete", staticmethod(monkey_delete))
     client = VeyonClient("invalid_feature", {}, auth_method=AuthenticationMethod.AUTH_LOGON)
     with pytest.raises(VeyonError) as exc:
         client.set_feature("NON_EXISTENT_FEATURE")
@@ -227,9 +228,9 @@ def test_invalid_feature(monkeypatch):
 
 
 def test_invalid_feature_status(monkeypatch):
-    monkeypatch.setattr(requests, "get", monkey_get)
-    monkeypatch.setattr(requests, "post", monkey_post)
-    monkeypatch.setattr(requests, "delete", monkey_delete)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
+    monkeypatch.setattr(requests.Session, "post", staticmethod(monkey_post))
+    monkeypatch.setattr(requests.Session, "delete", staticmethod(monkey_delete))
     client = VeyonClient("invalid_feature", {}, auth_method=AuthenticationMethod.AUTH_LOGON)
     with pytest.raises(VeyonError) as exc:
         client.get_feature_status("NON_EXISTENT_FEATURE")
@@ -238,25 +239,39 @@ def test_invalid_feature_status(monkeypatch):
 
 @pytest.mark.parametrize("feature,expected", [("REBOOT", False), ("SCREEN_LOCK", True)])
 def test_get_feature_status(monkeypatch, feature, expected):
-    monkeypatch.setattr(requests, "get", monkey_get)
-    monkeypatch.setattr(requests, "post", monkey_post)
-    monkeypatch.setattr(requests, "delete", monkey_delete)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
+    monkeypatch.setattr(requests.Session, "post", staticmethod(monkey_post))
+    monkeypatch.setattr(requests.Session, "delete", staticmethod(monkey_delete))
     client = VeyonClient("get_feature", {}, auth_method=AuthenticationMethod.AUTH_LOGON)
     assert client.get_feature_status(feature) == expected
 
 
+def test_get_feature_statuses(monkeypatch):
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
+    monkeypatch.setattr(requests.Session, "post", staticmethod(monkey_post))
+    monkeypatch.setattr(requests.Session, "delete", staticmethod(monkey_delete))
+    client = VeyonClient("get_feature", {}, auth_method=AuthenticationMethod.AUTH_LOGON)
+    statuses = client.get_feature_statuses(["REBOOT", "SCREEN_LOCK"])
+    assert statuses == {"REBOOT": False, "SCREEN_LOCK": True}
+    assert statuses.errors == {}
+    assert statuses.any_active("REBOOT", "SCREEN_LOCK")
+    assert not statuses.any_active("REBOOT")
+    assert statuses.changed(FeatureStatuses({"REBOOT": False, "SCREEN_LOCK": False})) == {"SCREEN_LOCK"}
+    assert statuses.changed(None) == {"REBOOT", "SCREEN_LOCK"}
+
+
 def test_get_user_info(monkeypatch):
-    monkeypatch.setattr(requests, "get", monkey_get)
-    monkeypatch.setattr(requests, "post", monkey_post)
-    monkeypatch.setattr(requests, "delete", monkey_delete)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
+    monkeypatch.setattr(requests.Session, "post", staticmethod(monkey_post))
+    monkeypatch.setattr(requests.Session, "delete", staticmethod(monkey_delete))
     client = VeyonClient("user_info", {}, auth_method=AuthenticationMethod.AUTH_LOGON)
     assert client.get_user_info() == VeyonUser("LOGIN", "FULLNAME", "SESSION")
 
 
 def test_idle_timeout(monkeypatch):
-    monkeypatch.setattr(requests, "get", monkey_get)
-    monkeypatch.setattr(requests, "post", monkey_post)
-    monkeypatch.setattr(requests, "delete", monkey_delete)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
+    monkeypatch.setattr(requests.Session, "post", staticmethod(monkey_post))
+    monkeypatch.setattr(requests.Session, "delete", staticmethod(monkey_delete))
     client = VeyonClient("idle_timeout", {}, auth_method=AuthenticationMethod.AUTH_LOGON)
     time = datetime.now()
     client._session_cache["localhost"] = VeyonSession(
@@ -267,7 +282,7 @@ def test_idle_timeout(monkeypatch):
 
 
 def test_remove_session(monkeypatch):
-    monkeypatch.setattr(requests, "delete", monkey_delete)
+    monkeypatch.setattr(requests.Session, "delete", staticmethod(monkey_delete))
     client = VeyonClient("remove_session", {}, auth_method=AuthenticationMethod.AUTH_LOGON)
     time = datetime.now()
     client._session_cache["localhost"] = VeyonSession(
@@ -294,8 +309,8 @@ def test_client_thread_safety(monkeypatch):
     def _call_get_connection_uid(j):
         results[j] = client._get_connection_uid("localhost")
 
-    monkeypatch.setattr(requests, "delete", monkey_delete)
-    monkeypatch.setattr(requests, "post", monkey_post)
+    monkeypatch.setattr(requests.Session, "delete", staticmethod(monkey_delete))
+    monkeypatch.setattr(requests.Session, "post", staticmethod(monkey_post))
     client = VeyonClient(
         "random_uid",
         {},
@@ -30,13 +30,18 @@
 import time
 from collections import defaultdict
 from datetime import datetime
+from multiprocessing.pool import ThreadPool
 from threading import Lock
-from typing import TYPE_CHECKING, Dict, Optional  # noqa: F401
+from typing import TYPE_CHECKING, Dict, Iterable, Optional  # noqa: F401
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError, ReadTimeoutError
+from urllib3.util.retry import Retry
 
 from .models import (
     AuthenticationMethod,
+    FeatureStatuses,
     ScreenshotFormat,
     VeyonConnectionError,
     VeyonError,
@@ -49,6 +54,23 @@ if TYPE_CHECKING:
     from .models import Dimension, Feature  # noqa: F401
 
 
+class ResetRetry(Retry):
+    """
+    Retry policy that repeats requests on refused or reset connections (e.g. a kept-alive connection
+    closed by the WebAPI server), but never on timeouts: those are re-raised immediately, so callers
+    like :py:meth:`VeyonClient.ping` see them after a single timeout period.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if isinstance(error, ConnectTimeoutError):
+            raise MaxRetryError(_pool, url, error)
+        if isinstance(error, ReadTimeoutError):
+            raise error
+        return super(ResetRetry, self).increment(
+            method, url, response=response, error=error, _pool=_pool, _stacktrace=_stacktrace
+        )
+
+
 class VeyonClient:
     def __init__(
         self,
@@ -57,7 +79,10 @@ class VeyonClient:
         auth_method=AuthenticationMethod.AUTH_KEYS,
         default_host="localhost",
         idle_timeout=60,
-    ):  # type: (str, Dict[str, str], Optional[AuthenticationMethod], str, int) -> None
+        pool_size=10,
+        timeout=10.0,
+        max_retries=2,
+    ):  # type: (str, Dict[str, str], Optional[AuthenticationMethod], str, int, int, float, int) -> None  # noqa: E501
         """
         Creates a client that communicates with the Veyon API to control features and fetch
         screenshots.
@@ -68,6 +93,11 @@ class VeyonClient:
         :param default_host: The default host to connect to if no specific host is provided
         :param idle_timeout: The maximum time a connection can be idle without being invalidated by the
             server. Has to be a value > 0. If the given value is < 1, the value is set to 1.
+        :param pool_size: The maximum number of keep-alive connections to the Veyon API kept open.
+            Should match the number of concurrent requests, e.g. the number of computers polled in
+            parallel.
+        :param timeout: The timeout in seconds for each request to the Veyon API
+        :param max_retries: How often a request is repeated if the connection was refused or reset
         """
         self._url = url
         self._credentials = credentials
@@ -75,6 +105,18 @@ class VeyonClient:
         self._default_host = default_host
         self._idle_timeout = max(idle_timeout - 1, 1)
         self._ping_timeout = 5.0
+        self._timeout = timeout
+        self._http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max(pool_size, 1),
+            max_retries=ResetRetry(total=max_retries, status=0, backoff_factor=0.1),
+        )
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
+        self._pool_size = max(pool_size, 1)
+        self._thread_pool = None  # type: Optional[ThreadPool]
+        self._thread_pool_lock = Lock()  # type: Lock
         self._session_cache = {}  # type: Dict[str, VeyonSession]
         self._last_used = {}  # type: Dict[str, float]
         self._session_locks = defaultdict(Lock)  # type: defaultdict[str, Lock]
@@ -90,8 +132,10 @@ class VeyonClient:
 
     def _create_session(self, host):  # type: (str) -> VeyonSession
         auth_route = "{}/authentication/{}".format(self._url, host)
-        result = requests.post(
-            auth_route, json={"method": str(self._auth_method), "credentials": self._credentials}
+        result = self._http.post(
+            auth_route,
+            json={"method": str(self._auth_method), "credentials": self._credentials},
+            timeout=self._timeout,
         )
         check_veyon_error(result)
         session_data = result.json()
@@ -142,9 +186,10 @@ class VeyonClient:
         try:
             session = self._session_cache.get(host, None)
             session_uid = session.connection_uid if session else ""
-            requests.delete(
+            self._http.delete(
                 "{}/authentication".format(self._url),
                 headers={"Connection-Uid": session_uid},
+                timeout=self._timeout,
             )
         except (requests.ConnectionError, requests.Timeout):
             raise VeyonConnectionError
@@ -162,7 +207,7 @@ class VeyonClient:
         :raises VeyonConnectionError: if the there is no response.
         """
         try:
-            requests.head("{}/feature".format(self._url), timeout=self._ping_timeout)
+            self._http.head("{}/feature".format(self._url), timeout=self._ping_timeout)
         except (requests.ConnectionError, requests.Timeout):
             raise VeyonConnectionError("No response from WebAPI Server ({}).".format(self._url))
         return True
@@ -195,8 +240,11 @@ class VeyonClient:
             params["width"] = dimension.width
         if dimension and dimension.height:
             params["height"] = dimension.height
-        result = requests.get(
-            "{}/framebuffer".format(self._url), params=params, headers=self._get_headers(host)
+        result = self._http.get(
+            "{}/framebuffer".format(self._url),
+            params=params,
+            headers=self._get_headers(host),
+            timeout=self._timeout,
         )
         check_veyon_error(result)
         return result.content
@@ -204,7 +252,7 @@ class VeyonClient:
     def ping(self, host=None):  # type: (Optional[str]) -> bool
         host = host if host else self._default_host
         try:
-            result = requests.get(
+            result = self._http.get(
                 "{}/authentication/{}".format(self._url, host), timeout=self._ping_timeout
             )
             return result.status_code == 200
@@ -225,10 +273,11 @@ class VeyonClient:
         data = {"active": active}
         if arguments:
             data["arguments"] = arguments
-        result = requests.put(
+        result = self._http.put(
             "{}/feature/{}".format(self._url, feature),
             json=data,
             headers=self._get_headers(host),
+            timeout=self._timeout,
         )
         check_veyon_error(result)
 
@@ -243,12 +292,52 @@ class VeyonClient:
             status, like "REBOOT"
         :rtype: bool
         """
-        result = requests.get(
-            "{}/feature/{}".format(self._url, feature), headers=self._get_headers(host)
+        return self._get_feature_status(feature, self._get_headers(host))
+
+    def get_feature_statuses(self, features, host=None):
+        # type: (Iterable[Feature], Optional[str]) -> FeatureStatuses
+        """
+        Fetches the status of several features on a given host. The requests are sent concurrently
+        and share one connection uid, so the round takes about as long as a single request.
+
+        :param features: The features to fetch the status for
+        :param host: The host to fetch the feature status for. If not specified the default host is used.
+
+        :returns: The status of all features. Features whose status could not be fetched are set to
+            None, the errors are available in the `errors` attribute of the result.
+        :rtype: FeatureStatuses
+        :raises VeyonError: If the session for the host is invalid (code 2)
+        """
+        headers = self._get_headers(host)
+
+        def _fetch(feature):
+            try:
+                return feature, self._get_feature_status(feature, headers), None
+            except VeyonError as exc:
+                return feature, None, exc
+
+        statuses = FeatureStatuses()
+        for feature, active, error in self._get_thread_pool().map(_fetch, list(features)):
+            if error is not None and error.code == 2:
+                raise error
+            statuses[feature] = active
+            if error is not None:
+                statuses.errors[feature] = error
+        return statuses
+
+    def _get_feature_status(self, feature, headers):  # type: (Feature, Dict[str, str]) -> bool
+        result = self._http.get(
+            "{}/feature/{}".format(self._url, feature), headers=headers, timeout=self._timeout
         )
         check_veyon_error(result)
         return result.json()["active"]
 
+    def _get_thread_pool(self):  # type: () -> ThreadPool
+        with self._thread_pool_lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPool(self._pool_size)
+            return self._thread_pool
+
     def get_user_info(self, host=None):  # type: (Optional[str]) -> VeyonUser
         """
         Fetches the information about a logged in user on a given host
@@ -259,6 +348,8 @@ class VeyonClient:
             result will be -1
         :rtype: VeyonUser
         """
-        result = requests.get("{}/user".format(self._url), headers=self._get_headers(host))
+        result = self._http.get(
+            "{}/user".format(self._url), headers=self._get_headers(host), timeout=self._timeout
+        )
         check_veyon_error(result)
         return VeyonUser(**result.json())
@@ -29,6 +29,7 @@
 
 import enum
 from collections import namedtuple
+from typing import Optional, Set  # noqa: F401
 
 
 class VeyonConnectionError(Exception):
@@ -81,6 +82,32 @@ class Feature(enum.Enum):
         return str(self.value)
 
 
+class FeatureStatuses(dict):
+    """
+    Snapshot of the status of several features of one host, as returned by
+    :py:meth:`VeyonClient.get_feature_statuses`. Maps each :py:class:`Feature` to ``True`` or ``False``,
+    or to ``None`` if its status could not be fetched. The errors for the latter are kept in
+    :py:attr:`errors`.
+    """
+
+    def __init__(self, statuses=None, errors=None):
+        super(FeatureStatuses, self).__init__(statuses or {})
+        self.errors = errors or {}
+
+    def any_active(self, *features):  # type: (*Feature) -> bool
+        return any(self.get(feature) for feature in features)
+
+    def changed(self, other):  # type: (Optional[FeatureStatuses]) -> Set[Feature]
+        """
+        :param other: An older snapshot of the same host, or ``None`` if there is none yet.
+        :return: The features whose status differs between this snapshot and `other`.
+        """
+        other = other or {}
+        return {
+            feature for feature in set(self) | set(other) if self.get(feature) != other.get(feature)
+        }
+
+
 VeyonUser = namedtuple("VeyonUser", ["login", "fullName", "session"])
 VeyonSession = namedtuple("VeyonSession", ["connection_uid", "valid_until"])
 Dimension = namedtuple("Dimension", ["width", "height"])
@@ -38,16 +38,17 @@ import listener
 import univention.admin.uldap
 import univention.config_registry
 import univention.debug as ud
+from ucsschool import webproxy
+from ucsschool.lib import proxy_usergroups
 from ucsschool.lib.models.school import School
-from univention.config_registry.frontend import ucr_update
 
 name = "pupilgroups"
-description = "Map pupil group lists to UCR"
+description = "Store the members of pupil groups for the web proxy"
 filter = "(objectClass=univentionGroup)"
 attributes = ["memberUid"]
 
 all_local_schools = None
-keyPattern = "proxy/filter/usergroup/%s"
+store_changed = False
 
 
 def initialize():
@@ -81,13 +82,30 @@ def is_special_ucsschool_group(dn):
     )
 
 
+def postrun():
+    # Regenerating the squidGuard configuration is expensive, so it is done once after a batch of
+    # membership changes instead of once per changed group.
+    global store_changed
+    if not store_changed:
+        return
+    ud.debug(ud.LISTENER, ud.PROCESS, "pupilgroups: regenerating web proxy configuration")
+    listener.setuid(0)
+    try:
+        configRegistry = univention.config_registry.ConfigRegistry()
+        configRegistry.load()
+        webproxy.update_config(configRegistry)
+    finally:
+        listener.unsetuid()
+    # only after a successful run, so a failed one is retried after the next batch
+    store_changed = False
+
+
 def handler(dn, new, old):
+    global store_changed
     if is_special_ucsschool_group(dn):
         update_local_school_list()
 
     ud.debug(ud.LISTENER, ud.PROCESS, "pupilgroups: dn: %s" % dn)
-    configRegistry = univention.config_registry.ConfigRegistry()
-    configRegistry.load()
 
     if all_local_schools is None:
         ud.debug(
@@ -103,17 +121,16 @@ def handler(dn, new, old):
         )
         return  # the object doesn't belong to this school
 
-    changes = {}
-    if new and new.get("memberUid"):
-        changes[keyPattern % new["cn"][0].decode("UTF-8")] = b",".join(new.get("memberUid", [])).decode(
-            "UTF-8"
-        )
-    elif old:  # old lost its last memberUid OR old was removed
-        changes[keyPattern % old["cn"][0].decode("UTF-8")] = None
-    ud.debug(ud.LISTENER, ud.INFO, "pupilgroups: %r" % (changes,))
-
     listener.setuid(0)
     try:
-        ucr_update(configRegistry, changes)
+        if old and (not new or old["cn"] != new["cn"]):  # old was removed or renamed
+            group = old["cn"][0].decode("UTF-8")
+            ud.debug(ud.LISTENER, ud.INFO, "pupilgroups: removing %r" % (group,))
+            store_changed |= proxy_usergroups.set_members(group, [])
+        if new:  # an empty member list removes the group from the store
+            group = new["cn"][0].decode("UTF-8")
+            members = [uid.decode("UTF-8") for uid in new.get("memberUid", [])]
+            ud.debug(ud.LISTENER, ud.INFO, "pupilgroups: %r: %r" % (group, members))
+            store_changed |= proxy_usergroups.set_members(group, members)
     finally:
         listener.unsetuid()
@@ -92,7 +92,7 @@ def get_dummy_veyon_computer(ips=None, auth_method=None):
 
 
 def test_connected_veyon(monkeypatch):
-    monkeypatch.setattr(requests, "get", monkey_get)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
     ips = ["valid"]
     computer = get_dummy_veyon_computer(ips)
     assert computer.connected()
@@ -101,7 +101,7 @@ def test_connected_veyon(monkeypatch):
 def test_second_valid_veyon(monkeypatch):
     handler_set(["ucsschool/umc/computerroom/ping-client-ip-addresses=yes"])
     ucr.load()
-    monkeypatch.setattr(requests, "get", monkey_get)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
     ips = ["invalid", "valid"]
     computer = get_dummy_veyon_computer(ips)
     assert computer.connected()
@@ -116,7 +116,7 @@ def test_first_valid_veyon(monkeypatch, ucr_value):
     else:
         handler_set(["ucsschool/umc/computerroom/ping-client-ip-addresses={}".format(ucr_value)])
     ucr.load()
-    monkeypatch.setattr(requests, "get", monkey_get)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
     ips = ["valid", "invalid"]
     computer = get_dummy_veyon_computer(ips)
     assert computer.connected()
@@ -127,7 +127,7 @@ def test_first_valid_veyon(monkeypatch, ucr_value):
 def test_multiple_ips_last_valid_veyon(monkeypatch):
     handler_set(["ucsschool/umc/computerroom/ping-client-ip-addresses=yes"])
     ucr.load()
-    monkeypatch.setattr(requests, "get", monkey_get)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
     ips = ["invalid"] * 10
     ips.append("valid")
     computer = get_dummy_veyon_computer(ips)
@@ -139,7 +139,7 @@ def test_multiple_ips_last_valid_veyon(monkeypatch):
 
 
 def test_no_valid_ip_veyon(monkeypatch):
-    monkeypatch.setattr(requests, "get", monkey_get)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
     ips = ["invalid"] * 2
     computer = get_dummy_veyon_computer(ips)
     assert computer.connected() is False
@@ -148,7 +148,7 @@ def test_no_valid_ip_veyon(monkeypatch):
 
 
 def test_no_ips_veyon(monkeypatch):
-    monkeypatch.setattr(requests, "get", monkey_get)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(monkey_get))
     client = veyon_client_module.VeyonClient(
         "http://localhost:11080/api/v1",
         credentials={"username": "user", "password": "secret"},
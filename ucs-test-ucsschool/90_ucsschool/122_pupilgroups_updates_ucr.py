@@ -1,5 +1,5 @@
 #!/usr/share/ucs-test/runner python3
-## desc: ucs-school-webproxy - pupilgroups listener updates UCRVs
+## desc: ucs-school-webproxy - pupilgroups listener updates the proxy usergroup store
 ## roles: [domaincontroller_slave]
 ## tags: [SKIP-UCSSCHOOL,apptest,ucsschool,ucsschool_base1]
 ## exposure: dangerous
@@ -9,6 +9,7 @@
 
 import univention.testing.strings as uts
 import univention.testing.ucsschool.ucs_test_school as utu
+from ucsschool.lib import proxy_usergroups
 from ucsschool.lib.models.group import SchoolClass
 from ucsschool.lib.models.school import School
 from univention.testing import utils
@@ -41,19 +42,16 @@ class Test(CLI_Import_v2_Tester):
             name="{}-{}".format(self.ou_A.name, uts.random_groupname()),
             check_for_drs_replication=False,
         )
-        ucr_A = "proxy/filter/usergroup/%s" % class_A_name
         class_B_dn, class_B_name = self.udm.create_group(
             position=SchoolClass.get_container(self.ou_B.name),
             name="{}-{}".format(self.ou_B.name, uts.random_groupname()),
             check_for_drs_replication=False,
         )
-        ucr_B = "proxy/filter/usergroup/%s" % class_B_name
 
         user_a_name, user_a_dn = self.schoolenv.create_user(self.ou_A.name, classes=class_A_name)
         user_b_name, user_b_dn = self.schoolenv.create_user(self.ou_B.name, classes=class_B_name)
 
         utils.wait_for_replication_and_postrun()
-        self.ucr.load()
 
         sc_a = SchoolClass.from_dn(class_A_dn, None, self.lo)
         users_a = sc_a.get_udm_object(self.lo)["users"]
@@ -66,12 +64,16 @@ class Test(CLI_Import_v2_Tester):
             self.log.error("Users in %r: %r" % (class_B_name, users_b))
             utils.fail("User %r is not in school class %r." % (user_b_dn, sc_b))
 
-        if user_a_name not in self.ucr.get(ucr_A, "").split(","):
-            utils.fail("Username %r not in UCRV %r." % (user_a_name, ucr_A))
-        if self.ucr.get(ucr_B, ""):
-            self.log.warning("*** UCRV %r exists: %r", ucr_B, self.ucr.get(ucr_B, ""))
-        if user_b_name in self.ucr.get(ucr_B, "").split(","):
-            utils.fail("Username %r in UCRV %r." % (user_b_name, ucr_B))
+        members_a = proxy_usergroups.get_members(class_A_name)
+        if user_a_name not in members_a:
+            utils.fail(
+                "Username %r not in proxy usergroup %r: %r" % (user_a_name, class_A_name, members_a)
+            )
+        members_b = proxy_usergroups.get_members(class_B_name)
+        if members_b:
+            self.log.warning("*** Proxy usergroup %r exists: %r", class_B_name, members_b)
+        if user_b_name in members_b:
+            utils.fail("Username %r in proxy usergroup %r." % (user_b_name, class_B_name))
 
 
 if __name__ == "__main__":
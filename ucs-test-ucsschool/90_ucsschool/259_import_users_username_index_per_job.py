@@ -0,0 +1,65 @@
+#!/usr/share/ucs-test/runner pytest-3 -s -l -v
+## -*- coding: utf-8 -*-
+## desc: Test that every import job checks usernames with a new username index
+## tags: [apptest,ucsschool,ucsschool_import1]
+## roles: [domaincontroller_master]
+## exposure: dangerous
+## packages:
+##   - ucs-school-import
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import pytest
+
+import univention.testing.strings as uts
+from ucsschool.importer.mass_import.mass_import import MassImport
+from ucsschool.importer.utils.shell import ImportStudent, factory
+from ucsschool.importer.utils.username_index import LdapUsernameIndex, MemoryUsernameIndex
+
+
+class StopJob(Exception):
+    pass
+
+
+def start_job():
+    """Run the start of an import job, which resets the username index."""
+    mass_import = MassImport(dry_run=True)
+    with mock.patch.object(mass_import.factory, "make_user_importer", side_effect=StopJob):
+        with pytest.raises(StopJob):
+            mass_import.import_users()
+
+
+@pytest.mark.parametrize("index_cls", [MemoryUsernameIndex, LdapUsernameIndex])
+def test_username_index_is_renewed_for_every_job(index_cls, mocker, ucr, schoolenv):
+    mocker.patch.object(factory, "make_username_index", side_effect=index_cls)
+    ou_name, ou_dn = schoolenv.create_ou(name_edudc=ucr["hostname"])
+    lo = schoolenv.open_ldap_connection(admin=True)
+    username_job = uts.random_username()
+    username_other = uts.random_username()
+
+    # first job: both usernames are free and the index remembers that
+    start_job()
+    user = ImportStudent(
+        name=username_job,
+        school=ou_name,
+        firstname=uts.random_name(),
+        lastname=uts.random_name(),
+        record_uid=uts.random_name(),
+    )
+    assert user.username_index.get(lo, username_job) is None
+    assert user.username_index.get(lo, username_other) is None
+    first_index = user.username_index
+    user.prepare_all(True)
+    user.create(lo)
+    # created outside of this process, e.g. by an import job of another worker
+    schoolenv.create_user(ou_name, username=username_other)
+
+    # second job: sees the users created since the first job started
+    start_job()
+    index = ImportStudent().username_index
+    assert index is not first_index
+    assert index.get(lo, username_job).dn == user.dn
+    assert index.get(lo, username_other) is not None